@@ -0,0 +1,127 @@
+import io
+import uuid
+import zipfile
+
+import numpy as np
+from django.core.files.base import ContentFile
+
+# Au-delà de cette taille (JSON, en octets), un jeu de données tabulaire est stocké hors de la ligne.
+SEUIL_STOCKAGE_COLONNAIRE = 1024 * 1024
+
+# Types Python acceptés dans une colonne, avec le type NumPy correspondant ; tout autre
+# contenu (None, objets imbriqués, mélange texte / nombres) reste en JSON.
+TYPES_COLONNE = {
+    frozenset({bool}): np.bool_,
+    frozenset({int}): np.int64,
+    frozenset({float}): np.float64,
+    frozenset({int, float}): np.float64,
+    frozenset({str}): np.str_,
+}
+
+# Taille des blocs lus pour atteindre la première ligne demandée d'une colonne compressée.
+TAILLE_BLOC = 1024 * 1024
+
+
+def colonnes_tabulaires(donnees):
+    """
+    Tableaux 1-D des colonnes de `donnees` ({nom: [valeurs]}), ou None si ce n'est pas un jeu tabulaire.
+
+    Chaque colonne doit être une liste de valeurs d'un même type scalaire
+    JSON, pour que la relecture rende exactement les mêmes valeurs.
+    """
+    if not isinstance(donnees, dict) or not donnees:
+        return None
+    colonnes = {}
+    for nom, valeurs in donnees.items():
+        if not isinstance(valeurs, list):
+            return None
+        dtype = TYPES_COLONNE.get(frozenset(map(type, valeurs)), np.float64 if not valeurs else None)
+        if dtype is None:
+            return None
+        try:
+            colonnes[nom] = np.array(valeurs, dtype=dtype)
+        except OverflowError:
+            # Entier hors de l'intervalle int64.
+            return None
+    return colonnes
+
+
+def ecrire_colonnes(colonnes):
+    """
+    Fichier `.npz` compressé des `colonnes` et leur description.
+
+    Chaque colonne est un membre distinct de l'archive (`c0`, `c1`, ...),
+    décompressé indépendamment à la lecture. La description
+    [{'nom', 'membre', 'dtype', 'lignes'}] garde l'ordre des colonnes.
+    Retourne (contenu du fichier, description).
+    """
+    description = []
+    membres = {}
+    for index, (nom, tableau) in enumerate(colonnes.items()):
+        membre = f'c{index}'
+        membres[membre] = tableau
+        description.append({'nom': nom, 'membre': membre, 'dtype': tableau.dtype.str, 'lignes': len(tableau)})
+
+    tampon = io.BytesIO()
+    np.savez_compressed(tampon, **membres)
+    return ContentFile(tampon.getvalue(), name=f'{uuid.uuid4().hex}.npz'), description
+
+
+def _lire_membre(archive, membre, lignes=None):
+    """Lit le tableau `membre` de l'archive ; avec `lignes` (slice), seules ces lignes sont conservées."""
+    with archive.open(f'{membre}.npy') as flux:
+        version = np.lib.format.read_magic(flux)
+        if version == (1, 0):
+            forme, _, dtype = np.lib.format.read_array_header_1_0(flux)
+        else:
+            forme, _, dtype = np.lib.format.read_array_header_2_0(flux)
+        total = forme[0]
+
+        debut, fin, pas = (lignes or slice(None)).indices(total)
+        indices = range(debut, fin, pas)
+        if not indices:
+            return np.empty(0, dtype=dtype)
+        premier, dernier = min(indices), max(indices)
+
+        # Le flux zip se décompresse séquentiellement : on avance jusqu'à la première
+        # ligne par blocs, sans garder ce qui précède, puis on ne lit que la plage utile.
+        a_sauter = premier * dtype.itemsize
+        while a_sauter:
+            a_sauter -= len(flux.read(min(a_sauter, TAILLE_BLOC)))
+        bloc = np.frombuffer(flux.read((dernier - premier + 1) * dtype.itemsize), dtype=dtype)
+        return bloc[::pas] if pas > 0 else bloc[::-1][::-pas]
+
+
+class DonneesColonnaires:
+    """
+    Lecture paresseuse d'un jeu de données stocké en `.npz`.
+
+    Seules les colonnes demandées sont décompressées, et pour chacune seule
+    la plage de lignes demandée est conservée en mémoire : lire une série
+    d'un jeu de plusieurs centaines de Mo ne charge pas le reste.
+    """
+
+    def __init__(self, fichier, description):
+        self.fichier = fichier
+        self.description = {colonne['nom']: colonne for colonne in description}
+
+    @property
+    def colonnes(self):
+        return list(self.description)
+
+    def __len__(self):
+        return max((colonne['lignes'] for colonne in self.description.values()), default=0)
+
+    def charger(self, colonnes=None, lignes=None):
+        """{nom: tableau} des `colonnes` (toutes par défaut), restreintes à `lignes` (slice) ; KeyError si inconnue."""
+        colonnes = self.colonnes if colonnes is None else list(colonnes)
+        membres = [(nom, self.description[nom]['membre']) for nom in colonnes]
+        self.fichier.open('rb')
+        try:
+            with zipfile.ZipFile(self.fichier) as archive:
+                return {nom: _lire_membre(archive, membre, lignes) for nom, membre in membres}
+        finally:
+            self.fichier.close()
+
+    def colonne(self, nom, lignes=None):
+        return self.charger([nom], lignes)[nom]
@@ -0,0 +1,135 @@
+import numpy as np
+from django.db import transaction
+
+from apps.wells.models import Phase
+
+from .models import AnalyseEcart, AlerteAnalytique
+from .statistiques import invalider_statistiques
+from .performance import invalider_resumes_performance
+
+# Indicateurs calculés pour chaque phase : profondeur atteinte et durée (en jours)
+PROFONDEUR = 'PERFORMANCE'
+DUREE = 'TEMPS'
+INDICATEURS_PHASE = (PROFONDEUR, DUREE)
+
+# Bornes de `pourcentage_ecart` (numeric(7, 4))
+POURCENTAGE_MAX = 999.9999
+
+COLONNES_PHASE = (
+    'pk', 'forage__puit_id', 'numero_phase', 'profondeur_prevue', 'profondeur_reelle',
+    'date_debut_prevue', 'date_fin_prevue', 'date_debut_reelle', 'date_fin_reelle',
+)
+
+
+def _durees(debuts, fins):
+    """Durées en jours ; NaN quand une des deux dates manque."""
+    debuts = np.array(debuts, dtype='datetime64[D]')
+    fins = np.array(fins, dtype='datetime64[D]')
+    return (fins - debuts) / np.timedelta64(1, 'D')
+
+
+def calculer_ecarts(planifiees, reelles):
+    """
+    Écarts, pourcentages et niveaux de criticité de deux séries, en une passe NumPy.
+
+    Reproduit `AnalyseEcart.save()` : pourcentage NaN (enregistré NULL) quand
+    la valeur planifiée est nulle, niveau par défaut du modèle dans ce cas.
+    Retourne (écarts, pourcentages, niveaux).
+    """
+    planifiees = np.asarray(planifiees, dtype=np.float64)
+    reelles = np.asarray(reelles, dtype=np.float64)
+    ecarts = reelles - planifiees
+
+    pourcentages = np.full(ecarts.shape, np.nan)
+    np.divide(ecarts * 100, planifiees, out=pourcentages, where=planifiees != 0)
+    absolus = np.abs(pourcentages)
+
+    niveaux = np.select(
+        [absolus >= seuil for seuil, _ in AnalyseEcart.SEUILS_CRITICITE],
+        [niveau for _, niveau in AnalyseEcart.SEUILS_CRITICITE],
+        AnalyseEcart.NIVEAU_SOUS_SEUILS
+    ).astype(object)
+    niveaux[np.isnan(pourcentages)] = AnalyseEcart._meta.get_field('niveau_criticite').get_default()
+    return ecarts, pourcentages, niveaux
+
+
+def _alerte_critique(analyse, puit_id, numero_phase):
+    """Alerte équivalente à celle du signal `creer_alerte_ecart_critique`."""
+    return AlerteAnalytique(
+        puits_id=puit_id,
+        type_alerte='ECART_IMPORTANT',
+        niveau_urgence='URGENT',
+        titre_alerte=f'Écart critique détecté - {analyse.type_indicateur}',
+        description=f'Un écart de {analyse.pourcentage_ecart}% a été détecté sur {analyse.type_indicateur} '
+                    f'dans la phase {numero_phase}.',
+        valeur_declenchante=analyse.valeur_reelle,
+        seuil_reference=analyse.valeur_planifiee,
+        source_donnees=f'Analyse d\'écart - Phase {numero_phase}',
+        # Comme `notifier_alerte_urgente` : l'alerte revient au dernier analyseur du puits.
+        assigne_a=analyse.analyseur,
+    )
+
+
+def analyser_phases(phases=None, indicateurs=INDICATEURS_PHASE, analyseur=None, batch_size=2000):
+    """
+    Analyse en masse les écarts prévu / réel des `phases` (toutes par défaut).
+
+    Les colonnes sont lues en une requête puis les écarts, pourcentages et
+    niveaux de criticité de toutes les phases sont calculés en une passe
+    NumPy par indicateur (profondeur, durée). Les analyses sont écrites par
+    `bulk_create`, puis les alertes des écarts critiques dans un second
+    `bulk_create` : ni `save()` ni les signaux ne sont appelés ligne à ligne.
+    Une phase sans valeur prévue ou réelle pour un indicateur est ignorée
+    pour cet indicateur. Les pourcentages sont bornés à la précision de la
+    colonne. Retourne (nombre d'analyses, nombre d'alertes).
+    """
+    phases = Phase.objects.all() if phases is None else phases
+    lignes = list(phases.order_by().values_list(*COLONNES_PHASE))
+    if not lignes:
+        return 0, 0
+    (phases_ids, puits_ids, numeros, profondeurs_prevues, profondeurs_reelles,
+     debuts_prevus, fins_prevues, debuts_reels, fins_reelles) = zip(*lignes)
+
+    series = {
+        PROFONDEUR: (np.array(profondeurs_prevues, dtype=np.float64), np.array(profondeurs_reelles, dtype=np.float64)),
+        DUREE: (_durees(debuts_prevus, fins_prevues), _durees(debuts_reels, fins_reelles)),
+    }
+
+    analyses, sources = [], []
+    for indicateur in indicateurs:
+        planifiees, reelles = series[indicateur]
+        retenues = np.flatnonzero(~np.isnan(planifiees) & ~np.isnan(reelles))
+        if not retenues.size:
+            continue
+        planifiees, reelles = planifiees[retenues], reelles[retenues]
+        ecarts, pourcentages, niveaux = calculer_ecarts(planifiees, reelles)
+        pourcentages = np.round(np.clip(pourcentages, -POURCENTAGE_MAX, POURCENTAGE_MAX), 4)
+
+        for index, prevue, reelle, ecart, pourcentage, niveau in zip(
+                retenues.tolist(), planifiees.tolist(), reelles.tolist(),
+                np.round(ecarts, 4).tolist(), pourcentages.tolist(), niveaux.tolist()):
+            analyses.append(AnalyseEcart(
+                phase_id=phases_ids[index],
+                type_indicateur=indicateur,
+                valeur_planifiee=prevue,
+                valeur_reelle=reelle,
+                ecart_absolu=ecart,
+                pourcentage_ecart=None if np.isnan(pourcentage) else pourcentage,
+                niveau_criticite=niveau,
+                analyseur=analyseur,
+            ))
+            sources.append(index)
+
+    with transaction.atomic():
+        AnalyseEcart.objects.bulk_create(analyses, batch_size=batch_size)
+        alertes = [
+            _alerte_critique(analyse, puits_ids[index], numeros[index])
+            for analyse, index in zip(analyses, sources)
+            if analyse.niveau_criticite == 'CRITIQUE'
+        ]
+        AlerteAnalytique.objects.bulk_create(alertes, batch_size=batch_size)
+        # `bulk_create` n'émet pas les signaux qui invalident les statistiques et les résumés.
+        transaction.on_commit(invalider_statistiques)
+        puits_alertes = [alerte.puits_id for alerte in alertes]
+        transaction.on_commit(lambda: invalider_resumes_performance(puits_alertes))
+    return len(analyses), len(alertes)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from apps.analytics.ecarts import INDICATEURS_PHASE, analyser_phases
+from apps.wells.models import Phase
+
+
+class Command(BaseCommand):
+    help = "Analyser en masse les écarts prévu / réel (profondeur, durée) des phases et alerter sur les écarts critiques"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--puit', type=int, action='append', default=None,
+                            help="Limiter l'analyse aux phases de ce puits (option répétable)")
+        parser.add_argument('--indicateur', choices=INDICATEURS_PHASE, action='append', default=None,
+                            help="Indicateur à analyser (option répétable, tous par défaut)")
+
+    def handle(self, *args, **options):
+        phases = Phase.objects.all()
+        if options['puit']:
+            phases = phases.filter(forage__puit__in=options['puit'])
+        analyses, alertes = analyser_phases(phases, options['indicateur'] or INDICATEURS_PHASE)
+        self.stdout.write(self.style.SUCCESS(f'{analyses} analyses d\'écart créées, {alertes} alertes critiques.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from apps.analytics.colonnaire import SEUIL_STOCKAGE_COLONNAIRE
+from apps.analytics.models import JeuDonneesAnalytiques
+
+
+class Command(BaseCommand):
+    help = "Déplacer dans des fichiers .npz compressés les gros jeux de données tabulaires encore stockés en JSON"
+
+    def handle(self, *args, **options):
+        candidats = JeuDonneesAnalytiques.objects.filter(
+            taille_donnees__gt=SEUIL_STOCKAGE_COLONNAIRE, fichier_donnees=''
+        ).values_list('pk', flat=True)
+        deplaces = 0
+        # Un jeu à la fois : chaque contenu peut peser plusieurs centaines de Mo.
+        for pk in list(candidats):
+            jeu = JeuDonneesAnalytiques.objects.get(pk=pk)
+            jeu.save()
+            deplaces += jeu.est_colonnaire
+        self.stdout.write(self.style.SUCCESS(f'{deplaces} jeux de données déplacés hors de la ligne.'))
@@ -0,0 +1,44 @@
+import hashlib
+import json
+
+# Mêmes réglages que `json.dumps`, avec les clés triées : l'ordre des clés n'est
+# pas conservé par jsonb, l'empreinte d'un contenu relu doit rester la même.
+ENCODEUR = json.JSONEncoder(sort_keys=True)
+SEPARATEUR = ', '
+
+
+def _morceaux(donnees):
+    """
+    JSON de `donnees` en morceaux : un par valeur de premier niveau.
+
+    Chaque morceau est produit par l'encodeur C de `json` ; seul le plus
+    gros (une colonne d'un jeu tabulaire) est en mémoire à un instant donné.
+    """
+    if isinstance(donnees, dict):
+        yield '{'
+        for index, cle in enumerate(sorted(donnees)):
+            yield (SEPARATEUR if index else '') + ENCODEUR.encode({cle: donnees[cle]})[1:-1]
+        yield '}'
+    elif isinstance(donnees, (list, tuple)):
+        yield '['
+        for index, valeur in enumerate(donnees):
+            yield (SEPARATEUR if index else '') + ENCODEUR.encode(valeur)
+        yield ']'
+    else:
+        yield ENCODEUR.encode(donnees)
+
+
+def mesurer_donnees(donnees):
+    """
+    Taille (octets du JSON, comme `len(json.dumps(donnees).encode('utf-8'))`) et empreinte SHA-256 de `donnees`.
+
+    Les octets sont comptés et hachés au fil de l'encodage, sans construire
+    le document JSON complet.
+    """
+    empreinte = hashlib.sha256()
+    taille = 0
+    for morceau in _morceaux(donnees):
+        octets = morceau.encode('utf-8')
+        taille += len(octets)
+        empreinte.update(octets)
+    return taille, empreinte.hexdigest()
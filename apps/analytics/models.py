@@ -4,6 +4,8 @@ from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
 from apps.wells.models import Well, Phase, Operation
+from .colonnaire import DonneesColonnaires
+from .mesure import mesurer_donnees
 
 
 class JeuDonneesAnalytiques(models.Model):
@@ -37,11 +39,31 @@ class JeuDonneesAnalytiques(models.Model):
         verbose_name=_('Données'),
         help_text=_('Stockage des données brutes au format JSON')
     )
+    fichier_donnees = models.FileField(
+        upload_to='jeux_donnees/',
+        blank=True,
+        editable=False,
+        verbose_name=_('Fichier des données'),
+        help_text=_('Données tabulaires volumineuses, stockées hors de la ligne au format NumPy .npz compressé')
+    )
+    colonnes_donnees = models.JSONField(
+        default=list,
+        blank=True,
+        editable=False,
+        verbose_name=_('Colonnes du fichier des données')
+    )
     taille_donnees = models.PositiveIntegerField(
         null=True, 
         blank=True,
         verbose_name=_('Taille des données (octets)')
     )
+    empreinte_donnees = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False,
+        verbose_name=_('Empreinte des données'),
+        help_text=_('SHA-256 du contenu JSON (clés triées), pour détecter les contenus inchangés')
+    )
     source_donnees = models.CharField(
         max_length=100,
         blank=True,
@@ -63,6 +85,62 @@ class JeuDonneesAnalytiques(models.Model):
         verbose_name=_('Créé par')
     )
     
+    # Champs réécrits avec le contenu, laissés de côté quand il n'a pas changé
+    CHAMPS_CONTENU = ('donnees', 'fichier_donnees', 'colonnes_donnees', 'taille_donnees', 'empreinte_donnees')
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        # Un jeu colonnaire relu n'a qu'un objet vide dans `donnees` : son contenu est dans le fichier.
+        contenu_charge = 'donnees' not in self.get_deferred_fields() and (self.donnees or not self.est_colonnaire)
+        if contenu_charge and (update_fields is None or 'donnees' in update_fields):
+            taille, empreinte = mesurer_donnees(self.donnees)
+            if not self._state.adding and empreinte == self.empreinte_donnees:
+                # Contenu identique à celui enregistré : ni le JSON ni le fichier ne sont réécrits.
+                if self.est_colonnaire:
+                    self.donnees = {}
+                differes = self.get_deferred_fields()
+                kwargs['update_fields'] = [
+                    champ.name for champ in self._meta.concrete_fields
+                    if not champ.primary_key and champ.name not in self.CHAMPS_CONTENU
+                    and champ.attname not in differes
+                    and (update_fields is None or champ.name in update_fields or champ.attname in update_fields)
+                ]
+            else:
+                self.taille_donnees, self.empreinte_donnees = taille, empreinte
+                if update_fields is not None:
+                    # Le contenu peut changer de stockage (JSON / fichier) : voir `stocker_donnees_colonnaires`.
+                    kwargs['update_fields'] = {*update_fields, *self.CHAMPS_CONTENU}
+        
+        super().save(*args, **kwargs)
+    
+    @property
+    def est_colonnaire(self):
+        """Vrai si les données sont stockées dans `fichier_donnees` plutôt que dans `donnees`."""
+        return bool(self.fichier_donnees)
+    
+    def lecteur_donnees(self):
+        """Lecteur paresseux des données stockées hors de la ligne, ou None si elles sont en JSON."""
+        if not self.est_colonnaire:
+            return None
+        return DonneesColonnaires(self.fichier_donnees, self.colonnes_donnees)
+    
+    def contenu_donnees(self, colonnes=None, lignes=None):
+        """
+        Données au format {colonne: [valeurs]}, quel que soit leur stockage.
+        
+        `colonnes` limite les colonnes lues et `lignes` (slice) les lignes de
+        chacune ; pour un fichier, seules ces parties sont décompressées.
+        """
+        lecteur = self.lecteur_donnees()
+        if lecteur is not None:
+            return {nom: tableau.tolist() for nom, tableau in lecteur.charger(colonnes, lignes).items()}
+        if colonnes is None and lignes is None:
+            return self.donnees
+        if not isinstance(self.donnees, dict):
+            raise TypeError('Les données ne sont pas tabulaires')
+        noms = list(self.donnees) if colonnes is None else colonnes
+        return {nom: self.donnees[nom][lignes or slice(None)] for nom in noms}
+    
     def __str__(self):
         return f"{self.nom_jeu_donnees} - {self.puits.nom}"
     
@@ -156,6 +234,10 @@ class AnalyseEcart(models.Model):
         verbose_name=_('Analyseur')
     )
     
+    # Seuils d'écart absolu (en %) de chaque niveau de criticité, du plus élevé au plus faible
+    SEUILS_CRITICITE = ((50, 'CRITIQUE'), (25, 'ELEVE'), (10, 'MOYEN'))
+    NIVEAU_SOUS_SEUILS = 'FAIBLE'
+    
     def save(self, *args, **kwargs):
         # Calculer l'écart absolu
         self.ecart_absolu = self.valeur_reelle - self.valeur_planifiee
@@ -167,14 +249,10 @@ class AnalyseEcart(models.Model):
         # Déterminer le niveau de criticité automatiquement
         if self.pourcentage_ecart is not None:
             abs_pourcentage = abs(self.pourcentage_ecart)
-            if abs_pourcentage >= 50:
-                self.niveau_criticite = 'CRITIQUE'
-            elif abs_pourcentage >= 25:
-                self.niveau_criticite = 'ELEVE'
-            elif abs_pourcentage >= 10:
-                self.niveau_criticite = 'MOYEN'
-            else:
-                self.niveau_criticite = 'FAIBLE'
+            self.niveau_criticite = next(
+                (niveau for seuil, niveau in self.SEUILS_CRITICITE if abs_pourcentage >= seuil),
+                self.NIVEAU_SOUS_SEUILS
+            )
                 
         super().save(*args, **kwargs)
     
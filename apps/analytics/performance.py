@@ -0,0 +1,81 @@
+from django.core.cache import cache
+from django.db.models import Avg, Count, DecimalField, F, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import TableauBordKPI, AlerteAnalytique
+
+CLE_RESUME_PERFORMANCE = 'analytics:resume_performance:{}'
+DUREE_RESUME_PERFORMANCE = 300
+# Valeur mise en cache pour un puits sans KPI (None n'est pas distinguable d'une absence)
+SANS_KPI = {}
+
+
+def cle_resume_performance(puits_id):
+    return CLE_RESUME_PERFORMANCE.format(puits_id)
+
+
+def calculer_resumes_performance(puits_ids):
+    """
+    Résumés de performance des `puits_ids`, en une requête.
+
+    Les KPIs sont regroupés par puits avec des agrégations conditionnelles
+    (nombre total, excellents, critiques, date du dernier calcul, atteinte
+    moyenne) ; les alertes actives sont comptées par une sous-requête
+    corrélée. Retourne {puits_id: résumé}, sans les puits sans KPI.
+    """
+    alertes_actives = (
+        AlerteAnalytique.objects.filter(puits_id=OuterRef('puits_id'), statut_alerte='NOUVELLE')
+        .order_by()
+        .values('puits_id')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    lignes = (
+        TableauBordKPI.objects.filter(puits_id__in=puits_ids)
+        .order_by()
+        .values('puits_id')
+        .annotate(
+            puits_nom=F('puits__nom'),
+            nombre_kpis=Count('pk'),
+            kpis_excellents=Count('pk', filter=Q(statut_kpi='EXCELLENT')),
+            kpis_critiques=Count('pk', filter=Q(statut_kpi='CRITIQUE')),
+            alertes_actives=Coalesce(Subquery(alertes_actives), 0),
+            derniere_analyse=Max('date_calcul'),
+            score_performance_global=Coalesce(Avg('pourcentage_atteinte'), 0, output_field=DecimalField()),
+        )
+    )
+    return {ligne['puits_id']: ligne for ligne in lignes}
+
+
+def resumes_performance(puits_ids):
+    """
+    Résumés de performance de plusieurs puits, lus depuis le cache.
+
+    Les résumés absents du cache sont calculés ensemble en une requête puis
+    mis en cache par puits. Retourne {puits_id: résumé} pour les puits ayant
+    au moins un KPI.
+    """
+    puits_ids = list(dict.fromkeys(puits_ids))
+    cles = {cle_resume_performance(puits_id): puits_id for puits_id in puits_ids}
+    en_cache = {cles[cle]: resume for cle, resume in cache.get_many(list(cles)).items()}
+
+    manquants = [puits_id for puits_id in puits_ids if puits_id not in en_cache]
+    if manquants:
+        calcules = calculer_resumes_performance(manquants)
+        nouveaux = {puits_id: calcules.get(puits_id, SANS_KPI) for puits_id in manquants}
+        cache.set_many(
+            {cle_resume_performance(puits_id): resume for puits_id, resume in nouveaux.items()},
+            DUREE_RESUME_PERFORMANCE
+        )
+        en_cache.update(nouveaux)
+
+    return {puits_id: en_cache[puits_id] for puits_id in puits_ids if en_cache[puits_id]}
+
+
+def resume_performance(puits_id):
+    """Résumé de performance d'un puits, ou None s'il n'a aucun KPI."""
+    return resumes_performance([puits_id]).get(puits_id)
+
+
+def invalider_resumes_performance(puits_ids):
+    cache.delete_many([cle_resume_performance(puits_id) for puits_id in set(puits_ids)])
@@ -22,15 +22,31 @@ class JeuDonneesAnalytiquesSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'puits', 'puits_nom', 'type_donnees', 'nom_jeu_donnees',
             'donnees', 'taille_donnees', 'taille_donnees_mb', 'source_donnees',
+            'est_colonnaire', 'colonnes_donnees', 'empreinte_donnees',
             'date_creation', 'date_modification', 'cree_par', 'cree_par_nom'
         ]
-        read_only_fields = ['date_creation', 'date_modification', 'taille_donnees_mb']
+        read_only_fields = ['date_creation', 'date_modification', 'taille_donnees_mb',
+                            'est_colonnaire', 'colonnes_donnees', 'empreinte_donnees']
     
     def get_taille_donnees_mb(self, obj):
         """Calculer la taille en MB."""
         if obj.taille_donnees:
             return round(obj.taille_donnees / (1024 * 1024), 2)
         return None
+    
+    def to_representation(self, instance):
+        """Relire les données stockées hors de la ligne pour rendre `donnees` complet."""
+        data = super().to_representation(instance)
+        if 'donnees' in data and instance.est_colonnaire:
+            data['donnees'] = instance.contenu_donnees()
+        return data
+
+
+class JeuDonneesAnalytiquesListeSerializer(JeuDonneesAnalytiquesSerializer):
+    """Serializer des listes de JeuDonneesAnalytiques, sans le contenu `donnees` (différé en base)."""
+    
+    class Meta(JeuDonneesAnalytiquesSerializer.Meta):
+        fields = [field for field in JeuDonneesAnalytiquesSerializer.Meta.fields if field != 'donnees']
 
 
 class AnalyseEcartSerializer(serializers.ModelSerializer):
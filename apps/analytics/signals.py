@@ -1,8 +1,8 @@
-from django.db.models.signals import post_save, pre_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-import json
 import sys
 
 from .models import (
@@ -10,16 +10,55 @@ from .models import (
     IndicateurPerformance, TableauBordKPI, AnalysePredictive,
     AlerteAnalytique
 )
+from .statistiques import invalider_statistiques
+from .performance import invalider_resumes_performance
+from .colonnaire import SEUIL_STOCKAGE_COLONNAIRE, colonnes_tabulaires, ecrire_colonnes
 
 User = get_user_model()
 
 
+def _supprimer_fichier_apres_validation(fichier):
+    storage, nom = fichier.storage, fichier.name
+    transaction.on_commit(lambda: storage.delete(nom))
+
+
 @receiver(pre_save, sender=JeuDonneesAnalytiques)
-def calculer_taille_donnees(sender, instance, **kwargs):
-    """Calculer automatiquement la taille des données JSON."""
-    if instance.donnees:
-        # Calculer la taille en octets du JSON
-        instance.taille_donnees = len(json.dumps(instance.donnees).encode('utf-8'))
+def stocker_donnees_colonnaires(sender, instance, update_fields=None, **kwargs):
+    """
+    Déplace les gros jeux de données tabulaires hors de la ligne.
+
+    Au-delà de SEUIL_STOCKAGE_COLONNAIRE, un contenu {colonne: [valeurs]}
+    est écrit dans un fichier `.npz` compressé (une entrée par colonne) et
+    `donnees` ne garde qu'un objet vide. Un nouveau contenu remplace le
+    fichier précédent, supprimé après la validation. Avec `update_fields`,
+    seul un enregistrement qui inclut `donnees` est traité (`save()` y
+    ajoute alors les champs du fichier).
+    """
+    if update_fields is not None and 'donnees' not in update_fields:
+        return
+    if 'donnees' in instance.get_deferred_fields() or not instance.donnees:
+        return
+
+    colonnes = None
+    if (instance.taille_donnees or 0) > SEUIL_STOCKAGE_COLONNAIRE:
+        colonnes = colonnes_tabulaires(instance.donnees)
+
+    if instance.fichier_donnees:
+        _supprimer_fichier_apres_validation(instance.fichier_donnees)
+    if colonnes is None:
+        instance.fichier_donnees = ''
+        instance.colonnes_donnees = []
+        return
+    fichier, instance.colonnes_donnees = ecrire_colonnes(colonnes)
+    instance.fichier_donnees.save(fichier.name, fichier, save=False)
+    instance.donnees = {}
+
+
+@receiver(post_delete, sender=JeuDonneesAnalytiques)
+def supprimer_fichier_donnees(sender, instance, **kwargs):
+    """Supprime le fichier des données avec le jeu de données."""
+    if instance.fichier_donnees:
+        _supprimer_fichier_apres_validation(instance.fichier_donnees)
 
 
 @receiver(post_save, sender=AnalyseEcart)
@@ -132,3 +171,28 @@ def notifier_alerte_urgente(sender, instance, created, **kwargs):
             except Exception as e:
                 # Log l'erreur mais ne pas faire échouer la création
                 print(f"Erreur lors de l'assignation automatique: {e}")
+
+
+@receiver(post_save, sender=JeuDonneesAnalytiques)
+@receiver(post_save, sender=AnalyseEcart)
+@receiver(post_save, sender=InteractionAssistantIA)
+@receiver(post_save, sender=TableauBordKPI)
+@receiver(post_save, sender=AlerteAnalytique)
+@receiver(post_delete, sender=JeuDonneesAnalytiques)
+@receiver(post_delete, sender=AnalyseEcart)
+@receiver(post_delete, sender=InteractionAssistantIA)
+@receiver(post_delete, sender=TableauBordKPI)
+@receiver(post_delete, sender=AlerteAnalytique)
+def invalider_cache_statistiques(sender, instance, **kwargs):
+    """Invalide les statistiques mises en cache après la validation de l'écriture."""
+    transaction.on_commit(invalider_statistiques)
+
+
+@receiver(post_save, sender=TableauBordKPI)
+@receiver(post_save, sender=AlerteAnalytique)
+@receiver(post_delete, sender=TableauBordKPI)
+@receiver(post_delete, sender=AlerteAnalytique)
+def invalider_resume_performance(sender, instance, **kwargs):
+    """Invalide le résumé de performance mis en cache du puits concerné."""
+    puits_id = instance.puits_id
+    transaction.on_commit(lambda: invalider_resumes_performance([puits_id]))
@@ -0,0 +1,147 @@
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+from kombu.exceptions import OperationalError
+
+from .models import (
+    JeuDonneesAnalytiques, AnalyseEcart, InteractionAssistantIA,
+    TableauBordKPI, AlerteAnalytique
+)
+
+CLE_STATISTIQUES = 'analytics:statistiques'
+CLE_RAFRAICHISSEMENT = 'analytics:statistiques:rafraichissement'
+# Incrémentée à chaque écriture : une entrée calculée pour une génération antérieure est à recalculer.
+CLE_GENERATION = 'analytics:statistiques:generation'
+DUREE_STATISTIQUES = 300
+# Le recalcul en arrière-plan est lancé quand il reste moins de MARGE secondes avant l'expiration.
+MARGE_RAFRAICHISSEMENT = 60
+JOURS_EVOLUTION_KPIS = 30
+
+
+def _requete_statistiques():
+    """
+    Requête unique : chaque table n'est lue qu'une fois.
+
+    Les comptages des alertes (actives et par type) sont des agrégations
+    conditionnelles (`count(*) FILTER (WHERE ...)`) sur un seul parcours ;
+    l'évolution des KPIs est regroupée par jour puis agrégée en JSON.
+    """
+    quote = connection.ops.quote_name
+    types_alerte = [valeur for valeur, _ in AlerteAnalytique.TYPES_ALERTE_CHOICES]
+    comptages = ',\n                   '.join(
+        f"count(*) FILTER (WHERE type_alerte = %s) AS {quote('type_' + type_alerte.lower())}"
+        for type_alerte in types_alerte
+    )
+    return f"""
+        SELECT jeux.total, ecarts.total, ia.total, ia.moyenne, alertes.*, kpis.evolution
+        FROM (SELECT count(*) AS total FROM {quote(JeuDonneesAnalytiques._meta.db_table)}) jeux
+        CROSS JOIN (SELECT count(*) AS total FROM {quote(AnalyseEcart._meta.db_table)}) ecarts
+        CROSS JOIN (
+            SELECT count(*) AS total, avg(score_pertinence) AS moyenne
+            FROM {quote(InteractionAssistantIA._meta.db_table)}
+        ) ia
+        CROSS JOIN (
+            SELECT count(*) FILTER (WHERE statut_alerte = 'NOUVELLE') AS actives,
+                   {comptages}
+            FROM {quote(AlerteAnalytique._meta.db_table)}
+        ) alertes
+        CROSS JOIN (
+            SELECT json_agg(json_build_object('date_calcul__date', jour, 'avg_performance', moyenne) ORDER BY jour)
+                   AS evolution
+            FROM (
+                SELECT (date_calcul AT TIME ZONE %s)::date AS jour, avg(pourcentage_atteinte) AS moyenne
+                FROM {quote(TableauBordKPI._meta.db_table)}
+                WHERE date_calcul >= %s
+                GROUP BY 1
+            ) jours
+        ) kpis
+    """, types_alerte
+
+
+def calculer_statistiques():
+    """Statistiques générales des analyses (même forme que `StatistiquesAnalytiquesSerializer`), en une requête."""
+    requete, types_alerte = _requete_statistiques()
+    depuis = timezone.now() - timedelta(days=JOURS_EVOLUTION_KPIS)
+    with connection.cursor() as cursor:
+        cursor.execute(requete, [*types_alerte, timezone.get_current_timezone_name(), depuis])
+        ligne = cursor.fetchone()
+
+    jeux, ecarts, interactions, moyenne, actives = ligne[:5]
+    comptages = ligne[5:5 + len(types_alerte)]
+    return {
+        'total_jeux_donnees': jeux,
+        'total_analyses_ecart': ecarts,
+        'total_interactions_ia': interactions,
+        'total_alertes_actives': actives,
+        'moyenne_score_pertinence_ia': moyenne or 0,
+        'repartition_types_alertes': {
+            type_alerte: nombre for type_alerte, nombre in zip(types_alerte, comptages) if nombre
+        },
+        'evolution_kpis': ligne[-1] or [],
+    }
+
+
+def _generation():
+    return cache.get_or_set(CLE_GENERATION, 0, None)
+
+
+def rafraichir_statistiques():
+    """Recalcule les statistiques et les remet en cache pour DUREE_STATISTIQUES secondes."""
+    # Lue avant le calcul : une écriture validée pendant le calcul rend l'entrée aussitôt périmée.
+    generation = _generation()
+    statistiques = calculer_statistiques()
+    cache.set(CLE_STATISTIQUES, {
+        'statistiques': statistiques,
+        'rafraichir_a': time.time() + DUREE_STATISTIQUES - MARGE_RAFRAICHISSEMENT,
+        'generation': generation,
+    }, DUREE_STATISTIQUES)
+    cache.delete(CLE_RAFRAICHISSEMENT)
+    return statistiques
+
+
+def _planifier_rafraichissement():
+    # Un seul recalcul à la fois, tous workers confondus.
+    if not cache.add(CLE_RAFRAICHISSEMENT, True, MARGE_RAFRAICHISSEMENT):
+        return
+    from .tasks import rafraichir_statistiques_analytiques
+    try:
+        rafraichir_statistiques_analytiques.apply_async(retry=False)
+    except OperationalError:
+        # Broker indisponible : recalcul immédiat plutôt qu'une entrée qui expire.
+        rafraichir_statistiques()
+
+
+def statistiques_analytiques():
+    """
+    Statistiques lues depuis le cache.
+
+    Peu avant l'expiration, l'entrée encore valide est servie et le recalcul
+    est confié à une tâche Celery : les tableaux muraux qui interrogent
+    l'endpoint en continu ne voient pas d'expiration. Il en va de même
+    après une écriture (génération changée). Seule une entrée absente
+    (premier appel, expiration) est recalculée pendant la requête.
+    """
+    valeurs = cache.get_many([CLE_STATISTIQUES, CLE_GENERATION])
+    entree = valeurs.get(CLE_STATISTIQUES)
+    if entree is None:
+        return rafraichir_statistiques()
+    if time.time() >= entree['rafraichir_a'] or entree.get('generation') != valeurs.get(CLE_GENERATION, 0):
+        _planifier_rafraichissement()
+    return entree['statistiques']
+
+
+def invalider_statistiques():
+    """
+    Marque les statistiques en cache comme à recalculer.
+
+    L'entrée reste servie jusqu'au recalcul en arrière-plan, sans pic de
+    recalculs simultanés ; un recalcul déjà en cours, commencé avant
+    l'écriture, enregistre une génération dépassée et sera refait.
+    """
+    try:
+        cache.incr(CLE_GENERATION)
+    except ValueError:
+        cache.set(CLE_GENERATION, 1, None)
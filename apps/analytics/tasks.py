@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .statistiques import rafraichir_statistiques
+
+
+@shared_task(ignore_result=True)
+def rafraichir_statistiques_analytiques():
+    """Recalcule en arrière-plan les statistiques analytiques mises en cache."""
+    rafraichir_statistiques()
@@ -4,13 +4,30 @@ from django.core.exceptions import ValidationError
 from decimal import Decimal
 from datetime import date, datetime, timedelta
 from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+import os
+import tempfile
+from unittest.mock import patch
 
-from apps.wells.models import Well, Phase, Operation
+from apps.wells.models import Well, Forage, Phase, Operation
 from .models import (
     JeuDonneesAnalytiques, AnalyseEcart, InteractionAssistantIA,
     IndicateurPerformance, AnalyseReservoir, TableauBordKPI,
     AnalysePredictive, AlerteAnalytique
 )
+from .ecarts import analyser_phases, calculer_ecarts, PROFONDEUR, DUREE
+from .statistiques import CLE_GENERATION, CLE_STATISTIQUES, calculer_statistiques, statistiques_analytiques
+from .tasks import rafraichir_statistiques_analytiques
+from .performance import cle_resume_performance, resume_performance, resumes_performance
+from .colonnaire import SEUIL_STOCKAGE_COLONNAIRE
+from .mesure import mesurer_donnees
+import hashlib
+import json
 
 User = get_user_model()
 
@@ -472,3 +489,391 @@ class AnalyticsIntegrationTestCase(TransactionTestCase):
         # Vérifier les relations
         self.assertEqual(alerte.puits, jeu_donnees.puits)
         self.assertEqual(interaction.puits_associe, prediction.puits)
+
+
+class AnalyseEcartMasseTestCase(TestCase):
+    """Tests pour l'analyse des écarts en masse des phases."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='analyste_masse',
+            email='masse@test.com',
+            password='motdepasse123'
+        )
+        self.puits = Well.objects.create(nom='Puits Masse')
+        forage = Forage.objects.create(puit=self.puits)
+        self.critique = Phase.objects.create(
+            forage=forage, numero_phase=1, diametre=Phase.Diametre.POUCES_26,
+            profondeur_prevue=Decimal('1000.00'), profondeur_reelle=Decimal('1600.50'),
+            date_debut_prevue=date(2024, 1, 1), date_fin_prevue=date(2024, 1, 11),
+            date_debut_reelle=date(2024, 1, 1), date_fin_reelle=date(2024, 1, 15)
+        )
+        self.faible = Phase.objects.create(
+            forage=forage, numero_phase=2, diametre=Phase.Diametre.POUCES_16,
+            profondeur_prevue=Decimal('2000.00'), profondeur_reelle=Decimal('1950.00')
+        )
+        Phase.objects.create(
+            forage=forage, numero_phase=3, diametre=Phase.Diametre.POUCES_8_5,
+            profondeur_prevue=Decimal('3000.00')
+        )
+    
+    def test_calcul_identique_au_modele(self):
+        """Test que le calcul vectorisé suit les règles de AnalyseEcart.save()."""
+        ecarts, pourcentages, niveaux = calculer_ecarts([100, 100, 100, 0], [50, 75, 95, 10])
+        self.assertEqual(ecarts.tolist(), [-50, -25, -5, 10])
+        self.assertEqual(pourcentages[:3].tolist(), [-50, -25, -5])
+        self.assertEqual(niveaux.tolist(), ['CRITIQUE', 'ELEVE', 'FAIBLE', 'MOYEN'])
+    
+    def test_analyse_des_phases(self):
+        """Test que chaque indicateur renseigné produit une analyse d'écart."""
+        analyses, alertes = analyser_phases(analyseur=self.user)
+        self.assertEqual((analyses, alertes), (3, 1))
+        
+        profondeur = AnalyseEcart.objects.get(phase=self.critique, type_indicateur=PROFONDEUR)
+        self.assertEqual(profondeur.ecart_absolu, Decimal('600.5000'))
+        self.assertEqual(profondeur.pourcentage_ecart, Decimal('60.0500'))
+        self.assertEqual(profondeur.niveau_criticite, 'CRITIQUE')
+        
+        duree = AnalyseEcart.objects.get(phase=self.critique, type_indicateur=DUREE)
+        self.assertEqual((duree.valeur_planifiee, duree.valeur_reelle), (Decimal('10'), Decimal('14')))
+        self.assertEqual(duree.niveau_criticite, 'ELEVE')
+        
+        self.assertEqual(AnalyseEcart.objects.get(phase=self.faible).niveau_criticite, 'FAIBLE')
+    
+    def test_alertes_critiques_en_masse(self):
+        """Test que les écarts critiques sont alertés par un second insert groupé."""
+        with CaptureQueriesContext(connection) as context:
+            analyser_phases(analyseur=self.user)
+        insertions = [query for query in context.captured_queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(insertions), 2)
+        
+        alerte = AlerteAnalytique.objects.get()
+        self.assertEqual(alerte.puits, self.puits)
+        self.assertEqual(alerte.type_alerte, 'ECART_IMPORTANT')
+        self.assertEqual(alerte.assigne_a, self.user)
+        self.assertEqual(alerte.valeur_declenchante, Decimal('1600.5000'))
+
+
+class StatistiquesAnalytiquesTestCase(TestCase):
+    """Tests pour les statistiques analytiques agrégées et mises en cache."""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='statistiques',
+            email='statistiques@test.com',
+            password='motdepasse123'
+        )
+        self.puits = Well.objects.create(nom='Puits Statistiques')
+        JeuDonneesAnalytiques.objects.create(
+            puits=self.puits, type_donnees='PRODUCTION', nom_jeu_donnees='Production', donnees={'debit': [1, 2]}
+        )
+        for type_alerte, statut_alerte in [('SEUIL_DEPASSE', 'NOUVELLE'), ('SEUIL_DEPASSE', 'RESOLUE'),
+                                           ('ANOMALIE_DETECTEE', 'NOUVELLE')]:
+            self.creer_alerte(type_alerte, statut_alerte)
+        TableauBordKPI.objects.create(
+            puits=self.puits, nom_kpi='Production journalière', categorie_kpi='PRODUCTION',
+            valeur_actuelle=Decimal('950.00'), unite_mesure='m³/j', objectif_cible=Decimal('1000.00'),
+            periode_reference='Janvier 2024', calcule_par=self.user
+        )
+    
+    def creer_alerte(self, type_alerte, statut_alerte='NOUVELLE'):
+        return AlerteAnalytique.objects.create(
+            puits=self.puits, type_alerte=type_alerte, niveau_urgence='INFO', titre_alerte=type_alerte,
+            description='Test', source_donnees='Test', statut_alerte=statut_alerte
+        )
+    
+    def test_une_seule_requete(self):
+        """Test que toutes les statistiques sont calculées en une requête."""
+        with self.assertNumQueries(1):
+            statistiques = calculer_statistiques()
+        
+        self.assertEqual(statistiques['total_jeux_donnees'], 1)
+        self.assertEqual(statistiques['total_analyses_ecart'], 0)
+        self.assertEqual(statistiques['total_interactions_ia'], 0)
+        self.assertEqual(statistiques['moyenne_score_pertinence_ia'], 0)
+        self.assertEqual(statistiques['total_alertes_actives'], 2)
+        self.assertEqual(statistiques['repartition_types_alertes'], {'SEUIL_DEPASSE': 2, 'ANOMALIE_DETECTEE': 1})
+        evolution, = statistiques['evolution_kpis']
+        self.assertEqual(evolution['date_calcul__date'], timezone.localdate().isoformat())
+        self.assertEqual(evolution['avg_performance'], 95)
+    
+    def test_statistiques_en_cache(self):
+        """Test que les appels suivants sont servis depuis le cache."""
+        statistiques_analytiques()
+        with self.assertNumQueries(0):
+            self.assertEqual(statistiques_analytiques()['total_alertes_actives'], 2)
+    
+    def test_invalidation_par_signal(self):
+        """Test qu'une écriture validée fait recalculer les statistiques en arrière-plan, sans vider le cache."""
+        statistiques_analytiques()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.creer_alerte('ECART_IMPORTANT')
+        self.assertIsNotNone(cache.get(CLE_STATISTIQUES))
+        
+        with patch.object(rafraichir_statistiques_analytiques, 'apply_async') as apply_async:
+            with self.assertNumQueries(0):
+                statistiques = statistiques_analytiques()
+            statistiques_analytiques()
+        self.assertNotIn('ECART_IMPORTANT', statistiques['repartition_types_alertes'])
+        apply_async.assert_called_once()
+        
+        rafraichir_statistiques_analytiques()
+        self.assertEqual(statistiques_analytiques()['repartition_types_alertes']['ECART_IMPORTANT'], 1)
+    
+    def test_rafraichissement_concurrent_perime(self):
+        """Test qu'un recalcul commencé avant une écriture ne masque pas cette écriture."""
+        generation = cache.get_or_set(CLE_GENERATION, 0, None)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.creer_alerte('ECART_IMPORTANT')
+        # Recalcul lancé avant l'écriture, qui enregistre son résultat après l'invalidation.
+        with patch('apps.analytics.statistiques._generation', return_value=generation):
+            rafraichir_statistiques_analytiques()
+        
+        with patch.object(rafraichir_statistiques_analytiques, 'apply_async') as apply_async:
+            statistiques_analytiques()
+        apply_async.assert_called_once()
+    
+    def test_rafraichissement_en_arriere_plan(self):
+        """Test que la tâche de rafraîchissement remplace l'entrée et repousse sa prochaine échéance."""
+        statistiques_analytiques()
+        entree = cache.get(CLE_STATISTIQUES)
+        AlerteAnalytique.objects.filter(statut_alerte='NOUVELLE').update(statut_alerte='EN_COURS')
+        
+        rafraichir_statistiques_analytiques()
+        rafraichie = cache.get(CLE_STATISTIQUES)
+        self.assertEqual(rafraichie['statistiques']['total_alertes_actives'], 0)
+        self.assertGreaterEqual(rafraichie['rafraichir_a'], entree['rafraichir_a'])
+
+
+class ResumePerformanceTestCase(TestCase):
+    """Tests pour le service de résumé de performance par puits."""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='performance',
+            email='performance@test.com',
+            password='motdepasse123'
+        )
+        self.puits = Well.objects.create(nom='Puits Performance')
+        self.autre = Well.objects.create(nom='Puits Voisin')
+        self.sans_kpi = Well.objects.create(nom='Puits Sans KPI')
+        for puits, valeurs in [(self.puits, ['1250.00', '950.00', '400.00']), (self.autre, ['1000.00'])]:
+            for valeur in valeurs:
+                TableauBordKPI.objects.create(
+                    puits=puits, nom_kpi=f'KPI {valeur}', categorie_kpi='PRODUCTION',
+                    valeur_actuelle=Decimal(valeur), unite_mesure='unité', objectif_cible=Decimal('1000.00'),
+                    periode_reference='Test', calcule_par=self.user
+                )
+        AlerteAnalytique.objects.create(
+            puits=self.puits, type_alerte='SEUIL_DEPASSE', niveau_urgence='INFO', titre_alerte='Seuil',
+            description='Test', source_donnees='Test'
+        )
+    
+    def test_resume_en_une_requete(self):
+        """Test que le résumé d'un puits est calculé en une requête."""
+        with self.assertNumQueries(1):
+            resume = resume_performance(self.puits.pk)
+        
+        self.assertEqual(resume['puits_nom'], 'Puits Performance')
+        self.assertEqual(resume['nombre_kpis'], 3)
+        self.assertEqual(resume['kpis_excellents'], 1)
+        # Le KPI critique a déclenché une alerte de performance en plus de l'alerte de seuil.
+        self.assertEqual(resume['kpis_critiques'], 1)
+        self.assertEqual(resume['alertes_actives'], 2)
+        self.assertAlmostEqual(resume['score_performance_global'], Decimal('86.67'), places=2)
+        self.assertEqual(resume['derniere_analyse'], TableauBordKPI.objects.filter(puits=self.puits).first().date_calcul)
+    
+    def test_resumes_en_lot(self):
+        """Test que plusieurs résumés sont calculés ensemble puis servis depuis le cache."""
+        puits_ids = [self.puits.pk, self.autre.pk, self.sans_kpi.pk]
+        with self.assertNumQueries(1):
+            resumes = resumes_performance(puits_ids)
+        self.assertEqual(set(resumes), {self.puits.pk, self.autre.pk})
+        self.assertEqual(resumes[self.autre.pk]['alertes_actives'], 0)
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(resumes_performance(puits_ids), resumes)
+            self.assertIsNone(resume_performance(self.sans_kpi.pk))
+    
+    def test_invalidation_par_puits(self):
+        """Test qu'une écriture n'invalide que le résumé de son puits."""
+        resumes_performance([self.puits.pk, self.autre.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            AlerteAnalytique.objects.create(
+                puits=self.autre, type_alerte='ANOMALIE_DETECTEE', niveau_urgence='INFO', titre_alerte='Anomalie',
+                description='Test', source_donnees='Test'
+            )
+        self.assertIsNotNone(cache.get(cle_resume_performance(self.puits.pk)))
+        self.assertIsNone(cache.get(cle_resume_performance(self.autre.pk)))
+        self.assertEqual(resume_performance(self.autre.pk)['alertes_actives'], 1)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class JeuDonneesColonnairesTestCase(TestCase):
+    """Tests pour le stockage colonnaire des gros jeux de données."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='colonnaire',
+            email='colonnaire@test.com',
+            password='motdepasse123'
+        )
+        self.puits = Well.objects.create(nom='Puits Colonnaire')
+        self.volumineuses = {
+            'temps': list(range(100000)),
+            'pression': [round(i * 0.25, 2) for i in range(100000)],
+            'capteur': ['P1'] * 100000,
+        }
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+    
+    def creer_jeu(self, donnees):
+        with self.captureOnCommitCallbacks(execute=True):
+            return JeuDonneesAnalytiques.objects.create(
+                puits=self.puits, type_donnees='PRODUCTION', nom_jeu_donnees='Capteurs',
+                donnees=donnees, cree_par=self.user
+            )
+    
+    def test_gros_jeu_stocke_hors_ligne(self):
+        """Test qu'un gros jeu tabulaire est écrit dans un fichier et relu à l'identique."""
+        jeu = self.creer_jeu(self.volumineuses)
+        self.assertGreater(jeu.taille_donnees, SEUIL_STOCKAGE_COLONNAIRE)
+        
+        jeu.refresh_from_db()
+        self.assertTrue(jeu.est_colonnaire)
+        self.assertEqual(jeu.donnees, {})
+        self.assertTrue(os.path.exists(jeu.fichier_donnees.path))
+        self.assertEqual([colonne['nom'] for colonne in jeu.colonnes_donnees], ['temps', 'pression', 'capteur'])
+        self.assertEqual(jeu.contenu_donnees(), self.volumineuses)
+        self.assertEqual(jeu.contenu_donnees(['pression'], slice(10, 13)), {'pression': [2.5, 2.75, 3.0]})
+    
+    def test_petit_jeu_reste_en_json(self):
+        """Test qu'un petit jeu et un gros jeu non tabulaire restent dans `donnees`."""
+        petit = self.creer_jeu({'production': [100, 120, 110]})
+        self.assertFalse(petit.est_colonnaire)
+        self.assertEqual(petit.contenu_donnees(lignes=slice(1, None)), {'production': [120, 110]})
+        
+        mixte = self.creer_jeu({'valeurs': [None] + self.volumineuses['pression'] * 2})
+        mixte.refresh_from_db()
+        self.assertFalse(mixte.est_colonnaire)
+        self.assertEqual(len(mixte.donnees['valeurs']), 200001)
+    
+    def test_remplacement_supprime_ancien_fichier(self):
+        """Test qu'un contenu réduit revient en JSON et que l'ancien fichier est supprimé."""
+        jeu = self.creer_jeu(self.volumineuses)
+        chemin = jeu.fichier_donnees.path
+        
+        jeu.donnees = {'production': [1, 2, 3]}
+        with self.captureOnCommitCallbacks(execute=True):
+            jeu.save()
+        jeu.refresh_from_db()
+        self.assertFalse(jeu.est_colonnaire)
+        self.assertEqual(jeu.colonnes_donnees, [])
+        self.assertFalse(os.path.exists(chemin))
+    
+    def test_update_fields_change_de_stockage(self):
+        """Test que `save(update_fields=['donnees'])` déplace le contenu entre JSON et fichier."""
+        jeu = self.creer_jeu(self.volumineuses)
+        chemin = jeu.fichier_donnees.path
+        
+        jeu = JeuDonneesAnalytiques.objects.get(pk=jeu.pk)
+        jeu.donnees = {'production': [1, 2, 3]}
+        with self.captureOnCommitCallbacks(execute=True):
+            jeu.save(update_fields=['donnees'])
+        jeu.refresh_from_db()
+        self.assertFalse(jeu.est_colonnaire)
+        self.assertEqual(jeu.contenu_donnees(), {'production': [1, 2, 3]})
+        self.assertFalse(os.path.exists(chemin))
+        
+        jeu.donnees = self.volumineuses
+        jeu.save(update_fields=['donnees'])
+        jeu.refresh_from_db()
+        self.assertTrue(jeu.est_colonnaire)
+        self.assertEqual(jeu.donnees, {})
+        self.assertEqual(jeu.contenu_donnees(['temps'], slice(3, 5)), {'temps': [3, 4]})
+    
+    def test_api_liste_detail_et_extrait(self):
+        """Test que la liste omet le contenu, que le détail le rend complet et que l'extrait le découpe."""
+        jeu = self.creer_jeu(self.volumineuses)
+        
+        response = self.client.get(reverse('analytics:jeudonneesanalytiques-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('donnees', response.data[0])
+        
+        response = self.client.get(reverse('analytics:jeudonneesanalytiques-detail', args=[jeu.pk]))
+        self.assertTrue(response.data['est_colonnaire'])
+        self.assertEqual(response.data['donnees']['temps'][-1], 99999)
+        
+        url = reverse('analytics:jeudonneesanalytiques-donnees', args=[jeu.pk])
+        response = self.client.get(url, {'colonnes': 'temps,capteur', 'debut': 5, 'fin': 7})
+        self.assertEqual(response.data, {'temps': [5, 6], 'capteur': ['P1', 'P1']})
+        self.assertEqual(self.client.get(url, {'colonnes': 'inconnue'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'debut': '-1'}).status_code, 400)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class EmpreinteDonneesTestCase(TestCase):
+    """Tests pour la mesure en flux et l'empreinte des jeux de données."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='empreinte',
+            email='empreinte@test.com',
+            password='motdepasse123'
+        )
+        self.puits = Well.objects.create(nom='Puits Empreinte')
+    
+    def creer_jeu(self, donnees):
+        with self.captureOnCommitCallbacks(execute=True):
+            return JeuDonneesAnalytiques.objects.create(
+                puits=self.puits, type_donnees='FORAGE', nom_jeu_donnees='Logs',
+                donnees=donnees, cree_par=self.user
+            )
+    
+    def test_mesure_identique_a_json_dumps(self):
+        """Test que la taille et l'empreinte sont celles du JSON complet, quel que soit l'ordre des clés."""
+        donnees = {'profondeur': [0, 1000.5, None], 'unite': 'mètre', 'meta': {'b': True, 'a': []}}
+        attendu = json.dumps(donnees, sort_keys=True).encode('utf-8')
+        self.assertEqual(mesurer_donnees(donnees), (len(attendu), hashlib.sha256(attendu).hexdigest()))
+        self.assertEqual(mesurer_donnees(dict(reversed(list(donnees.items())))), mesurer_donnees(donnees))
+        self.assertEqual(mesurer_donnees([]), (2, hashlib.sha256(b'[]').hexdigest()))
+        
+        jeu = self.creer_jeu(donnees)
+        self.assertEqual(jeu.taille_donnees, len(json.dumps(donnees).encode('utf-8')))
+        self.assertEqual(jeu.empreinte_donnees, hashlib.sha256(attendu).hexdigest())
+    
+    def test_contenu_inchange_non_reecrit(self):
+        """Test qu'un contenu inchangé n'est pas réécrit mais que les autres champs le sont."""
+        jeu = self.creer_jeu({'profondeur': [0, 1000, 2000]})
+        jeu = JeuDonneesAnalytiques.objects.get(pk=jeu.pk)
+        jeu.nom_jeu_donnees = 'Logs renommés'
+        with CaptureQueriesContext(connection) as requetes:
+            jeu.save()
+        mise_a_jour = requetes.captured_queries[-1]['sql']
+        self.assertIn('"nom_jeu_donnees"', mise_a_jour)
+        self.assertNotIn('"donnees"', mise_a_jour)
+        
+        jeu.donnees = {'profondeur': [0, 1000, 2500]}
+        jeu.save(update_fields=['donnees'])
+        jeu.refresh_from_db()
+        self.assertEqual(jeu.nom_jeu_donnees, 'Logs renommés')
+        self.assertEqual(jeu.donnees, {'profondeur': [0, 1000, 2500]})
+        self.assertEqual(jeu.empreinte_donnees, mesurer_donnees(jeu.donnees)[1])
+    
+    def test_fichier_inchange_non_reecrit(self):
+        """Test qu'un gros jeu renvoyé à l'identique garde son fichier."""
+        donnees = {'temps': list(range(150000)), 'debit': [i / 8 for i in range(150000)]}
+        jeu = self.creer_jeu(donnees)
+        fichier = jeu.fichier_donnees.name
+        self.assertTrue(jeu.est_colonnaire)
+        
+        jeu = JeuDonneesAnalytiques.objects.get(pk=jeu.pk)
+        jeu.donnees = jeu.contenu_donnees()
+        with self.captureOnCommitCallbacks(execute=True):
+            jeu.save()
+        jeu.refresh_from_db()
+        self.assertEqual(jeu.fichier_donnees.name, fichier)
+        self.assertEqual(jeu.donnees, {})
+        self.assertEqual(jeu.contenu_donnees(['debit'], slice(8, 9)), {'debit': [1.0]})
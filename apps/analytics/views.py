@@ -2,9 +2,8 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q, Count, Avg
+from django.db.models import Q, Count
 from django.utils import timezone
-from datetime import timedelta
 
 from .models import (
     JeuDonneesAnalytiques, AnalyseEcart, InteractionAssistantIA,
@@ -12,12 +11,14 @@ from .models import (
     AnalysePredictive, AlerteAnalytique
 )
 from .serializers import (
-    JeuDonneesAnalytiquesSerializer, AnalyseEcartSerializer,
+    JeuDonneesAnalytiquesSerializer, JeuDonneesAnalytiquesListeSerializer, AnalyseEcartSerializer,
     InteractionAssistantIASerializer, IndicateurPerformanceSerializer,
     AnalyseReservoirSerializer, TableauBordKPISerializer,
     AnalysePredictiveSerializer, AlerteAnalytiqueSerializer,
     StatistiquesAnalytiquesSerializer, ResumePerformanceSerializer
 )
+from .statistiques import statistiques_analytiques
+from .performance import resume_performance, resumes_performance
 
 
 class JeuDonneesAnalytiquesViewSet(viewsets.ModelViewSet):
@@ -30,9 +31,50 @@ class JeuDonneesAnalytiquesViewSet(viewsets.ModelViewSet):
     ordering_fields = ['date_creation', 'nom_jeu_donnees']
     ordering = ['-date_creation']
 
+    def get_queryset(self):
+        queryset = self.queryset.select_related('puits', 'cree_par')
+        if self.action == 'list':
+            # Le contenu n'est pas sérialisé dans les listes : ne pas le lire (ni le décompresser).
+            queryset = queryset.defer('donnees')
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return JeuDonneesAnalytiquesListeSerializer
+        return JeuDonneesAnalytiquesSerializer
+
     def perform_create(self, serializer):
         serializer.save(cree_par=self.request.user)
 
+    @action(detail=True, methods=['get'])
+    def donnees(self, request, pk=None):
+        """Extrait du jeu de données : ?colonnes=a,b pour certaines colonnes, ?debut=&fin= pour une plage de lignes."""
+        jeu = self.get_object()
+        colonnes = request.query_params.get('colonnes')
+        colonnes = [nom.strip() for nom in colonnes.split(',') if nom.strip()] if colonnes else None
+        bornes = [request.query_params.get(nom) for nom in ('debut', 'fin')]
+        if not all(borne is None or borne.isdigit() for borne in bornes):
+            return Response(
+                {'error': 'debut and fin must be non-negative integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        debut, fin = [None if borne is None else int(borne) for borne in bornes]
+        lignes = None if debut is None and fin is None else slice(debut, fin)
+
+        try:
+            contenu = jeu.contenu_donnees(colonnes, lignes)
+        except KeyError as erreur:
+            return Response(
+                {'error': f'Unknown column {erreur}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except TypeError:
+            return Response(
+                {'error': 'This dataset is not tabular: columns and rows cannot be selected'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(contenu)
+
 
 class AnalyseEcartViewSet(viewsets.ModelViewSet):
     """ViewSet pour AnalyseEcart."""
@@ -110,6 +152,7 @@ class TableauBordKPIViewSet(viewsets.ModelViewSet):
     search_fields = ['nom_kpi']
     ordering_fields = ['date_calcul', 'pourcentage_atteinte']
     ordering = ['-date_calcul']
+    max_resumes_performance = 200
 
     def perform_create(self, serializer):
         serializer.save(calcule_par=self.request.user)
@@ -123,34 +166,41 @@ class TableauBordKPIViewSet(viewsets.ModelViewSet):
                 {'error': 'puits_id parameter required'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if not puits_id.isdigit():
+            return Response(
+                {'error': 'puits_id must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        kpis = self.queryset.filter(puits_id=puits_id)
-        
-        if not kpis.exists():
+        resume = resume_performance(int(puits_id))
+        if resume is None:
             return Response(
                 {'error': 'No KPIs found for this well'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        resume = {
-            'puits_id': int(puits_id),
-            'puits_nom': kpis.first().puits.nom,
-            'nombre_kpis': kpis.count(),
-            'kpis_excellents': kpis.filter(statut_kpi='EXCELLENT').count(),
-            'kpis_critiques': kpis.filter(statut_kpi='CRITIQUE').count(),
-            'alertes_actives': AlerteAnalytique.objects.filter(
-                puits_id=puits_id, 
-                statut_alerte='NOUVELLE'
-            ).count(),
-            'derniere_analyse': kpis.first().date_calcul,
-            'score_performance_global': kpis.aggregate(
-                avg_atteinte=Avg('pourcentage_atteinte')
-            )['avg_atteinte'] or 0
-        }
-        
         serializer = ResumePerformanceSerializer(resume)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def resumes_performance(self, request):
+        """Résumés des performances de plusieurs puits (?puits_ids=1,2,3) ; les puits sans KPI sont omis."""
+        valeurs = [valeur.strip() for valeur in request.query_params.get('puits_ids', '').split(',') if valeur.strip()]
+        if not valeurs or not all(valeur.isdigit() for valeur in valeurs):
+            return Response(
+                {'error': 'puits_ids parameter required (comma-separated integers)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(valeurs) > self.max_resumes_performance:
+            return Response(
+                {'error': f'At most {self.max_resumes_performance} wells per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        resumes = resumes_performance([int(valeur) for valeur in valeurs])
+        serializer = ResumePerformanceSerializer(list(resumes.values()), many=True)
+        return Response(serializer.data)
+
 
 class AnalysePredictiveViewSet(viewsets.ModelViewSet):
     """ViewSet pour AnalysePredictive."""
@@ -191,30 +241,6 @@ class AlerteAnalytiqueViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def statistiques(self, request):
-        """Statistiques générales des analyses."""
-        stats = {
-            'total_jeux_donnees': JeuDonneesAnalytiques.objects.count(),
-            'total_analyses_ecart': AnalyseEcart.objects.count(),
-            'total_interactions_ia': InteractionAssistantIA.objects.count(),
-            'total_alertes_actives': AlerteAnalytique.objects.filter(
-                statut_alerte='NOUVELLE'
-            ).count(),
-            'moyenne_score_pertinence_ia': InteractionAssistantIA.objects.aggregate(
-                avg_score=Avg('score_pertinence')
-            )['avg_score'] or 0,
-            'repartition_types_alertes': dict(
-                AlerteAnalytique.objects.values('type_alerte').annotate(
-                    count=Count('id')
-                ).values_list('type_alerte', 'count')
-            ),
-            'evolution_kpis': list(
-                TableauBordKPI.objects.filter(
-                    date_calcul__gte=timezone.now() - timedelta(days=30)
-                ).values('date_calcul__date').annotate(
-                    avg_performance=Avg('pourcentage_atteinte')
-                ).order_by('date_calcul__date')
-            )
-        }
-        
-        serializer = StatistiquesAnalytiquesSerializer(stats)
+        """Statistiques générales des analyses (une requête, servies depuis le cache)."""
+        serializer = StatistiquesAnalytiquesSerializer(statistiques_analytiques())
         return Response(serializer.data)
@@ -5,3 +5,7 @@ class WellsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.wells'
     verbose_name = 'Wells Management'
+    
+    def ready(self):
+        """Import signals when app is ready."""
+        import apps.wells.signals
@@ -0,0 +1,64 @@
+import hashlib
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.cache import cache
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+from .models import Well
+from .region_models import Region
+
+CLE_AUTOCOMPLETION = 'wells:autocomplete:{}:{}:{}'
+# Durée courte : les préfixes populaires (saisie en cours) sont servis depuis
+# le cache, sans invalidation explicite à chaque écriture sur les puits.
+DUREE_AUTOCOMPLETION = 60
+
+
+def normaliser_terme(terme):
+    return ' '.join(terme.split()).lower()
+
+
+def cle_autocompletion(terme, limite, inclure_archives):
+    empreinte = hashlib.md5(terme.encode('utf-8')).hexdigest()
+    return CLE_AUTOCOMPLETION.format('all' if inclure_archives else 'active', limite, empreinte)
+
+
+def rechercher_puits(terme, limite, inclure_archives=False):
+    """
+    Les `limite` puits les plus proches de `terme` par similarité de trigrammes.
+
+    Un puits correspond si `terme` est proche d'un mot de son `nom`, de son
+    `name` ou du code de sa région (opérateur `<%` de pg_trgm). Chaque
+    condition est servie par un index GIN `gin_trgm_ops` ; les régions,
+    peu nombreuses, sont résolues par une sous-requête pour que le filtre
+    reste un BitmapOr d'index sur la table des puits.
+    """
+    regions = Region.objects.filter(code__trigram_word_similar=terme).values('pk')
+    puits = Well.objects.filter(
+        Q(nom__trigram_word_similar=terme) | Q(name__trigram_word_similar=terme) | Q(region__in=regions)
+    )
+    if not inclure_archives:
+        puits = puits.filter(is_archived=False)
+    return list(
+        puits.annotate(
+            region_code=F('region__code'),
+            score=Greatest(
+                TrigramWordSimilarity(terme, 'nom'),
+                TrigramWordSimilarity(terme, 'name'),
+                TrigramWordSimilarity(terme, 'region__code'),
+            ),
+        )
+        .order_by('-score', 'nom', 'pk')
+        .values('id', 'nom', 'name', 'region_code', 'score')[:limite]
+    )
+
+
+def suggerer_puits(terme, limite=10, inclure_archives=False):
+    """Suggestions d'autocomplétion pour `terme`, lues depuis le cache si la saisie est récente."""
+    terme = normaliser_terme(terme)
+    cle = cle_autocompletion(terme, limite, inclure_archives)
+    suggestions = cache.get(cle)
+    if suggestions is None:
+        suggestions = rechercher_puits(terme, limite, inclure_archives)
+        cache.set(cle, suggestions, DUREE_AUTOCOMPLETION)
+    return suggestions
@@ -0,0 +1,74 @@
+import json
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from apps.alerts.models import JournalAction
+
+from .models import Well, StatutPuit
+from .rollups import invalider_synthese_regions
+from .tree import cle_arbre
+
+ARCHIVER = 'archive'
+DESARCHIVER = 'unarchive'
+CHANGER_STATUT = 'status'
+ACTIONS_MASSE = (ARCHIVER, DESARCHIVER, CHANGER_STATUT)
+
+LIBELLES = {
+    ARCHIVER: 'Archivage de puits en masse',
+    DESARCHIVER: 'Désarchivage de puits en masse',
+    CHANGER_STATUT: 'Changement de statut de puits en masse',
+}
+
+
+def _invalider_caches(puits_ids):
+    cache.delete_many([cle_arbre(puit_id) for puit_id in puits_ids])
+    invalider_synthese_regions()
+
+
+def appliquer_action_masse(puits, action, utilisateur, statut=None, criteres=None,
+                           adresse_ip=None, user_agent=''):
+    """
+    Archive, désarchive ou change le statut des `puits` par un seul UPDATE ensembliste.
+
+    Seuls les puits réellement modifiés sont touchés (un puits déjà archivé
+    n'est pas réarchivé). Dans une même transaction, leurs lignes sont
+    verrouillées dans l'ordre des clés, mises à jour (avec `last_updated_by`
+    et `last_updated`, que `QuerySet.update()` n'avance pas seul, pour les
+    validateurs ETag) et un unique `JournalAction` récapitulatif est écrit.
+    Les caches des arbres et de la synthèse des régions sont invalidés après
+    la validation. Retourne (identifiants modifiés, entrée du journal).
+    """
+    maintenant = timezone.now()
+    valeurs = {'last_updated_by': utilisateur, 'last_updated': maintenant, 'derniere_maj': maintenant}
+    if action == ARCHIVER:
+        puits = puits.filter(is_archived=False)
+        valeurs.update(is_archived=True, status=StatutPuit.ARCHIVED)
+    elif action == DESARCHIVER:
+        # Comme pour un puits seul, le statut précédent est conservé.
+        puits = puits.filter(is_archived=True)
+        valeurs['is_archived'] = False
+    else:
+        puits = puits.exclude(status=statut)
+        valeurs['status'] = statut
+
+    with transaction.atomic():
+        puits_ids = list(puits.order_by('pk').select_for_update().values_list('pk', flat=True))
+        if puits_ids:
+            Well.objects.filter(pk__in=puits_ids).update(**valeurs)
+        journal = JournalAction.objects.create(
+            action=LIBELLES[action],
+            details=json.dumps({
+                'action': action,
+                'statut': statut,
+                'criteres': criteres or {},
+                'nombre': len(puits_ids),
+                'puits': puits_ids,
+            }),
+            utilisateur=utilisateur,
+            adresse_ip=adresse_ip,
+            user_agent=user_agent,
+        )
+        transaction.on_commit(lambda: _invalider_caches(puits_ids))
+    return puits_ids, journal
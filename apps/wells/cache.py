@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+
+class ReferenceDataCache:
+    """
+    Cache à deux niveaux pour les données de référence (types d'opération,
+    types d'indicateur, régions).
+
+    Le premier niveau est une LRU locale au processus, le second le cache
+    Redis `default` partagé entre les workers. Les entrées locales expirent
+    après `local_timeout` secondes afin de borner la durée pendant laquelle
+    un autre worker peut servir une valeur invalidée ailleurs.
+    """
+
+    def __init__(self, prefix='wells:ref', maxsize=1024, local_timeout=30, timeout=3600):
+        self.prefix = prefix
+        self.maxsize = maxsize
+        self.local_timeout = local_timeout
+        self.timeout = timeout
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def make_key(self, model, pk):
+        return f"{self.prefix}:{model._meta.label_lower}:{pk}"
+
+    def get(self, model, pk, serializer_class):
+        """Retourne la représentation sérialisée de l'objet `pk`, ou None s'il n'existe pas."""
+        if pk is None:
+            return None
+
+        key = self.make_key(model, pk)
+        data = self._get_local(key)
+        if data is not None:
+            return data
+
+        data = cache.get(key)
+        if data is None:
+            instance = model.objects.filter(pk=pk).first()
+            if instance is None:
+                return None
+            data = serializer_class(instance).data
+            cache.set(key, data, self.timeout)
+
+        self._set_local(key, data)
+        return data
+
+    def invalidate(self, model, pk):
+        key = self.make_key(model, pk)
+        with self._lock:
+            self._local.pop(key, None)
+        cache.delete(key)
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return data
+
+    def _set_local(self, key, data):
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.local_timeout, data)
+            self._local.move_to_end(key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+
+reference_cache = ReferenceDataCache()
@@ -0,0 +1,140 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Case, CharField, Value, When
+from django.db.models.functions import Concat, Trim
+from django.utils.encoding import force_str
+from rest_framework import serializers
+from rest_framework.response import Response
+
+# Champs dont `to_representation` rend la valeur lue en base telle quelle.
+CHAMPS_IDENTITE = (serializers.CharField, serializers.ChoiceField, serializers.IntegerField, serializers.BooleanField)
+
+
+def nom_complet(relation):
+    """Équivalent SQL de `get_full_name()` de l'utilisateur lié par `relation` ; None sans utilisateur."""
+    return Case(
+        When(**{f'{relation}__isnull': True}, then=Value(None)),
+        default=Trim(Concat(f'{relation}__first_name', Value(' '), f'{relation}__last_name')),
+        output_field=CharField(),
+    )
+
+
+def libelles_choix(model, field_name):
+    """Fonction valeur -> libellé, équivalente à `get_<champ>_display()`."""
+    libelles = dict(model._meta.get_field(field_name).flatchoices)
+    return lambda valeur: force_str(libelles.get(valeur, valeur), strings_only=True)
+
+
+class CompactField:
+    """
+    Champ calculé servi par la voie compacte à la place d'un `SerializerMethodField`.
+
+    `colonnes` (chemins ORM) et `expressions` (nom -> expression annotée) sont
+    lues avec `.values()` ; `build` reçoit la ligne et rend la valeur du
+    champ. Sans `build`, la valeur est celle lue sous le nom du champ.
+    """
+
+    def __init__(self, build=None, *colonnes, **expressions):
+        self.build = build
+        self.expressions = {**{colonne: colonne for colonne in colonnes}, **expressions}
+
+    def bind(self, field_name):
+        if self.build is None:
+            return lambda ligne: ligne[field_name]
+        return self.build
+
+
+def objet_lie(relation, serializer_class):
+    """
+    CompactField rendant l'objet lié par `relation` (one-to-one) avec `serializer_class`.
+
+    Les colonnes sont lues par jointure ; une valeur absente (pas encore
+    d'objet lié) prend la valeur par défaut du champ du modèle, comme un
+    objet non enregistré.
+    """
+    model = serializer_class.Meta.model
+    plan = []
+    for name, field in serializer_class().fields.items():
+        defaut = model._meta.get_field(field.source).get_default()
+        conversion = None if type(field) in CHAMPS_IDENTITE else field.to_representation
+        plan.append((name, f'{relation}__{field.source}', defaut, conversion))
+
+    def build(ligne):
+        objet = {}
+        for name, colonne, defaut, conversion in plan:
+            valeur = ligne[colonne]
+            if valeur is None:
+                valeur = defaut
+            objet[name] = valeur if valeur is None or conversion is None else conversion(valeur)
+        return objet
+
+    return CompactField(build, *[colonne for _, colonne, _, _ in plan])
+
+
+class CompactListMixin:
+    """
+    Voie rapide en lecture seule pour l'action `list`.
+
+    Les lignes sont lues avec `.values()` puis converties champ par champ :
+    aucun modèle n'est instancié et aucun `SerializerMethodField` n'est
+    appelé. Les champs calculés du serializer sont déclarés dans son
+    attribut `compact_fields` (voir `CompactField`) : noms complets des
+    utilisateurs annotés en SQL, libellés de choix, objets imbriqués lus par
+    jointure. Les champs du modèle gardent la conversion du serializer
+    (décimaux, dates), la sortie est donc identique à la voie habituelle.
+    Les restrictions `?fields=`/`?omit=`, les filtres, le tri et la
+    pagination s'appliquent de la même façon.
+    """
+
+    def _compact_plan(self, serializer):
+        """Liste (nom du champ, clé lue, conversion) et valeurs à demander à `.values()`."""
+        compact_fields = getattr(serializer, 'compact_fields', {})
+        plan, valeurs = [], {}
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if name in compact_fields:
+                compact = compact_fields[name]
+                valeurs.update(compact.expressions)
+                plan.append((name, None, compact.bind(name)))
+            elif isinstance(field, serializers.RelatedField):
+                valeurs[field.source] = field.source
+                plan.append((name, field.source, None))
+            elif isinstance(field, serializers.Field) and not isinstance(
+                    field, (serializers.BaseSerializer, serializers.SerializerMethodField)) and '.' not in field.source:
+                valeurs[field.source] = field.source
+                plan.append((name, field.source, None if type(field) in CHAMPS_IDENTITE else field.to_representation))
+            else:
+                raise ImproperlyConfigured(
+                    f"{type(serializer).__name__}.{name} needs an entry in `compact_fields` for the compact list."
+                )
+        return plan, valeurs
+
+    def _compact_rows(self, plan, lignes):
+        resultats = []
+        for ligne in lignes:
+            donnees = {}
+            for name, cle, conversion in plan:
+                if cle is None:
+                    donnees[name] = conversion(ligne)
+                else:
+                    valeur = ligne[cle]
+                    donnees[name] = valeur if valeur is None or conversion is None else conversion(valeur)
+            resultats.append(donnees)
+        return resultats
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        plan, valeurs = self._compact_plan(self.get_serializer())
+
+        # La pagination par curseur lit la clé primaire et le champ de tri de chaque ligne.
+        pk = queryset.model._meta.pk.attname
+        tri = {name.lstrip('-') for name in queryset.query.order_by if isinstance(name, str)}
+        for name in {pk, *tri} - {'pk'}:
+            valeurs.setdefault(name, name)
+        expressions = {alias: expression for alias, expression in valeurs.items() if alias != expression}
+        lignes = queryset.values(*[alias for alias in valeurs if alias not in expressions], **expressions)
+
+        page = self.paginate_queryset(lignes)
+        if page is not None:
+            return self.get_paginated_response(self._compact_rows(plan, page))
+        return Response(self._compact_rows(plan, lignes))
@@ -0,0 +1,81 @@
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """
+    Ajoute ETag et Last-Modified aux actions `list` et `retrieve`.
+
+    Les validateurs sont calculés par une requête légère avant toute
+    sérialisation : `MAX(champ)` et `COUNT(*)` de la liste filtrée, ou la
+    valeur du champ pour l'objet demandé. Si le client possède déjà la
+    représentation (If-None-Match / If-Modified-Since), la réponse est un
+    304 et le serializer n'est jamais exécuté.
+
+    `conditional_timestamp_field` doit être un horodatage mis à jour à chaque
+    modification de la ressource (et de ce que sa représentation imbrique).
+    """
+    conditional_timestamp_field = 'last_updated'
+
+    def _make_etag(self, request, *parts):
+        # Le chemin complet couvre filtres, curseur et taille de page ; le format
+        # (JSON, API navigable) change aussi la représentation.
+        renderer = getattr(request, 'accepted_renderer', None)
+        source = '|'.join(str(part) for part in (
+            request.get_full_path(), getattr(renderer, 'format', ''), *parts
+        ))
+        return quote_etag(hashlib.md5(source.encode('utf-8')).hexdigest())
+
+    def _conditional_response(self, request, etag, last_modified, build_response):
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        not_modified = get_conditional_response(request._request, etag=etag, last_modified=timestamp)
+        if not_modified is not None:
+            return not_modified
+
+        response = build_response()
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        validators = queryset.order_by().aggregate(
+            last_modified=Max(self.conditional_timestamp_field),
+            total=Count('pk')
+        )
+        etag = self._make_etag(request, validators['total'], validators['last_modified'])
+        return self._conditional_response(
+            request, etag, validators['last_modified'],
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        # Pas de préchargement pour le validateur : seule la colonne horodatage est lue.
+        try:
+            last_modified = (
+                self.filter_queryset(self.get_queryset())
+                .prefetch_related(None)
+                .filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+                .values_list(self.conditional_timestamp_field, flat=True)
+                .first()
+            )
+        except (TypeError, ValueError, ValidationError):
+            # Identifiant mal formé : comme `get_object_or_404` de DRF, `get_object` renvoie un 404.
+            last_modified = None
+        if last_modified is None:
+            # Objet inexistant ou filtré : `get_object` renvoie le 404 habituel.
+            return super().retrieve(request, *args, **kwargs)
+
+        etag = self._make_etag(request, last_modified)
+        return self._conditional_response(
+            request, etag, last_modified,
+            lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+        )
@@ -0,0 +1,94 @@
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def parse_field_list(value):
+    """`'a, b,,c'` -> `['a', 'b', 'c']` ; None si le paramètre est absent."""
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def requested_fieldset(request):
+    """Couple (fields, omit) lu dans la requête ; chaque élément vaut None si absent."""
+    if request is None or request.method not in SAFE_METHODS:
+        return None, None
+    return (
+        parse_field_list(request.query_params.get(FIELDS_PARAM)),
+        parse_field_list(request.query_params.get(OMIT_PARAM)),
+    )
+
+
+class SparseFieldsetMixin:
+    """
+    Restreint les champs sérialisés avec `?fields=a,b` et/ou `?omit=c,d`.
+
+    Seul le serializer racine de la réponse (ou l'enfant d'une liste racine)
+    est restreint : les serializers imbriqués gardent tous leurs champs.
+    Les noms inconnus sont ignorés. Les écritures ne sont jamais restreintes.
+
+    `field_dependencies` déclare les attributs du modèle lus par les champs
+    calculés (ex. `SerializerMethodField`), afin que la vue ne les diffère pas.
+    """
+    field_dependencies = {}
+
+    def _is_root(self):
+        parent = self.parent
+        if parent is None:
+            return True
+        return isinstance(parent, serializers.ListSerializer) and parent.parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._is_root():
+            return fields
+
+        only, omit = requested_fieldset(self.context.get('request'))
+        if only is not None:
+            fields = {name: field for name, field in fields.items() if name in only}
+        if omit:
+            fields = {name: field for name, field in fields.items() if name not in omit}
+        return fields
+
+    def get_model_dependencies(self):
+        """Noms des attributs du modèle lus pour produire les champs retenus."""
+        names = set()
+        for name, field in self.fields.items():
+            names.update(self.field_dependencies.get(name, ()))
+            if field.source != '*':
+                names.add(field.source.split('.')[0])
+        return names
+
+
+class SparseFieldsetViewMixin:
+    """
+    Ne charge depuis PostgreSQL que les colonnes nécessaires au serializer.
+
+    Pour `list` et `retrieve`, les colonnes non relationnelles qui ne servent
+    ni aux champs retenus (après `?fields=`/`?omit=`), ni au tri, sont
+    différées avec `.defer()`. Les clés étrangères ne sont jamais différées,
+    pour rester compatibles avec `select_related`. Les colonnes exclues du
+    serializer (ex. le tsvector `recherche`) ne sont plus lues non plus.
+    """
+    sparse_actions = ('list', 'retrieve')
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if getattr(self, 'action', None) not in self.sparse_actions:
+            return queryset
+
+        serializer = self.get_serializer()
+        if not isinstance(serializer, SparseFieldsetMixin):
+            return queryset
+
+        needed = serializer.get_model_dependencies()
+        needed.update(name.lstrip('-').split('__')[0] for name in queryset.query.order_by if isinstance(name, str))
+        deferred = [
+            field.name for field in queryset.model._meta.concrete_fields
+            if not field.is_relation and not field.primary_key and field.name not in needed
+            and field.attname not in needed
+        ]
+        return queryset.defer(*deferred) if deferred else queryset
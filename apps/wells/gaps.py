@@ -0,0 +1,68 @@
+from django.db import connection
+from django.db.models import DateField, Q, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+
+from .models import Well, DailyReport, StatutPuit
+
+DUREE_MAX_JOURS = 366
+
+
+def puits_actifs(queryset=None):
+    """Puits non archivés en cours de forage (statut français ou hérité)."""
+    queryset = Well.objects.all() if queryset is None else queryset
+    return queryset.filter(is_archived=False).filter(
+        Q(statut=StatutPuit.EN_COURS) | Q(status=StatutPuit.ACTIVE)
+    )
+
+
+def rapports_manquants(puits, debut, fin):
+    """
+    Jours sans rapport quotidien des `puits` entre `debut` et `fin` inclus, regroupés en plages.
+
+    Une seule requête : chaque puits est joint à un calendrier
+    `generate_series`, borné à sa propre période (date de début / de fin du
+    puits), puis les jours sans rapport (anti-jointure sur l'index unique
+    (puit, date_rapport)) sont regroupés en plages consécutives par la
+    méthode des îlots : `jour - row_number()` est constant sur une plage.
+
+    Retourne [{'well_id', 'nom', 'missing_days', 'ranges': [{'start', 'end', 'days'}]}],
+    limité aux puits ayant au moins un jour manquant.
+    """
+    bornes = puits.order_by().annotate(
+        debut_calendrier=Greatest(Value(debut, output_field=DateField()), Coalesce('date_debut', 'start_date')),
+        fin_calendrier=Least(Value(fin, output_field=DateField()), Coalesce('date_fin', 'end_date')),
+    ).values('id', 'nom', 'name', 'debut_calendrier', 'fin_calendrier')
+    sql_puits, parametres = bornes.query.sql_with_params()
+
+    quote = connection.ops.quote_name
+    requete = f"""
+        WITH puits AS ({sql_puits}),
+        manquants AS (
+            SELECT p.id AS puit_id, p.nom, p.name, jour::date AS jour
+            FROM puits p
+            CROSS JOIN LATERAL generate_series(p.debut_calendrier, p.fin_calendrier, interval '1 day') AS jour
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {quote(DailyReport._meta.db_table)} r
+                WHERE r.puit_id = p.id AND r.date_rapport = jour::date
+            )
+        )
+        SELECT puit_id, nom, name, min(jour), max(jour), count(*)
+        FROM (
+            SELECT puit_id, nom, name, jour,
+                   jour - (row_number() OVER (PARTITION BY puit_id ORDER BY jour))::integer AS ilot
+            FROM manquants
+        ) jours
+        GROUP BY puit_id, nom, name, ilot
+        ORDER BY puit_id, min(jour)
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(requete, parametres)
+        lignes = cursor.fetchall()
+
+    resultats = []
+    for puit_id, nom, name, premier, dernier, jours in lignes:
+        if not resultats or resultats[-1]['well_id'] != puit_id:
+            resultats.append({'well_id': puit_id, 'nom': nom or name, 'missing_days': 0, 'ranges': []})
+        resultats[-1]['missing_days'] += jours
+        resultats[-1]['ranges'].append({'start': premier, 'end': dernier, 'days': jours})
+    return resultats
@@ -0,0 +1,188 @@
+import math
+from functools import reduce
+
+import numpy as np
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+
+# Rayon terrestre moyen (km) utilisé pour les distances orthodromiques.
+RAYON_TERRE_KM = 6371.0088
+
+GEOHASH_PRECISION = 9
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_MAX_CELLULES = 64
+
+
+def encoder_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Encode une position (degrés décimaux) en geohash de `precision` caractères."""
+    lat_min, lat_max = -90.0, 90.0
+    lon_min, lon_max = -180.0, 180.0
+    caracteres = []
+    bits, valeur, pair = 0, 0, True
+    while len(caracteres) < precision:
+        if pair:
+            milieu = (lon_min + lon_max) / 2
+            if longitude >= milieu:
+                valeur = (valeur << 1) | 1
+                lon_min = milieu
+            else:
+                valeur <<= 1
+                lon_max = milieu
+        else:
+            milieu = (lat_min + lat_max) / 2
+            if latitude >= milieu:
+                valeur = (valeur << 1) | 1
+                lat_min = milieu
+            else:
+                valeur <<= 1
+                lat_max = milieu
+        pair = not pair
+        bits += 1
+        if bits == 5:
+            caracteres.append(GEOHASH_BASE32[valeur])
+            bits, valeur = 0, 0
+    return ''.join(caracteres)
+
+
+def taille_cellule(precision):
+    """Dimensions (hauteur en latitude, largeur en longitude) d'une cellule geohash, en degrés."""
+    bits = 5 * precision
+    bits_lon = (bits + 1) // 2
+    bits_lat = bits // 2
+    return 180.0 / (1 << bits_lat), 360.0 / (1 << bits_lon)
+
+
+def prefixes_couvrants(lat_min, lon_min, lat_max, lon_max, max_cellules=GEOHASH_MAX_CELLULES):
+    """
+    Préfixes geohash dont l'union couvre le rectangle donné.
+
+    La précision retenue est la plus fine pour laquelle le nombre de cellules
+    reste inférieur à `max_cellules`. Retourne une liste vide si même la
+    précision 1 dépasse ce nombre : le rectangle couvre alors une grande
+    partie du globe et le filtre par préfixe n'apporte rien.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        hauteur, largeur = taille_cellule(precision)
+        i_min = math.floor((lat_min + 90.0) / hauteur)
+        i_max = min(math.floor((lat_max + 90.0) / hauteur), (1 << (5 * precision // 2)) - 1)
+        j_min = math.floor((lon_min + 180.0) / largeur)
+        j_max = min(math.floor((lon_max + 180.0) / largeur), (1 << ((5 * precision + 1) // 2)) - 1)
+        if (i_max - i_min + 1) * (j_max - j_min + 1) > max_cellules:
+            continue
+        return sorted({
+            encoder_geohash(-90.0 + (i + 0.5) * hauteur, -180.0 + (j + 0.5) * largeur, precision)
+            for i in range(i_min, i_max + 1)
+            for j in range(j_min, j_max + 1)
+        })
+    return []
+
+
+def decouper_rectangle(lat_min, lon_min, lat_max, lon_max):
+    """
+    Normalise un rectangle en une liste de rectangles sans passage de l'antiméridien.
+
+    Un rectangle avec `lon_min > lon_max` traverse l'antiméridien et est découpé en deux.
+    """
+    lat_min, lat_max = max(lat_min, -90.0), min(lat_max, 90.0)
+    if lon_max - lon_min >= 360.0:
+        return [(lat_min, -180.0, lat_max, 180.0)]
+    if lon_min < -180.0:
+        lon_min += 360.0
+    if lon_max > 180.0:
+        lon_max -= 360.0
+    if lon_min > lon_max:
+        return [(lat_min, lon_min, lat_max, 180.0), (lat_min, -180.0, lat_max, lon_max)]
+    return [(lat_min, lon_min, lat_max, lon_max)]
+
+
+def rectangle_englobant(latitude, longitude, rayon_km):
+    """Rectangles (sans passage de l'antiméridien) contenant le cercle de `rayon_km` autour du point."""
+    delta_lat = math.degrees(rayon_km / RAYON_TERRE_KM)
+    lat_min, lat_max = latitude - delta_lat, latitude + delta_lat
+    if lat_min <= -90.0 or lat_max >= 90.0:
+        # Le cercle contient un pôle : toutes les longitudes sont concernées.
+        return decouper_rectangle(lat_min, -180.0, lat_max, 180.0)
+    # Écart de longitude maximal atteint sur le cercle (et non à la latitude du centre).
+    rapport = math.sin(rayon_km / RAYON_TERRE_KM) / math.cos(math.radians(latitude))
+    delta_lon = 180.0 if rapport >= 1 else math.degrees(math.asin(rapport))
+    return decouper_rectangle(lat_min, longitude - delta_lon, lat_max, longitude + delta_lon)
+
+
+def distances_haversine(latitude, longitude, latitudes, longitudes):
+    """Distances (km) entre un point et des tableaux de positions, calculées en une passe vectorisée."""
+    lat1 = np.radians(latitude)
+    lon1 = np.radians(longitude)
+    lat2 = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon2 = np.radians(np.asarray(longitudes, dtype=np.float64))
+    a = (
+        np.sin((lat2 - lat1) / 2.0) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2
+    )
+    return 2.0 * RAYON_TERRE_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def annoter_position(queryset):
+    """Annote `geo_lat`/`geo_lon` avec la position effective (mêmes règles que `Puit.position`)."""
+    return queryset.annotate(
+        geo_lat=Coalesce('latitude', 'coord_y'),
+        geo_lon=Coalesce('longitude', 'coord_x'),
+    )
+
+
+def filtrer_rectangles(queryset, rectangles):
+    """
+    Restreint le queryset aux puits situés dans l'un des rectangles.
+
+    Le filtre par préfixe geohash (index `puit_geohash_idx`) sélectionne les
+    cellules candidates ; les bornes exactes sont ensuite vérifiées sur les
+    coordonnées.
+    """
+    condition = Q()
+    for lat_min, lon_min, lat_max, lon_max in rectangles:
+        bornes = Q(geo_lat__range=(lat_min, lat_max), geo_lon__range=(lon_min, lon_max))
+        prefixes = prefixes_couvrants(lat_min, lon_min, lat_max, lon_max)
+        if prefixes:
+            bornes &= reduce(lambda gauche, droite: gauche | droite,
+                             (Q(geohash__startswith=prefixe) for prefixe in prefixes))
+        condition |= bornes
+    return annoter_position(queryset).exclude(geohash='').filter(condition)
+
+
+def rechercher_rayon(queryset, latitude, longitude, rayon_km, limite=None):
+    """
+    Puits situés à moins de `rayon_km` du point, triés par distance croissante.
+
+    Seuls (pk, latitude, longitude) des candidats du rectangle englobant sont
+    lus ; les distances sont calculées en une fois avec NumPy.
+    Retourne une liste de couples (pk, distance_km).
+    """
+    candidats = list(
+        filtrer_rectangles(queryset, rectangle_englobant(latitude, longitude, rayon_km))
+        .values_list('pk', 'geo_lat', 'geo_lon')
+    )
+    if not candidats:
+        return []
+
+    pks, latitudes, longitudes = zip(*candidats)
+    distances = distances_haversine(latitude, longitude, latitudes, longitudes)
+    retenus = np.flatnonzero(distances <= rayon_km)
+    retenus = retenus[np.argsort(distances[retenus], kind='stable')]
+    if limite is not None:
+        retenus = retenus[:limite]
+    return [(pks[i], float(distances[i])) for i in retenus]
+
+
+def plus_proches(queryset, latitude, longitude, k, rayon_initial_km=25.0):
+    """
+    Les `k` puits les plus proches du point, sous forme de couples (pk, distance_km).
+
+    Le rayon de recherche est quadruplé jusqu'à trouver `k` puits : tout puits
+    hors du rayon est plus loin que ceux trouvés, le résultat est donc exact.
+    """
+    rayon = rayon_initial_km
+    demi_circonference = math.pi * RAYON_TERRE_KM
+    while True:
+        resultats = rechercher_rayon(queryset, latitude, longitude, rayon, limite=k)
+        if len(resultats) >= k or rayon >= demi_circonference:
+            return resultats
+        rayon = min(rayon * 4, demi_circonference)
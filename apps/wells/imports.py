@@ -0,0 +1,167 @@
+import codecs
+import csv
+import json
+from itertools import islice
+
+from django.db import DatabaseError, transaction
+
+from .models import Well, WellOperation, DailyReport, ResumePuit
+from .serializers import DailyReportImportSerializer
+
+
+def iter_csv_rows(stream):
+    """Lit un flux CSV ligne à ligne et produit des triplets (ligne, données, erreur)."""
+    reader = csv.DictReader(codecs.iterdecode(stream, 'utf-8-sig'))
+    for row in reader:
+        # Les cellules vides sont traitées comme des valeurs absentes.
+        data = {key: value for key, value in row.items() if key and value not in ('', None)}
+        yield reader.line_num, data, None
+
+
+def iter_ndjson_rows(stream):
+    """Lit un flux NDJSON (un objet JSON par ligne) et produit des triplets (ligne, données, erreur)."""
+    for line_number, line in enumerate(codecs.iterdecode(stream, 'utf-8-sig'), start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as exc:
+            yield line_number, None, {'non_field_errors': [f'Invalid JSON: {exc}']}
+            continue
+        if not isinstance(data, dict):
+            yield line_number, None, {'non_field_errors': ['Expected a JSON object.']}
+            continue
+        yield line_number, data, None
+
+
+IMPORT_FORMATS = {
+    'text/csv': iter_csv_rows,
+    'application/x-ndjson': iter_ndjson_rows,
+    'application/jsonl': iter_ndjson_rows,
+}
+
+
+class DailyReportImporter:
+    """
+    Import en masse de rapports quotidiens.
+
+    Les lignes sont validées par paquets de `chunk_size`, puis écrites avec un
+    seul INSERT ... ON CONFLICT (puit, date_rapport) DO UPDATE par paquet.
+    Chaque paquet a sa propre transaction : une ligne invalide est signalée
+    sans interrompre le reste de l'import. Si la base refuse un paquet, il
+    est rejoué ligne par ligne, chacune dans son point de sauvegarde, pour ne
+    signaler que les lignes fautives.
+    """
+    chunk_size = 500
+    update_fields = [
+        'well', 'report_date', 'operation',
+        'activites', 'activities', 'progression', 'progress',
+        'problemes', 'issues', 'solutions', 'heures_travaillees', 'hours_worked',
+        'soumis_par', 'submitted_by', 'date_maj', 'updated_at',
+    ]
+
+    def __init__(self, user, chunk_size=None):
+        self.user = user
+        if chunk_size:
+            self.chunk_size = chunk_size
+        self.processed = 0
+        self.errors = []
+
+    def run(self, rows):
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self._process_chunk(chunk)
+        return {'processed': self.processed, 'errors': self.errors}
+
+    def _add_error(self, line, errors):
+        self.errors.append({'line': line, 'errors': errors})
+
+    def _process_chunk(self, chunk):
+        # Une même clé (puit, date) peut apparaître plusieurs fois : la dernière ligne l'emporte.
+        valid = {}
+        for line, data, error in chunk:
+            if error:
+                self._add_error(line, error)
+                continue
+            serializer = DailyReportImportSerializer(data=data)
+            if not serializer.is_valid():
+                self._add_error(line, serializer.errors)
+                continue
+            values = serializer.validated_data
+            valid[(values['well'], values['report_date'])] = (line, values)
+
+        well_ids = {values['well'] for _, values in valid.values()}
+        operation_ids = {values['operation'] for _, values in valid.values() if values.get('operation')}
+        existing_wells = set(Well.objects.filter(pk__in=well_ids).values_list('pk', flat=True))
+        operation_wells = dict(
+            WellOperation.objects.filter(pk__in=operation_ids).values_list('pk', 'puit_id')
+        ) if operation_ids else {}
+
+        reports = []
+        for line, values in valid.values():
+            if values['well'] not in existing_wells:
+                self._add_error(line, {'well': [f"Well {values['well']} does not exist."]})
+                continue
+            if values.get('operation'):
+                if values['operation'] not in operation_wells:
+                    self._add_error(line, {'operation': [f"Operation {values['operation']} does not exist."]})
+                    continue
+                if operation_wells[values['operation']] != values['well']:
+                    self._add_error(line, {'operation': [
+                        f"Operation {values['operation']} does not belong to well {values['well']}."
+                    ]})
+                    continue
+            reports.append((line, self._build_report(values)))
+
+        if not reports:
+            return
+
+        try:
+            self._write([report for _, report in reports])
+        except DatabaseError:
+            written = []
+            for line, report in reports:
+                try:
+                    self._write([report])
+                except DatabaseError as exc:
+                    self._add_error(line, {'non_field_errors': [str(exc)]})
+                else:
+                    written.append((line, report))
+            reports = written
+
+        Well.marquer_modifies({report.well_id for _, report in reports})
+        self.processed += len(reports)
+
+    def _write(self, reports):
+        with transaction.atomic():
+            DailyReport.objects.bulk_create(
+                reports,
+                update_conflicts=True,
+                unique_fields=['puit', 'date_rapport'],
+                update_fields=self.update_fields,
+            )
+            # `bulk_create` ne passe pas par `SourceResumeMixin.save()` : résumés recalculés ici.
+            ResumePuit.recalculer({report.puit_id for report in reports})
+
+    def _build_report(self, values):
+        return DailyReport(
+            puit_id=values['well'],
+            well_id=values['well'],
+            operation_id=values.get('operation'),
+            date_rapport=values['report_date'],
+            report_date=values['report_date'],
+            activites=values['activities'],
+            activities=values['activities'],
+            progression=values['progress'],
+            progress=values['progress'],
+            problemes=values['issues'],
+            issues=values['issues'],
+            solutions=values['solutions'],
+            heures_travaillees=values['hours_worked'],
+            hours_worked=values['hours_worked'],
+            soumis_par=self.user,
+            submitted_by=self.user,
+        )
@@ -0,0 +1,62 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Well, WellOperation
+
+
+class TransitionInvalide(Exception):
+    """Transition d'état refusée pour une opération."""
+
+
+def demarrer_operation(operation_id, utilisateur):
+    """
+    Démarre une opération et passe son puits à l'état actif si besoin.
+
+    L'opération puis le puits sont verrouillés (SELECT ... FOR UPDATE), dans
+    cet ordre pour toutes les transitions : deux démarrages concurrents de la
+    même opération ne peuvent pas réussir tous les deux.
+    """
+    with transaction.atomic():
+        operation = WellOperation.objects.select_for_update().get(pk=operation_id)
+        if operation.actual_start_date is not None:
+            raise TransitionInvalide("This operation has already been started.")
+
+        operation.actual_start_date = timezone.now()
+        operation.status = 'active'
+        operation.save(update_fields=['actual_start_date', 'status', 'updated_at', 'date_maj'])
+
+        well = Well.objects.select_for_update().get(pk=operation.puit_id)
+        if well.status in ['planned', 'paused']:
+            well.status = 'active'
+            well.last_updated_by = utilisateur
+            well.save(update_fields=['status', 'last_updated_by', 'last_updated', 'derniere_maj'])
+    return operation
+
+
+def terminer_operation(operation_id, utilisateur):
+    """
+    Termine une opération ; le puits est terminé quand plus aucune opération n'est ouverte.
+
+    La sauvegarde de l'opération décrémente `operations_ouvertes` du puits
+    (UPDATE qui verrouille sa ligne) : la décision d'achever le puits est une
+    simple lecture du compteur, sans COUNT sur ses opérations. Les achèvements
+    concurrents d'un même puits sont sérialisés par ce verrou, et seul le
+    dernier voit le compteur à zéro.
+    """
+    with transaction.atomic():
+        operation = WellOperation.objects.select_for_update().get(pk=operation_id)
+        if operation.actual_start_date is None:
+            raise TransitionInvalide("Cannot complete an operation that hasn't started.")
+        if operation.actual_end_date is not None:
+            raise TransitionInvalide("This operation has already been completed.")
+
+        operation.actual_end_date = timezone.now()
+        operation.status = 'completed'
+        operation.save(update_fields=['actual_end_date', 'status', 'updated_at', 'date_maj'])
+
+        well = Well.objects.select_for_update().get(pk=operation.puit_id)
+        if well.operations_ouvertes == 0 and well.status != 'completed':
+            well.status = 'completed'
+            well.last_updated_by = utilisateur
+            well.save(update_fields=['status', 'last_updated_by', 'last_updated', 'derniere_maj'])
+    return operation
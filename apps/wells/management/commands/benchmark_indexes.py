@@ -0,0 +1,179 @@
+import random
+import re
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.wells.models import Well, WellOperation, DailyReport
+
+User = get_user_model()
+
+# Index planifiés pour les chemins de filtrage des listes de puits, d'opérations et de rapports.
+INDEX_PLANIFIES = [
+    'puit_actif_creation_idx',
+    'puit_actif_statut_idx',
+    'operation_puit_well_date_idx',
+    'operation_puit_well_statut_idx',
+    'operation_puit_statut_type_idx',
+    'rapport_well_date_idx',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare les plans d'exécution et les temps des requêtes de liste des puits "
+        "avec et sans les index planifiés, sur un jeu de données généré. "
+        "Tout est exécuté dans une transaction annulée à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--puits', type=int, default=5000, help='Nombre de puits à générer')
+        parser.add_argument('--operations', type=int, default=10, help="Opérations par puits")
+        parser.add_argument('--jours', type=int, default=90, help='Rapports quotidiens par puits')
+        parser.add_argument('--repetitions', type=int, default=20, help='Exécutions par requête mesurée')
+        parser.add_argument('--plans', action='store_true', help="Afficher les plans EXPLAIN ANALYZE complets")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stderr.write(self.style.ERROR('Ce benchmark nécessite PostgreSQL.'))
+            return
+
+        with transaction.atomic():
+            self.stdout.write('Génération du jeu de données...')
+            echantillon = self.generer_donnees(options['puits'], options['operations'], options['jours'])
+            requetes = self.requetes(echantillon)
+
+            # Les DDL sont transactionnels sous PostgreSQL : on supprime les index
+            # dans un point de sauvegarde pour mesurer l'état « avant ».
+            point = transaction.savepoint()
+            with connection.cursor() as cursor:
+                for nom in INDEX_PLANIFIES:
+                    cursor.execute(f'DROP INDEX IF EXISTS "{nom}"')
+            self.analyser_tables()
+            avant = self.mesurer(requetes, options['repetitions'], options['plans'], 'AVANT')
+            transaction.savepoint_rollback(point)
+
+            self.analyser_tables()
+            apres = self.mesurer(requetes, options['repetitions'], options['plans'], 'APRÈS')
+
+            self.stdout.write('')
+            self.stdout.write(self.style.MIGRATE_HEADING('Résumé (médiane en ms)'))
+            self.stdout.write(f"{'Requête':45} {'avant':>10} {'après':>10} {'gain':>8}")
+            for nom in requetes:
+                gain = avant[nom] / apres[nom] if apres[nom] else float('inf')
+                self.stdout.write(f'{nom:45} {avant[nom]:10.2f} {apres[nom]:10.2f} {gain:7.1f}x')
+
+            transaction.set_rollback(True)
+
+    def generer_donnees(self, nombre_puits, operations_par_puits, jours):
+        utilisateur = User.objects.create_user(
+            username='benchmark_indexes',
+            email='benchmark_indexes@woms.local',
+            password=None
+        )
+        statuts = ['planned', 'active', 'paused', 'completed']
+        maintenant = timezone.now()
+
+        Well.objects.bulk_create(
+            [
+                Well(
+                    nom=f'Puits {i}',
+                    name=f'Well {i}',
+                    status=random.choice(statuts),
+                    is_archived=random.random() < 0.2,
+                )
+                for i in range(nombre_puits)
+            ],
+            batch_size=2000
+        )
+        puits_ids = list(Well.objects.values_list('id', flat=True))
+
+        operations = []
+        for puit_id in puits_ids:
+            for i in range(operations_par_puits):
+                debut = maintenant - timedelta(days=random.randint(0, 720))
+                operations.append(WellOperation(
+                    puit_id=puit_id, well_id=puit_id,
+                    type_operation='forage', operation_type=random.choice(['forage', 'completion', 'testing']),
+                    nom=f'Opération {i}', name=f'Operation {i}',
+                    date_debut_prevue=debut, date_fin_prevue=debut + timedelta(days=5),
+                    planned_start_date=debut, planned_end_date=debut + timedelta(days=5),
+                    status=random.choice(['planifie', 'en_cours', 'termine']),
+                    cree_par=utilisateur, created_by=utilisateur,
+                ))
+        WellOperation.objects.bulk_create(operations, batch_size=5000)
+
+        aujourd_hui = date.today()
+        for debut in range(0, len(puits_ids), 200):
+            DailyReport.objects.bulk_create(
+                [
+                    DailyReport(
+                        puit_id=puit_id, well_id=puit_id,
+                        date_rapport=aujourd_hui - timedelta(days=jour),
+                        report_date=aujourd_hui - timedelta(days=jour),
+                        activites='Forage', activities='Drilling',
+                        progression=50, progress=50,
+                        heures_travaillees=12, hours_worked=12,
+                        soumis_par=utilisateur, submitted_by=utilisateur,
+                    )
+                    for puit_id in puits_ids[debut:debut + 200]
+                    for jour in range(jours)
+                ],
+                batch_size=5000
+            )
+
+        return {'puit_id': random.choice(puits_ids), 'aujourd_hui': aujourd_hui}
+
+    def requetes(self, echantillon):
+        puit_id = echantillon['puit_id']
+        aujourd_hui = echantillon['aujourd_hui']
+        return {
+            'puits actifs (-creation_date)': Well.objects.filter(is_archived=False)
+                .order_by('-creation_date', '-id')[:50],
+            'puits actifs par statut': Well.objects.filter(is_archived=False, status='active')
+                .order_by('-creation_date', '-id')[:50],
+            'opérations d\'un puits': WellOperation.objects.filter(well_id=puit_id)
+                .order_by('-planned_start_date', '-id')[:50],
+            'opérations d\'un puits par statut': WellOperation.objects.filter(well_id=puit_id, status='en_cours')
+                .order_by('-planned_start_date')[:50],
+            'opérations par statut et type': WellOperation.objects.filter(status='en_cours', operation_type='testing')
+                .order_by('-planned_start_date')[:50],
+            'rapports d\'un puits sur 30 jours': DailyReport.objects.filter(
+                well_id=puit_id, report_date__range=(aujourd_hui - timedelta(days=30), aujourd_hui)
+            ).order_by('-report_date', '-id')[:50],
+        }
+
+    def analyser_tables(self):
+        with connection.cursor() as cursor:
+            for modele in (Well, WellOperation, DailyReport):
+                cursor.execute(f'ANALYZE "{modele._meta.db_table}"')
+
+    def mesurer(self, requetes, repetitions, afficher_plans, etiquette):
+        self.stdout.write('')
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{etiquette} les index planifiés'))
+        medianes = {}
+        for nom, queryset in requetes.items():
+            plan = queryset.explain(analyze=True, buffers=True)
+            durees = []
+            for _ in range(repetitions):
+                debut = time.perf_counter()
+                list(queryset.all())
+                durees.append((time.perf_counter() - debut) * 1000)
+            durees.sort()
+            medianes[nom] = durees[len(durees) // 2]
+
+            premiere_ligne = plan.splitlines()[0]
+            execution = re.search(r'Execution Time: ([\d.]+) ms', plan)
+            self.stdout.write(
+                f"- {nom}: médiane {medianes[nom]:.2f} ms, "
+                f"EXPLAIN {execution.group(1) if execution else '?'} ms"
+            )
+            self.stdout.write(f'    {premiere_ligne}')
+            if afficher_plans:
+                for ligne in plan.splitlines()[1:]:
+                    self.stdout.write(f'    {ligne}')
+        return medianes
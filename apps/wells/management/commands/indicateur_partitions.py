@@ -0,0 +1,50 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.wells.partitions import (
+    ajouter_mois, convertir_en_table_partitionnee, creer_partitions, debut_mois,
+    detacher_partitions, est_partitionnee, nom_table,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Gérer les partitions mensuelles de la table des indicateurs : conversion initiale, "
+        "création des partitions à venir et détachement des partitions expirées. "
+        "À planifier quotidiennement (cron) pour que les mois suivants existent toujours."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--initialiser', action='store_true',
+                            help="Convertir la table existante en table partitionnée par mois")
+        parser.add_argument('--mois-avance', type=int, default=3,
+                            help="Nombre de mois futurs pour lesquels une partition doit exister (défaut : 3)")
+        parser.add_argument('--retention', type=int, default=None,
+                            help="Détacher les partitions antérieures à ce nombre de mois")
+        parser.add_argument('--supprimer', action='store_true',
+                            help="Supprimer les partitions détachées au lieu de les conserver")
+
+    def handle(self, *args, **options):
+        if options['initialiser']:
+            if est_partitionnee():
+                self.stdout.write(self.style.WARNING(f'La table {nom_table()} est déjà partitionnée.'))
+            else:
+                convertir_en_table_partitionnee(options['mois_avance'])
+                self.stdout.write(self.style.SUCCESS(f'Table {nom_table()} convertie en table partitionnée.'))
+        elif not est_partitionnee():
+            raise CommandError(
+                f"La table {nom_table()} n'est pas partitionnée : lancer d'abord la commande avec --initialiser."
+            )
+
+        mois_courant = debut_mois(date.today())
+        for mois in creer_partitions(mois_courant, ajouter_mois(mois_courant, options['mois_avance'])):
+            self.stdout.write(f'  - partition créée : {mois:%Y-%m}')
+
+        if options['retention'] is not None:
+            limite = ajouter_mois(mois_courant, -options['retention'])
+            for nom in detacher_partitions(limite, supprimer=options['supprimer']):
+                action = 'supprimée' if options['supprimer'] else 'détachée'
+                self.stdout.write(f'  - partition {action} : {nom}')
+
+        self.stdout.write(self.style.SUCCESS('Partitions à jour.'))
@@ -0,0 +1,30 @@
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.wells.series import reconstruire_series
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruire les agrégats des séries d'indicateurs (heure, jour, semaine, mois) "
+        "à partir des mesures, par exemple après un import en masse"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--puit', type=int, default=None,
+                            help="Limiter la reconstruction à ce puits")
+        parser.add_argument('--depuis', default=None,
+                            help="Ne reconstruire que les intervalles à partir de cette date (AAAA-MM-JJ)")
+
+    def handle(self, *args, **options):
+        depuis = None
+        if options['depuis']:
+            try:
+                jour = datetime.strptime(options['depuis'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--depuis attend une date au format AAAA-MM-JJ.")
+            depuis = datetime.combine(jour, time.min, tzinfo=dt_timezone.utc)
+
+        total = reconstruire_series(puit_id=options['puit'], depuis=depuis)
+        self.stdout.write(self.style.SUCCESS(f'{total} agrégats reconstruits.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.wells.models import Well
+
+
+class Command(BaseCommand):
+    help = "Recalculer le compteur d'opérations ouvertes de chaque puits"
+
+    def handle(self, *args, **options):
+        total = Well.recalculer_operations_ouvertes()
+        self.stdout.write(self.style.SUCCESS(f'Compteurs recalculés pour {total} puits.'))
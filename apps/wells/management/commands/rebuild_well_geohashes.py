@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.wells.models import Puit
+
+
+class Command(BaseCommand):
+    help = "Recalculer le geohash des puits à partir de leurs coordonnées (rattrapage des puits existants)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--puit', type=int, action='append', default=None,
+                            help="Limiter le recalcul à ce puits (option répétable)")
+        parser.add_argument('--taille-lot', type=int, default=1000,
+                            help="Nombre de puits mis à jour par requête")
+
+    def handle(self, *args, **options):
+        total = Puit.recalculer_geohash(options['puit'], taille_lot=options['taille_lot'])
+        self.stdout.write(self.style.SUCCESS(f'Geohash recalculé pour {total} puits.'))
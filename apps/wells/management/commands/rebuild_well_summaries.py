@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.wells.models import ResumePuit
+
+
+class Command(BaseCommand):
+    help = "Recalculer le résumé dénormalisé de chaque puits (opérations, rapports, problèmes ouverts, documents)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--puit', type=int, action='append', default=None,
+                            help="Limiter le recalcul à ce puits (option répétable)")
+
+    def handle(self, *args, **options):
+        total = ResumePuit.recalculer(options['puit'])
+        self.stdout.write(self.style.SUCCESS(f'Résumés recalculés pour {total} puits.'))
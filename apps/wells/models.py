@@ -1,7 +1,29 @@
-from django.db import models
+from functools import reduce
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, Greatest
 from django.conf import settings
+from django.contrib.postgres.indexes import BrinIndex, GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from .geo import encoder_geohash
+
+
+# Les modèles mélangent des champs français et des champs hérités en anglais :
+# les vecteurs de recherche sont construits avec les deux configurations.
+CONFIGS_RECHERCHE = ('french', 'english')
+
+
+def vecteur_recherche(*champs_ponderes):
+    """Expression tsvector stockée à partir de couples (champ, poids)."""
+    vecteurs = [
+        SearchVector(champ, config=config, weight=poids)
+        for config in CONFIGS_RECHERCHE
+        for champ, poids in champs_ponderes
+    ]
+    return reduce(lambda gauche, droite: gauche + droite, vecteurs)
+
 
 class StatutPuit(models.TextChoices):
     """Statuts possibles d'un puit."""
@@ -36,6 +58,11 @@ class StatutOperation(models.TextChoices):
     ANNULE = 'annule', _('Annulé')
 
 
+# Statuts d'opération qui ne bloquent plus l'achèvement du puits
+# ('completed' est la valeur écrite par l'API historique).
+STATUTS_OPERATION_FERMES = ('completed', StatutOperation.TERMINE, StatutOperation.ANNULE)
+
+
 class Region(models.Model):
     """Modèle représentant une région géographique pour les opérations de puits."""
     nom = models.CharField(max_length=100, verbose_name=_('Nom'))
@@ -51,6 +78,44 @@ class Region(models.Model):
         verbose_name = _('Région')
         verbose_name_plural = _('Régions')
         ordering = ['nom']
+        indexes = [
+            # Autocomplétion par trigrammes (extension pg_trgm)
+            GinIndex(fields=['code'], opclasses=['gin_trgm_ops'], name='region_code_trgm'),
+        ]
+
+
+class PuitQuerySet(models.QuerySet):
+    """
+    QuerySet des puits : les écritures en masse qui touchent aux coordonnées
+    tiennent le geohash à jour, comme `Puit.save()`.
+    """
+
+    def update(self, **kwargs):
+        if not self.model.CHAMPS_COORDONNEES.intersection(kwargs):
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            # Les puits sont relevés avant l'UPDATE, le filtre pouvant porter sur les coordonnées.
+            puits_ids = list(self.values_list('pk', flat=True))
+            lignes = super().update(**kwargs)
+            self.model.recalculer_geohash(puits_ids)
+        return lignes
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        objs = list(objs)
+        if self.model.CHAMPS_COORDONNEES.intersection(fields):
+            for puit in objs:
+                puit.geohash = puit.calculer_geohash()
+            fields = [*fields, 'geohash']
+        return super().bulk_update(objs, fields, batch_size=batch_size)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for puit in objs:
+            puit.geohash = puit.calculer_geohash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields and self.model.CHAMPS_COORDONNEES.intersection(update_fields):
+            kwargs['update_fields'] = [*update_fields, 'geohash']
+        return super().bulk_create(objs, *args, **kwargs)
 
 
 class Puit(models.Model):
@@ -132,13 +197,131 @@ class Puit(models.Model):
     )
     is_archived = models.BooleanField(default=False)
     
+    # Recherche plein texte, maintenue par PostgreSQL à chaque écriture
+    recherche = models.GeneratedField(
+        expression=vecteur_recherche(('nom', 'A'), ('name', 'A'), ('location', 'B'), ('description', 'C')),
+        output_field=SearchVectorField(),
+        db_persist=True,
+        verbose_name=_('Vecteur de recherche')
+    )
+    
+    # Opérations non terminées, tenu à jour par OperationPuit (voir `ajuster_operations_ouvertes`)
+    operations_ouvertes = models.PositiveIntegerField(default=0, editable=False,
+                                                      verbose_name=_('Opérations ouvertes'))
+    
+    # Cellule geohash de la position, recalculée à chaque sauvegarde
+    geohash = models.CharField(max_length=12, blank=True, editable=False, verbose_name=_('Geohash'))
+    
+    CHAMPS_COORDONNEES = {'latitude', 'longitude', 'coord_x', 'coord_y'}
+    CHAMPS_COMPTEURS = {'operations_ouvertes'}
+    
+    objects = PuitQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.nom or self.name} ({self.get_statut_display() if self.statut else self.get_status_display()})"
     
+    @property
+    def position(self):
+        """Position (latitude, longitude) en degrés : latitude/longitude, à défaut coord_y/coord_x."""
+        latitude = self.latitude if self.latitude is not None else self.coord_y
+        longitude = self.longitude if self.longitude is not None else self.coord_x
+        if latitude is None or longitude is None:
+            return None
+        return float(latitude), float(longitude)
+    
+    def calculer_geohash(self):
+        """Geohash de la position courante, chaîne vide sans position."""
+        position = self.position
+        return encoder_geohash(*position) if position else ''
+    
+    @classmethod
+    def recalculer_geohash(cls, puits_ids=None, taille_lot=1000):
+        """
+        Recalcule le geohash des puits (tous par défaut) par lots de `taille_lot`.
+        
+        Rattrape les puits écrits sans passer par `save()`. Retourne le nombre
+        de puits dont le geohash a été corrigé.
+        """
+        puits = cls.objects.all() if puits_ids is None else cls.objects.filter(pk__in=puits_ids)
+        puits = puits.only('pk', 'geohash', *cls.CHAMPS_COORDONNEES).order_by()
+        lot, total = [], 0
+        for puit in puits.iterator(chunk_size=taille_lot):
+            geohash = puit.calculer_geohash()
+            if geohash != puit.geohash:
+                puit.geohash = geohash
+                lot.append(puit)
+            if len(lot) >= taille_lot:
+                cls.objects.bulk_update(lot, ['geohash'])
+                total += len(lot)
+                lot = []
+        if lot:
+            cls.objects.bulk_update(lot, ['geohash'])
+            total += len(lot)
+        return total
+    
+    @classmethod
+    def marquer_modifies(cls, puits_ids):
+        """Avance la date de mise à jour des puits dont une ressource imbriquée a changé."""
+        puits_ids = {puit_id for puit_id in puits_ids if puit_id is not None}
+        if puits_ids:
+            maintenant = timezone.now()
+            cls.objects.filter(pk__in=puits_ids).update(last_updated=maintenant, derniere_maj=maintenant)
+    
+    @classmethod
+    def ajuster_operations_ouvertes(cls, puit_id, delta):
+        """Incrémente (ou décrémente) atomiquement le compteur d'opérations ouvertes du puits."""
+        if puit_id is not None and delta:
+            cls.objects.filter(pk=puit_id).update(
+                operations_ouvertes=Greatest(models.F('operations_ouvertes') + delta, 0)
+            )
+    
+    @classmethod
+    def recalculer_operations_ouvertes(cls):
+        """Recalcule tous les compteurs d'opérations ouvertes en une requête."""
+        ouvertes = (
+            OperationPuit.objects.filter(puit=models.OuterRef('pk'))
+            .exclude(status__in=STATUTS_OPERATION_FERMES)
+            .order_by()
+            .values('puit')
+            .annotate(total=models.Count('pk'))
+            .values('total')
+        )
+        return cls.objects.update(
+            operations_ouvertes=Coalesce(models.Subquery(ouvertes), 0)
+        )
+    
+    def save(self, *args, **kwargs):
+        self.geohash = self.calculer_geohash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and self.CHAMPS_COORDONNEES.intersection(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        elif update_fields is None and not self._state.adding:
+            # Les compteurs sont maintenus par des UPDATE atomiques : une sauvegarde
+            # complète ne doit pas réécrire la valeur (peut-être périmée) chargée en mémoire.
+            exclus = self.get_deferred_fields() | self.CHAMPS_COMPTEURS
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and not field.generated and field.attname not in exclus
+            ]
+        super().save(*args, **kwargs)
+    
     class Meta:
         verbose_name = _('Puit')
         verbose_name_plural = _('Puits')
         ordering = ['-date_creation']
+        indexes = [
+            GinIndex(fields=['recherche'], name='puit_recherche_gin'),
+            # Liste par défaut : puits non archivés, du plus récent au plus ancien
+            models.Index(fields=['-creation_date', '-id'], condition=models.Q(is_archived=False),
+                         name='puit_actif_creation_idx'),
+            models.Index(fields=['status', '-creation_date', '-id'], condition=models.Q(is_archived=False),
+                         name='puit_actif_statut_idx'),
+            # Recherche par préfixe geohash (LIKE 'abc%')
+            models.Index(fields=['geohash'], opclasses=['varchar_pattern_ops'], name='puit_geohash_idx'),
+            # Autocomplétion par trigrammes (extension pg_trgm)
+            GinIndex(fields=['nom'], opclasses=['gin_trgm_ops'], name='puit_nom_trgm'),
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='puit_name_trgm'),
+        ]
 
 
 class Forage(models.Model):
@@ -284,6 +467,66 @@ class Indicateur(models.Model):
         verbose_name = _('Indicateur')
         verbose_name_plural = _('Indicateurs')
         ordering = ['-date_mesure']
+        # La table est partitionnée par mois sur date_mesure (commande `indicateur_partitions`) ;
+        # les index sont créés sur chaque partition.
+        indexes = [
+            BrinIndex(fields=['date_mesure'], name='indicateur_date_mesure_brin'),
+            models.Index(fields=['operation', '-date_mesure'], name='indicateur_operation_date_idx'),
+        ]
+
+
+class GranulariteSerie(models.TextChoices):
+    """Largeurs des intervalles des séries agrégées d'indicateurs (bornes en UTC)."""
+    HEURE = 'hour', _('Heure')
+    JOUR = 'day', _('Jour')
+    SEMAINE = 'week', _('Semaine')
+    MOIS = 'month', _('Mois')
+
+
+class AgregatIndicateur(models.Model):
+    """
+    Agrégat des mesures d'un type d'indicateur d'un puits sur un intervalle de temps.
+
+    Une ligne par (puits, type d'indicateur, granularité, début d'intervalle),
+    maintenue au fil de l'eau par les signaux des indicateurs et reconstruite
+    par la commande `rebuild_indicateur_series`. Les sommes et effectifs
+    permettent de calculer les moyennes ; les champs `derniere_*` portent la
+    valeur de la mesure la plus récente de l'intervalle.
+    """
+    puit = models.ForeignKey(Puit, on_delete=models.CASCADE, related_name='agregats_indicateurs',
+                             verbose_name=_('Puit'))
+    type_indicateur = models.ForeignKey(TypeIndicateur, on_delete=models.CASCADE, related_name='agregats',
+                                        verbose_name=_('Type d\'indicateur'))
+    granularite = models.CharField(max_length=5, choices=GranulariteSerie.choices, verbose_name=_('Granularité'))
+    debut = models.DateTimeField(verbose_name=_('Début de l\'intervalle'))
+    nombre = models.PositiveIntegerField(default=0, verbose_name=_('Nombre de mesures'))
+    derniere_date = models.DateTimeField(verbose_name=_('Date de la dernière mesure'))
+
+    nombre_reelle = models.PositiveIntegerField(default=0, verbose_name=_('Nombre de valeurs réelles'))
+    min_reelle = models.DecimalField(max_digits=12, decimal_places=4, null=True, verbose_name=_('Minimum réel'))
+    max_reelle = models.DecimalField(max_digits=12, decimal_places=4, null=True, verbose_name=_('Maximum réel'))
+    somme_reelle = models.DecimalField(max_digits=20, decimal_places=4, null=True, verbose_name=_('Somme réelle'))
+    derniere_reelle = models.DecimalField(max_digits=12, decimal_places=4, null=True,
+                                          verbose_name=_('Dernière valeur réelle'))
+
+    nombre_prevue = models.PositiveIntegerField(default=0, verbose_name=_('Nombre de valeurs prévues'))
+    min_prevue = models.DecimalField(max_digits=12, decimal_places=4, null=True, verbose_name=_('Minimum prévu'))
+    max_prevue = models.DecimalField(max_digits=12, decimal_places=4, null=True, verbose_name=_('Maximum prévu'))
+    somme_prevue = models.DecimalField(max_digits=20, decimal_places=4, null=True, verbose_name=_('Somme prévue'))
+    derniere_prevue = models.DecimalField(max_digits=12, decimal_places=4, null=True,
+                                          verbose_name=_('Dernière valeur prévue'))
+
+    def __str__(self):
+        return f"{self.type_indicateur_id} - {self.puit_id} ({self.granularite} {self.debut:%Y-%m-%d %H:%M})"
+
+    class Meta:
+        verbose_name = _('Agrégat d\'indicateur')
+        verbose_name_plural = _('Agrégats d\'indicateurs')
+        ordering = ['puit', 'type_indicateur', 'granularite', 'debut']
+        constraints = [
+            models.UniqueConstraint(fields=['puit', 'type_indicateur', 'granularite', 'debut'],
+                                    name='agregat_indicateur_intervalle_unique'),
+        ]
 
 
 class Reservoir(models.Model):
@@ -314,7 +557,45 @@ class Reservoir(models.Model):
         ordering = ['nom']
 
 
-class Probleme(models.Model):
+class SourceResumeMixin:
+    """
+    Modèle comptabilisé dans le résumé dénormalisé de son puits (`ResumePuit`).
+
+    `save()` ajuste le résumé dans la même transaction que l'écriture ; les
+    suppressions sont traitées par le signal `post_delete`, émis dans la
+    transaction du `delete()`. `CHAMPS_RESUME` liste les champs dont dépend
+    la contribution d'une ligne, calculée par `contribution_resume`.
+    """
+    CHAMPS_RESUME = ('puit',)
+    COMPTEUR_RESUME = None
+    RESUME_DERNIER_RAPPORT = False
+
+    @classmethod
+    def attributs_resume(cls):
+        return [cls._meta.get_field(champ).attname for champ in cls.CHAMPS_RESUME]
+
+    def etat_resume(self):
+        return {attribut: getattr(self, attribut) for attribut in self.attributs_resume()}
+
+    @classmethod
+    def contribution_resume(cls, etat):
+        """Couple (puit_id, {compteur: valeur}) apporté au résumé par une ligne dans l'état `etat`."""
+        return etat['puit_id'], {cls.COMPTEUR_RESUME: 1}
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not set(update_fields).intersection(self.CHAMPS_RESUME):
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            precedent = None
+            if not self._state.adding and self.pk is not None:
+                precedent = type(self)._base_manager.filter(pk=self.pk).values(*self.attributs_resume()).first()
+            super().save(*args, **kwargs)
+            ResumePuit.appliquer(type(self), precedent, self.etat_resume())
+
+
+class Probleme(SourceResumeMixin, models.Model):
     """Modèle représentant les problèmes et incidents."""
     
     class Type(models.TextChoices):
@@ -357,9 +638,19 @@ class Probleme(models.Model):
     impact_delai = models.PositiveIntegerField(null=True, blank=True, help_text=_('Impact délai en heures'), 
                                              verbose_name=_('Impact délai'))
     
+    STATUTS_OUVERTS = (Statut.OUVERT, Statut.EN_COURS)
+    CHAMPS_RESUME = ('operation', 'statut')
+    
     def __str__(self):
         return f"{self.titre} - {self.get_gravite_display()}"
     
+    @classmethod
+    def contribution_resume(cls, etat):
+        puit_id = OperationDetaille.objects.filter(pk=etat['operation_id']).values_list(
+            'phase__forage__puit_id', flat=True
+        ).first()
+        return puit_id, {'problemes_ouverts': int(etat['statut'] in cls.STATUTS_OUVERTS)}
+    
     class Meta:
         verbose_name = _('Problème')
         verbose_name_plural = _('Problèmes')
@@ -368,7 +659,7 @@ class Probleme(models.Model):
 
 # Modèles de compatibilité avec les versions précédentes (à conserver)
 
-class OperationPuit(models.Model):
+class OperationPuit(SourceResumeMixin, models.Model):
     """Modèle représentant une opération effectuée sur un puit."""
     puit = models.ForeignKey(Puit, on_delete=models.CASCADE, related_name='operations')
     type_operation = models.CharField(
@@ -414,16 +705,62 @@ class OperationPuit(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Recherche plein texte, maintenue par PostgreSQL à chaque écriture
+    recherche = models.GeneratedField(
+        expression=vecteur_recherche(('nom', 'A'), ('name', 'A'), ('description', 'B')),
+        output_field=SearchVectorField(),
+        db_persist=True,
+        verbose_name=_('Vecteur de recherche')
+    )
+    
+    COMPTEUR_RESUME = 'nombre_operations'
+    
     def __str__(self):
         return f"{self.type_operation} - {self.puit.nom or self.puit.name} - {self.statut}"
     
+    @property
+    def est_ouverte(self):
+        return self.status not in STATUTS_OPERATION_FERMES
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # État connu en base, pour ajuster le compteur du puits à la sauvegarde.
+        if 'status' in instance.__dict__ and 'puit_id' in instance.__dict__:
+            instance._etat_compteur = (instance.puit_id, instance.est_ouverte)
+        return instance
+    
+    def save(self, *args, **kwargs):
+        precedent = getattr(self, '_etat_compteur', None)
+        if precedent is None and not self._state.adding and self.pk is not None:
+            ligne = type(self).objects.filter(pk=self.pk).values_list('puit_id', 'status').first()
+            if ligne is not None:
+                precedent = (ligne[0], ligne[1] not in STATUTS_OPERATION_FERMES)
+        
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            actuel = (self.puit_id, self.est_ouverte)
+            if precedent != actuel:
+                if precedent is not None and precedent[1]:
+                    Puit.ajuster_operations_ouvertes(precedent[0], -1)
+                if actuel[1]:
+                    Puit.ajuster_operations_ouvertes(actuel[0], 1)
+        self._etat_compteur = actuel
+    
     class Meta:
         verbose_name = _('Opération de puit')
         verbose_name_plural = _('Opérations de puit')
         ordering = ['-date_debut_prevue']
+        indexes = [
+            GinIndex(fields=['recherche'], name='operation_puit_recherche_gin'),
+            models.Index(fields=['well', '-planned_start_date', '-id'], name='operation_puit_well_date_idx'),
+            models.Index(fields=['well', 'status', '-planned_start_date'], name='operation_puit_well_statut_idx'),
+            models.Index(fields=['status', 'operation_type', '-planned_start_date'],
+                         name='operation_puit_statut_type_idx'),
+        ]
 
 
-class RapportQuotidien(models.Model):
+class RapportQuotidien(SourceResumeMixin, models.Model):
     """Modèle pour les rapports quotidiens sur les opérations de puits."""
     puit = models.ForeignKey(Puit, on_delete=models.CASCADE, related_name='rapports_quotidiens', 
                             verbose_name=_('Puit'))
@@ -468,6 +805,22 @@ class RapportQuotidien(models.Model):
     submitted_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Recherche plein texte, maintenue par PostgreSQL à chaque écriture
+    recherche = models.GeneratedField(
+        expression=vecteur_recherche(
+            ('activites', 'A'), ('activities', 'A'),
+            ('problemes', 'B'), ('issues', 'B'),
+            ('solutions', 'C')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+        verbose_name=_('Vecteur de recherche')
+    )
+    
+    CHAMPS_RESUME = ('puit', 'date_rapport')
+    COMPTEUR_RESUME = 'nombre_rapports'
+    RESUME_DERNIER_RAPPORT = True
+    
     def __str__(self):
         return f"Rapport pour {self.puit.nom or self.well.name} le {self.date_rapport or self.report_date}"
     
@@ -476,9 +829,13 @@ class RapportQuotidien(models.Model):
         verbose_name_plural = _('Rapports quotidiens')
         ordering = ['-date_rapport']
         unique_together = ['puit', 'date_rapport']
+        indexes = [
+            GinIndex(fields=['recherche'], name='rapport_recherche_gin'),
+            models.Index(fields=['well', '-report_date', '-id'], name='rapport_well_date_idx'),
+        ]
 
 
-class Document(models.Model):
+class Document(SourceResumeMixin, models.Model):
     """Modèle pour les documents liés aux puits."""
     # Relations
     puit = models.ForeignKey(Puit, on_delete=models.CASCADE, related_name='documents', verbose_name=_('Puit'))
@@ -516,6 +873,8 @@ class Document(models.Model):
     )
     uploaded_at = models.DateTimeField(auto_now_add=True)
     
+    COMPTEUR_RESUME = 'nombre_documents'
+    
     def __str__(self):
         return f"{self.nom or self.title} - {self.puit.nom if self.puit else (self.well.nom if self.well else 'N/A')}"
     
@@ -524,6 +883,109 @@ class Document(models.Model):
         verbose_name_plural = _('Documents')
         ordering = ['-date_upload']
 
+
+class ResumePuit(models.Model):
+    """
+    Résumé dénormalisé d'un puits : effectifs et date du dernier rapport.
+
+    Les listes de puits lisent ces chiffres par une simple jointure au lieu
+    d'un COUNT par ressource. Les compteurs sont ajustés par des UPDATE
+    atomiques dans la transaction de chaque écriture (voir
+    `SourceResumeMixin`) ; la commande `rebuild_well_summaries` corrige
+    toute dérive (écritures en masse via `QuerySet.update()` ou
+    `bulk_create()`, qui ne passent pas par `save()`).
+    """
+    puit = models.OneToOneField(Puit, on_delete=models.CASCADE, primary_key=True, related_name='resume',
+                                verbose_name=_('Puit'))
+    nombre_operations = models.PositiveIntegerField(default=0, verbose_name=_('Nombre d\'opérations'))
+    nombre_rapports = models.PositiveIntegerField(default=0, verbose_name=_('Nombre de rapports'))
+    problemes_ouverts = models.PositiveIntegerField(default=0, verbose_name=_('Problèmes ouverts'))
+    nombre_documents = models.PositiveIntegerField(default=0, verbose_name=_('Nombre de documents'))
+    dernier_rapport = models.DateField(null=True, blank=True, verbose_name=_('Date du dernier rapport'))
+    date_maj = models.DateTimeField(auto_now=True, verbose_name=_('Date de mise à jour'))
+    
+    CHAMPS = ('nombre_operations', 'nombre_rapports', 'problemes_ouverts', 'nombre_documents', 'dernier_rapport')
+    
+    def __str__(self):
+        return f"Résumé - {self.puit_id}"
+    
+    @classmethod
+    def expressions_sources(cls, puit):
+        """Sous-requêtes calculant chaque champ du résumé depuis les tables sources pour `puit` (OuterRef)."""
+        def compter(queryset, champ_puit):
+            total = (
+                queryset.filter(**{champ_puit: puit})
+                .order_by()
+                .values(champ_puit)
+                .annotate(total=models.Count('pk'))
+                .values('total')
+            )
+            return Coalesce(models.Subquery(total), 0)
+        
+        return {
+            'nombre_operations': compter(OperationPuit.objects.all(), 'puit'),
+            'nombre_rapports': compter(RapportQuotidien.objects.all(), 'puit'),
+            'problemes_ouverts': compter(
+                Probleme.objects.filter(statut__in=Probleme.STATUTS_OUVERTS), 'operation__phase__forage__puit'
+            ),
+            'nombre_documents': compter(Document.objects.all(), 'puit'),
+            'dernier_rapport': models.Subquery(
+                RapportQuotidien.objects.filter(puit=puit).order_by('-date_rapport').values('date_rapport')[:1]
+            ),
+        }
+    
+    @classmethod
+    def recalculer(cls, puits_ids=None):
+        """Recalcule depuis les tables sources les résumés des puits donnés (tous par défaut)."""
+        puits = Puit.objects.all() if puits_ids is None else Puit.objects.filter(pk__in=puits_ids)
+        valeurs = puits.order_by().annotate(**cls.expressions_sources(models.OuterRef('pk'))).values('pk', *cls.CHAMPS)
+        resumes = [cls(puit_id=ligne.pop('pk'), **ligne) for ligne in valeurs]
+        cls.objects.bulk_create(
+            resumes, batch_size=1000,
+            update_conflicts=True, unique_fields=['puit'], update_fields=[*cls.CHAMPS, 'date_maj']
+        )
+        return len(resumes)
+    
+    @classmethod
+    def ajuster(cls, puit_id, deltas, dernier_rapport=False, creer=True):
+        """
+        Applique des variations de compteurs (et, au besoin, recalcule le dernier rapport) au résumé du puits.
+
+        Si le résumé n'existe pas encore, il est calculé depuis les tables
+        sources (sauf avec `creer=False`, utilisé pendant les suppressions
+        en cascade d'un puits).
+        """
+        if puit_id is None:
+            return
+        valeurs = {champ: Greatest(models.F(champ) + delta, 0) for champ, delta in deltas.items() if delta}
+        if dernier_rapport:
+            valeurs['dernier_rapport'] = cls.expressions_sources(models.OuterRef('puit'))['dernier_rapport']
+        if not valeurs:
+            return
+        valeurs['date_maj'] = timezone.now()
+        if not cls.objects.filter(puit_id=puit_id).update(**valeurs) and creer:
+            cls.recalculer([puit_id])
+    
+    @classmethod
+    def appliquer(cls, modele, precedent, actuel, creer=True):
+        """Reporte sur les résumés le passage d'une ligne de `modele` de l'état `precedent` à `actuel`."""
+        if precedent == actuel:
+            return
+        deltas = {}
+        for etat, signe in ((precedent, -1), (actuel, 1)):
+            if etat is None:
+                continue
+            puit_id, compteurs = modele.contribution_resume(etat)
+            for champ, valeur in compteurs.items():
+                deltas.setdefault(puit_id, {}).setdefault(champ, 0)
+                deltas[puit_id][champ] += signe * valeur
+        for puit_id, compteurs in deltas.items():
+            cls.ajuster(puit_id, compteurs, dernier_rapport=modele.RESUME_DERNIER_RAPPORT, creer=creer)
+    
+    class Meta:
+        verbose_name = _('Résumé de puit')
+        verbose_name_plural = _('Résumés de puits')
+
 # Alias for backward compatibility
 Well = Puit
 WellOperation = OperationPuit
@@ -0,0 +1,147 @@
+from base64 import b64decode, b64encode
+from collections import namedtuple
+from urllib import parse
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# `position` holds the ordering value of the anchor row (None when that value is NULL),
+# `pk` its primary key, used as a tiebreaker so that no offset is ever needed.
+KeysetCursor = namedtuple('KeysetCursor', ['reverse', 'position', 'pk'])
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination keyed on (ordering field, pk).
+
+    Every page is fetched with a `WHERE (field, pk) < (value, id)` style
+    filter and a `LIMIT page_size + 1`, so the cost of a page does not depend
+    on how deep the client has scrolled. The ordering field comes from the
+    view (`ordering` / `?ordering=`), the primary key breaks ties between rows
+    sharing the same value.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = '-pk'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if self.cursor is not None:
+            queryset = queryset.filter(self._get_keyset_filter(self.cursor))
+
+        # Fetch one extra row to know whether another page follows.
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > len(self.page)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        """Keep the primary ordering field and append the pk tiebreaker."""
+        primary = super().get_ordering(request, queryset, view)[0]
+        if primary.lstrip('-') in ('pk', 'id'):
+            return (primary,)
+        tiebreaker = '-pk' if primary.startswith('-') else 'pk'
+        return (primary, tiebreaker)
+
+    def _get_keyset_filter(self, cursor):
+        order = self.ordering[0]
+        field = order.lstrip('-')
+        descending = order.startswith('-') != cursor.reverse
+        lookup = 'lt' if descending else 'gt'
+        tiebreak = Q(**{f'pk__{lookup}': cursor.pk})
+
+        if field in ('pk', 'id'):
+            return tiebreak
+
+        # PostgreSQL sorts NULL above every value: first in descending order, last in ascending order.
+        if cursor.position is None:
+            same_position = Q(**{f'{field}__isnull': True}) & tiebreak
+            if descending:
+                return same_position | Q(**{f'{field}__isnull': False})
+            return same_position
+
+        keyset = Q(**{f'{field}__{lookup}': cursor.position}) | (Q(**{field: cursor.position}) & tiebreak)
+        if descending:
+            return keyset
+        return keyset | Q(**{f'{field}__isnull': True})
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # An empty backward page means we reached the head of the list.
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self._get_cursor_for_instance(self.page[-1], reverse=False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return self.encode_cursor(self.cursor._replace(reverse=True))
+        return self.encode_cursor(self._get_cursor_for_instance(self.page[0], reverse=True))
+
+    def _get_cursor_for_instance(self, instance, reverse):
+        field = self.ordering[0].lstrip('-')
+        if isinstance(instance, dict):
+            value, pk = instance.get(field), instance.get('pk', instance.get('id'))
+        else:
+            value, pk = instance.serializable_value(field), instance.pk
+        if field in ('pk', 'id'):
+            value = pk
+        return KeysetCursor(reverse=reverse, position=None if value is None else str(value), pk=pk)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+            position = tokens.get('p', [None])[0]
+            pk = int(tokens['k'][0])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return KeysetCursor(reverse=reverse, position=position, pk=pk)
+
+    def encode_cursor(self, cursor):
+        tokens = {'k': str(cursor.pk)}
+        if cursor.reverse:
+            tokens['r'] = '1'
+        if cursor.position is not None:
+            tokens['p'] = cursor.position
+
+        querystring = parse.urlencode(tokens, doseq=True)
+        encoded = b64encode(querystring.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
@@ -0,0 +1,212 @@
+import re
+from datetime import date
+
+from django.db import connection, transaction
+
+from .region_models import Indicateur
+
+CLE_PARTITION = 'date_mesure'
+
+
+def debut_mois(jour):
+    return date(jour.year, jour.month, 1)
+
+
+def ajouter_mois(jour, nombre):
+    """Premier jour du mois situé `nombre` mois après celui de `jour`."""
+    index = jour.year * 12 + jour.month - 1 + nombre
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def nom_table():
+    return Indicateur._meta.db_table
+
+
+def nom_partition(mois):
+    return f'{nom_table()}_p{mois:%Y%m}'
+
+
+def nom_partition_defaut():
+    return f'{nom_table()}_defaut'
+
+
+MOTIF_PARTITION = re.compile(r'_p(\d{4})(\d{2})$')
+
+
+def est_partitionnee():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+            [connection.ops.quote_name(nom_table())]
+        )
+        return cursor.fetchone() is not None
+
+
+def partitions_existantes():
+    """Partitions mensuelles attachées, sous forme {premier jour du mois: nom de table}."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(%s)
+            """,
+            [connection.ops.quote_name(nom_table())]
+        )
+        partitions = {}
+        for (nom,) in cursor.fetchall():
+            correspondance = MOTIF_PARTITION.search(nom)
+            if correspondance:
+                partitions[date(int(correspondance.group(1)), int(correspondance.group(2)), 1)] = nom
+        return partitions
+
+
+def creer_partition_defaut(cursor):
+    """Crée (si besoin) la partition DEFAULT, qui reçoit les dates hors des mois créés ou détachés."""
+    quote = connection.ops.quote_name
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {quote(nom_partition_defaut())} PARTITION OF {quote(nom_table())} DEFAULT")
+
+
+def creer_partition(cursor, mois):
+    """
+    Crée (si besoin) la partition couvrant le mois commençant à `mois` ; retourne
+    vrai si la table a été créée.
+
+    PostgreSQL refuse de créer une partition dont des lignes se trouvent déjà
+    dans la partition DEFAULT : la table est alors créée seule, les lignes du
+    mois y sont déplacées, puis elle est attachée.
+    """
+    quote = connection.ops.quote_name
+    table, partition, defaut = nom_table(), nom_partition(mois), nom_partition_defaut()
+    bornes = [mois.isoformat(), ajouter_mois(mois, 1).isoformat()]
+    cursor.execute("SELECT to_regclass(%s), to_regclass(%s)", [quote(partition), quote(defaut)])
+    existante, defaut_existante = cursor.fetchone()
+    if existante is not None:
+        # Déjà créée, ou détachée et conservée pour archivage : ses dates restent dans DEFAULT.
+        return False
+    if defaut_existante is None:
+        cursor.execute(
+            f"CREATE TABLE {quote(partition)} PARTITION OF {quote(table)} FOR VALUES FROM (%s) TO (%s)",
+            bornes
+        )
+        return True
+
+    colonnes = ', '.join(quote(field.column) for field in Indicateur._meta.concrete_fields)
+    cursor.execute(
+        f"CREATE TABLE {quote(partition)} (LIKE {quote(table)} INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING STORAGE)"
+    )
+    cursor.execute(
+        f"WITH deplacees AS ("
+        f"DELETE FROM {quote(defaut)} WHERE {quote(CLE_PARTITION)} >= %s AND {quote(CLE_PARTITION)} < %s "
+        f"RETURNING {colonnes}) "
+        f"INSERT INTO {quote(partition)} ({colonnes}) SELECT {colonnes} FROM deplacees",
+        bornes
+    )
+    cursor.execute(
+        f"ALTER TABLE {quote(table)} ATTACH PARTITION {quote(partition)} FOR VALUES FROM (%s) TO (%s)",
+        bornes
+    )
+    return True
+
+
+def creer_partitions(depuis, jusqua):
+    """Crée les partitions mensuelles de `depuis` à `jusqua` inclus ; retourne les mois créés."""
+    existantes = partitions_existantes()
+    crees = []
+    mois = debut_mois(depuis)
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Tables converties avant l'ajout de la partition DEFAULT.
+        creer_partition_defaut(cursor)
+        while mois <= jusqua:
+            if mois not in existantes and creer_partition(cursor, mois):
+                crees.append(mois)
+            mois = ajouter_mois(mois, 1)
+    return crees
+
+
+def detacher_partitions(avant, supprimer=False):
+    """
+    Détache les partitions dont le mois se termine avant `avant`.
+
+    La rétention se fait en DDL (DETACH puis, au besoin, DROP) : aucune ligne
+    n'est supprimée une à une. Sans `supprimer`, les tables détachées restent
+    disponibles pour archivage. Retourne les noms des partitions traitées.
+    """
+    quote = connection.ops.quote_name
+    traitees = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for mois, nom in sorted(partitions_existantes().items()):
+            if ajouter_mois(mois, 1) > avant:
+                continue
+            cursor.execute(f"ALTER TABLE {quote(nom_table())} DETACH PARTITION {quote(nom)}")
+            if supprimer:
+                cursor.execute(f"DROP TABLE {quote(nom)}")
+            traitees.append(nom)
+    return traitees
+
+
+def convertir_en_table_partitionnee(mois_avance):
+    """
+    Convertit la table des indicateurs en table partitionnée par mois sur `date_mesure`.
+
+    PostgreSQL impose que la clé de partition fasse partie de la clé
+    primaire : elle devient (id, date_mesure). Une partition DEFAULT reçoit
+    les dates antérieures à la première partition ou au-delà de la dernière,
+    pour qu'aucune écriture ne soit refusée. L'ORM continue d'utiliser `id`
+    comme clé primaire. Les données existantes sont recopiées dans les
+    partitions, puis les contraintes et index du modèle sont recréés.
+    Tout s'exécute dans une transaction.
+    """
+    quote = connection.ops.quote_name
+    table = nom_table()
+    ancienne = f'{table}_avant_partition'
+    colonnes = ', '.join(quote(field.column) for field in Indicateur._meta.concrete_fields)
+    pk = quote(Indicateur._meta.pk.column)
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {quote(table)} RENAME TO {quote(ancienne)}")
+            cursor.execute(
+                f"CREATE TABLE {quote(table)} (LIKE {quote(ancienne)} "
+                f"INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING GENERATED INCLUDING STORAGE) "
+                f"PARTITION BY RANGE ({quote(CLE_PARTITION)})"
+            )
+
+            cursor.execute(f"SELECT MIN({quote(CLE_PARTITION)}), MAX({quote(CLE_PARTITION)}) FROM {quote(ancienne)}")
+            premiere, derniere = cursor.fetchone()
+            aujourd_hui = date.today()
+            mois = debut_mois(premiere.date() if premiere else aujourd_hui)
+            fin = max(debut_mois(derniere.date()) if derniere else mois, ajouter_mois(aujourd_hui, mois_avance))
+            while mois <= fin:
+                creer_partition(cursor, mois)
+                mois = ajouter_mois(mois, 1)
+            creer_partition_defaut(cursor)
+
+            cursor.execute(
+                f"INSERT INTO {quote(table)} ({colonnes}) OVERRIDING SYSTEM VALUE "
+                f"SELECT {colonnes} FROM {quote(ancienne)}"
+            )
+            cursor.execute(f"DROP TABLE {quote(ancienne)}")
+
+            cursor.execute(
+                f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(table + '_pkey')} "
+                f"PRIMARY KEY ({pk}, {quote(CLE_PARTITION)})"
+            )
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence(%s, %s), COALESCE(MAX({pk}), 0) + 1, false) "
+                f"FROM {quote(table)}",
+                [table, Indicateur._meta.pk.column]
+            )
+
+        # Clés étrangères, index des clés étrangères et index du modèle (BRIN compris).
+        with connection.schema_editor() as schema_editor:
+            for field in Indicateur._meta.concrete_fields:
+                if field.remote_field and field.db_constraint:
+                    schema_editor.execute(
+                        schema_editor._create_fk_sql(Indicateur, field, '_fk_%(to_table)s_%(to_column)s')
+                    )
+                if field.remote_field and field.db_index:
+                    schema_editor.execute(schema_editor._create_index_sql(Indicateur, fields=[field]))
+            for index in Indicateur._meta.indexes:
+                schema_editor.add_index(Indicateur, index)
@@ -0,0 +1,109 @@
+from django.core.cache import cache
+from django.db import connection
+
+from .models import Well, StatutPuit
+from .region_models import Region, Forage, Phase, Operation
+
+CLE_SYNTHESE_REGIONS = 'wells:regions:rollup:{}'
+DUREE_SYNTHESE_REGIONS = 900
+
+
+def cle_synthese_regions(inclure_archives):
+    return CLE_SYNTHESE_REGIONS.format('all' if inclure_archives else 'active')
+
+
+def _requete_synthese():
+    """
+    Requête unique regroupée par région.
+
+    Le CTE ramène chaque puits à une ligne (coût de forage, somme des coûts
+    d'opération, profondeurs prévue et réelle atteintes, c'est-à-dire la plus
+    grande profondeur de ses phases) avant le regroupement : les jointures
+    puits → phases → opérations ne multiplient donc pas les coûts de forage.
+    """
+    quote = connection.ops.quote_name
+    comptages = ',\n               '.join(
+        f"count(puits.id) FILTER (WHERE puits.statut = %s) AS {quote('statut_' + statut)}"
+        for statut in StatutPuit.values
+    )
+    return f"""
+        WITH puits AS (
+            SELECT p.id, p.region_id, p.statut, f.cout AS cout_forage,
+                   phases.profondeur_prevue, phases.profondeur_reelle, operations.cout AS cout_operations
+            FROM {quote(Well._meta.db_table)} p
+            LEFT JOIN {quote(Forage._meta.db_table)} f ON f.puit_id = p.id
+            LEFT JOIN LATERAL (
+                SELECT max(ph.profondeur_prevue) AS profondeur_prevue, max(ph.profondeur_reelle) AS profondeur_reelle
+                FROM {quote(Phase._meta.db_table)} ph
+                WHERE ph.forage_id = f.id
+            ) phases ON TRUE
+            LEFT JOIN LATERAL (
+                SELECT sum(o.cout) AS cout
+                FROM {quote(Operation._meta.db_table)} o
+                JOIN {quote(Phase._meta.db_table)} ph ON ph.id = o.phase_id
+                WHERE ph.forage_id = f.id
+            ) operations ON TRUE
+            WHERE p.region_id IS NOT NULL AND (%s OR NOT p.is_archived)
+        )
+        SELECT r.id, r.code, r.nom,
+               count(puits.id),
+               {comptages},
+               sum(puits.cout_forage), avg(puits.cout_forage), sum(puits.cout_operations),
+               sum(puits.profondeur_prevue), sum(puits.profondeur_reelle)
+        FROM {quote(Region._meta.db_table)} r
+        LEFT JOIN puits ON puits.region_id = r.id
+        GROUP BY r.id, r.code, r.nom
+        ORDER BY r.nom, r.id
+    """
+
+
+def _flottant(valeur):
+    return float(valeur) if valeur is not None else None
+
+
+def calculer_synthese_regions(inclure_archives=False):
+    """
+    Coûts et avancement de chaque région, en une requête.
+
+    Pour chaque région : nombre de puits (total et par statut), coût total et
+    moyen des forages, coût des opérations, profondeurs prévue et réelle
+    cumulées sur les puits, et taux d'avancement (réelle / prévue).
+    """
+    statuts = list(StatutPuit.values)
+    with connection.cursor() as cursor:
+        cursor.execute(_requete_synthese(), [inclure_archives, *statuts])
+        lignes = cursor.fetchall()
+
+    regions = []
+    for ligne in lignes:
+        region_id, code, nom, nombre = ligne[:4]
+        comptages = ligne[4:4 + len(statuts)]
+        cout_total, cout_moyen, cout_operations, prevue, reelle = ligne[4 + len(statuts):]
+        regions.append({
+            'id': region_id,
+            'code': code,
+            'nom': nom,
+            'wells': nombre,
+            'wells_by_status': dict(zip(statuts, comptages)),
+            'drilling_cost_total': _flottant(cout_total),
+            'drilling_cost_avg': _flottant(cout_moyen),
+            'operation_cost_total': _flottant(cout_operations),
+            'depth_planned': _flottant(prevue),
+            'depth_actual': _flottant(reelle),
+            'depth_progress': float(reelle / prevue) if prevue and reelle is not None else None,
+        })
+    return regions
+
+
+def synthese_regions(inclure_archives=False):
+    """Synthèse des régions lue depuis le cache, recalculée si absente."""
+    cle = cle_synthese_regions(inclure_archives)
+    regions = cache.get(cle)
+    if regions is None:
+        regions = calculer_synthese_regions(inclure_archives)
+        cache.set(cle, regions, DUREE_SYNTHESE_REGIONS)
+    return regions
+
+
+def invalider_synthese_regions():
+    cache.delete_many([cle_synthese_regions(True), cle_synthese_regions(False)])
@@ -0,0 +1,58 @@
+from functools import reduce
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import DecimalField, F, Q
+from django.db.models.functions import Cast
+from rest_framework import filters
+
+from .models import CONFIGS_RECHERCHE
+
+
+def build_search_query(value):
+    """Combine (OU) la requête analysée avec chaque configuration."""
+    queries = [SearchQuery(value, config=config, search_type='websearch') for config in CONFIGS_RECHERCHE]
+    return reduce(lambda left, right: left | right, queries)
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    Recherche plein texte sur les colonnes tsvector stockées.
+
+    La vue déclare `search_vectors` : le premier champ est la colonne du modèle
+    (utilisée pour le classement), les suivants des colonnes de modèles liés
+    (ex. `well__recherche`). Sans `search_vectors`, le comportement ILIKE de
+    `SearchFilter` est conservé.
+    """
+    rank_annotation = 'search_rank'
+    # `ts_rank` returns a float4: the rank is rounded to an exact numeric so that the
+    # keyset cursor compares the very value it stored (ties then fall to the pk).
+    rank_output_field = DecimalField(max_digits=12, decimal_places=6)
+
+    def get_search_value(self, request):
+        return request.query_params.get(self.search_param, '').replace('\x00', '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        search_vectors = getattr(view, 'search_vectors', None)
+        if not search_vectors:
+            return super().filter_queryset(request, queryset, view)
+
+        value = self.get_search_value(request)
+        if not value:
+            return queryset
+
+        query = build_search_query(value)
+        condition = reduce(lambda left, right: left | right, (Q(**{field: query}) for field in search_vectors))
+        return queryset.filter(condition).annotate(
+            **{self.rank_annotation: Cast(SearchRank(F(search_vectors[0]), query), self.rank_output_field)}
+        )
+
+
+class SearchRankOrderingFilter(filters.OrderingFilter):
+    """Trie par pertinence quand une recherche est active et qu'aucun tri explicite n'est demandé."""
+
+    def get_ordering(self, request, queryset, view):
+        explicit = request.query_params.get(self.ordering_param)
+        searching = getattr(view, 'search_vectors', None) and FullTextSearchFilter().get_search_value(request)
+        if searching and not explicit:
+            return ['-' + FullTextSearchFilter.rank_annotation]
+        return super().get_ordering(request, queryset, view)
@@ -1,8 +1,12 @@
 from rest_framework import serializers
-from .models import Well, WellOperation, DailyReport, WellDocument
+from .cache import reference_cache
+from .fieldsets import SparseFieldsetMixin
+from .compact import CompactField, nom_complet, libelles_choix, objet_lie
+from .models import Well, WellOperation, DailyReport, WellDocument, GranulariteSerie, ResumePuit, StatutPuit
+from .bulk import ACTIONS_MASSE, CHANGER_STATUT
 from .region_models import Region, Forage, Phase, TypeOperation, Operation, Probleme, TypeIndicateur, Indicateur, Reservoir
 
-class WellDocumentSerializer(serializers.ModelSerializer):
+class WellDocumentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     uploaded_by_name = serializers.SerializerMethodField()
     
     class Meta:
@@ -13,47 +17,152 @@ class WellDocumentSerializer(serializers.ModelSerializer):
     def get_uploaded_by_name(self, obj):
         return obj.uploaded_by.get_full_name() if obj.uploaded_by else None
 
-class DailyReportSerializer(serializers.ModelSerializer):
+class DailyReportSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     submitted_by_name = serializers.SerializerMethodField()
     
     class Meta:
         model = DailyReport
-        fields = '__all__'
+        exclude = ['recherche']
         read_only_fields = ['submitted_by', 'submitted_at', 'updated_at', 'submitted_by_name']
         
     def get_submitted_by_name(self, obj):
         return obj.submitted_by.get_full_name() if obj.submitted_by else None
 
-class WellOperationSerializer(serializers.ModelSerializer):
+class DailyReportImportSerializer(serializers.Serializer):
+    """Validates one row of a daily report bulk import (CSV or NDJSON)."""
+    well = serializers.IntegerField(min_value=1)
+    report_date = serializers.DateField()
+    operation = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+    activities = serializers.CharField()
+    progress = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=0, max_value=100)
+    issues = serializers.CharField(required=False, allow_blank=True, default='')
+    solutions = serializers.CharField(required=False, allow_blank=True, default='')
+    hours_worked = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=0)
+
+class GeoBoundingBoxQuerySerializer(serializers.Serializer):
+    """Query parameters of the bounding-box search (degrees; min_lon > max_lon crosses the antimeridian)."""
+    min_lat = serializers.FloatField(min_value=-90, max_value=90)
+    min_lon = serializers.FloatField(min_value=-180, max_value=180)
+    max_lat = serializers.FloatField(min_value=-90, max_value=90)
+    max_lon = serializers.FloatField(min_value=-180, max_value=180)
+
+    def validate(self, attrs):
+        if attrs['min_lat'] > attrs['max_lat']:
+            raise serializers.ValidationError({'min_lat': 'min_lat must not be greater than max_lat.'})
+        return attrs
+
+class GeoRadiusQuerySerializer(serializers.Serializer):
+    """Query parameters of the radius search."""
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lon = serializers.FloatField(min_value=-180, max_value=180)
+    radius_km = serializers.FloatField(min_value=0, max_value=20016)
+    limit = serializers.IntegerField(min_value=1, max_value=1000, default=200)
+
+class GeoNearestQuerySerializer(serializers.Serializer):
+    """Query parameters of the k-nearest search."""
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lon = serializers.FloatField(min_value=-180, max_value=180)
+    k = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+class MissingReportsQuerySerializer(serializers.Serializer):
+    """Query parameters of the missing daily report search (inclusive dates, at most 366 days)."""
+    start = serializers.DateField()
+    end = serializers.DateField()
+    region = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if attrs['start'] > attrs['end']:
+            raise serializers.ValidationError({'start': 'start must not be after end.'})
+        if (attrs['end'] - attrs['start']).days >= 366:
+            raise serializers.ValidationError({'end': 'The range must not exceed 366 days.'})
+        return attrs
+
+class WellAutocompleteQuerySerializer(serializers.Serializer):
+    """Query parameters of the well name autocomplete."""
+    q = serializers.CharField(min_length=2, max_length=100, trim_whitespace=True)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+    archived = serializers.BooleanField(default=False)
+
+class WellBulkFilterSerializer(serializers.Serializer):
+    """Selection criteria of a bulk action, combined with AND."""
+    status = serializers.ChoiceField(choices=StatutPuit.choices, required=False)
+    statut = serializers.ChoiceField(choices=StatutPuit.choices, required=False)
+    region = serializers.IntegerField(required=False)
+    archived = serializers.BooleanField(required=False)
+
+class WellBulkActionSerializer(serializers.Serializer):
+    """Bulk archive / unarchive / status change, applied to `ids` and/or the wells matching `filter`."""
+    action = serializers.ChoiceField(choices=ACTIONS_MASSE)
+    status = serializers.ChoiceField(
+        choices=[choice for choice in StatutPuit.choices if choice[0] != StatutPuit.ARCHIVED], required=False
+    )
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False, max_length=50000)
+    filter = WellBulkFilterSerializer(required=False)
+
+    def validate(self, attrs):
+        if attrs['action'] == CHANGER_STATUT and 'status' not in attrs:
+            raise serializers.ValidationError({'status': 'This field is required for a status change.'})
+        if not attrs.get('ids') and not attrs.get('filter'):
+            raise serializers.ValidationError('Provide a list of ids or a non-empty filter.')
+        return attrs
+
+class WellOperationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     created_by_name = serializers.SerializerMethodField()
     
     class Meta:
         model = WellOperation
-        fields = '__all__'
+        exclude = ['recherche']
         read_only_fields = ['created_by', 'created_at', 'updated_at', 'created_by_name']
         
     def get_created_by_name(self, obj):
         return obj.created_by.get_full_name() if obj.created_by else None
 
-class WellSerializer(serializers.ModelSerializer):
+class WellSummarySerializer(serializers.ModelSerializer):
+    """Denormalized per-well figures (operations, reports, open problems, documents, latest report)."""
+    class Meta:
+        model = ResumePuit
+        fields = ResumePuit.CHAMPS
+
+class WellSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     created_by_name = serializers.SerializerMethodField()
     last_updated_by_name = serializers.SerializerMethodField()
     status_display = serializers.SerializerMethodField()
+    summary = serializers.SerializerMethodField()
+    field_dependencies = {
+        'created_by_name': ['created_by_user'],
+        'status_display': ['status'],
+        'summary': ['resume'],
+    }
+    # Same values as the method fields below, read with .values() by CompactListMixin.
+    compact_fields = {
+        'created_by_name': CompactField(created_by_name=nom_complet('created_by_user')),
+        'last_updated_by_name': CompactField(last_updated_by_name=nom_complet('last_updated_by')),
+        'status_display': CompactField(
+            lambda row, display=libelles_choix(Well, 'status'): display(row['status']), 'status'
+        ),
+        'summary': objet_lie('resume', WellSummarySerializer),
+    }
     
     class Meta:
         model = Well
-        fields = '__all__'
+        exclude = ['recherche']
         read_only_fields = ['created_by', 'creation_date', 'last_updated', 'last_updated_by', 
-                           'created_by_name', 'last_updated_by_name', 'status_display']
+                           'created_by_name', 'last_updated_by_name', 'status_display', 'summary']
         
     def get_created_by_name(self, obj):
-        return obj.created_by.get_full_name() if obj.created_by else None
+        # `created_by` is the legacy free-text column; the creator's account is `created_by_user`.
+        return obj.created_by_user.get_full_name() if obj.created_by_user else None
         
     def get_last_updated_by_name(self, obj):
         return obj.last_updated_by.get_full_name() if obj.last_updated_by else None
         
     def get_status_display(self, obj):
         return obj.get_status_display()
+        
+    def get_summary(self, obj):
+        # Joined with select_related('resume'); a well without a summary row yet reads as empty.
+        resume = getattr(obj, 'resume', None) or ResumePuit(puit=obj)
+        return WellSummarySerializer(resume).data
 
 class WellDetailSerializer(WellSerializer):
     operations = WellOperationSerializer(many=True, read_only=True)
@@ -63,7 +172,8 @@ class WellDetailSerializer(WellSerializer):
     region_details = serializers.SerializerMethodField()
     
     class Meta(WellSerializer.Meta):
-        fields = WellSerializer.Meta.fields + ['operations', 'daily_reports', 'documents', 'forage', 'region_details']
+        # Declared fields (operations, daily_reports, ...) are always included alongside `exclude`.
+        pass
     
     def get_forage(self, obj):
         try:
@@ -72,18 +182,16 @@ class WellDetailSerializer(WellSerializer):
             return None
     
     def get_region_details(self, obj):
-        if obj.region:
-            return RegionSerializer(obj.region).data
-        return None
+        return reference_cache.get(Region, obj.region_id, RegionSerializer)
 
 
 # New serializers for the Java-inspired models
-class RegionSerializer(serializers.ModelSerializer):
+class RegionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Region
         fields = '__all__'
 
-class ForageSerializer(serializers.ModelSerializer):
+class ForageSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     puit_nom = serializers.SerializerMethodField()
     
     class Meta:
@@ -93,12 +201,12 @@ class ForageSerializer(serializers.ModelSerializer):
     def get_puit_nom(self, obj):
         return obj.puit.nom if obj.puit else None
 
-class TypeOperationSerializer(serializers.ModelSerializer):
+class TypeOperationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = TypeOperation
         fields = '__all__'
 
-class PhaseSerializer(serializers.ModelSerializer):
+class PhaseSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     forage_details = serializers.SerializerMethodField()
     operations = serializers.SerializerMethodField()
     
@@ -112,7 +220,7 @@ class PhaseSerializer(serializers.ModelSerializer):
     def get_operations(self, obj):
         return OperationSerializer(obj.operations.all(), many=True).data
 
-class OperationSerializer(serializers.ModelSerializer):
+class OperationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     type_operation_details = serializers.SerializerMethodField()
     created_by_name = serializers.SerializerMethodField()
     
@@ -122,12 +230,12 @@ class OperationSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_by', 'created_at']
         
     def get_type_operation_details(self, obj):
-        return TypeOperationSerializer(obj.type_operation).data
+        return reference_cache.get(TypeOperation, obj.type_operation_id, TypeOperationSerializer)
         
     def get_created_by_name(self, obj):
         return obj.created_by.get_full_name() if obj.created_by else None
 
-class ProblemeSerializer(serializers.ModelSerializer):
+class ProblemeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     detecte_par_name = serializers.SerializerMethodField()
     assigne_a_name = serializers.SerializerMethodField()
     
@@ -142,12 +250,12 @@ class ProblemeSerializer(serializers.ModelSerializer):
     def get_assigne_a_name(self, obj):
         return obj.assigne_a.get_full_name() if obj.assigne_a else None
 
-class TypeIndicateurSerializer(serializers.ModelSerializer):
+class TypeIndicateurSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = TypeIndicateur
         fields = '__all__'
 
-class IndicateurSerializer(serializers.ModelSerializer):
+class IndicateurSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     type_indicateur_details = serializers.SerializerMethodField()
     
     class Meta:
@@ -155,9 +263,25 @@ class IndicateurSerializer(serializers.ModelSerializer):
         fields = '__all__'
         
     def get_type_indicateur_details(self, obj):
-        return TypeIndicateurSerializer(obj.type_indicateur).data
+        return reference_cache.get(TypeIndicateur, obj.type_indicateur_id, TypeIndicateurSerializer)
+
+class IndicateurSeriesQuerySerializer(serializers.Serializer):
+    """Query parameters of the indicator series (buckets are aligned on UTC)."""
+    well_id = serializers.IntegerField()
+    type_indicateur_id = serializers.IntegerField()
+    granularity = serializers.ChoiceField(
+        choices=['raw', *GranulariteSerie.values], default=GranulariteSerie.JOUR.value
+    )
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    max_points = serializers.IntegerField(min_value=3, max_value=10000, required=False)
+
+    def validate(self, attrs):
+        if 'start' in attrs and 'end' in attrs and attrs['start'] >= attrs['end']:
+            raise serializers.ValidationError({'start': 'start must be earlier than end.'})
+        return attrs
 
-class ReservoirSerializer(serializers.ModelSerializer):
+class ReservoirSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     puit_nom = serializers.SerializerMethodField()
     
     class Meta:
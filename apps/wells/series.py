@@ -0,0 +1,277 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import AgregatIndicateur, GranulariteSerie
+from .partitions import ajouter_mois
+from .region_models import Indicateur
+
+GRANULARITES = [granularite.value for granularite in GranulariteSerie]
+
+
+def debut_intervalle(granularite, moment):
+    """Début (UTC) de l'intervalle de `granularite` contenant `moment` ; mêmes bornes que `date_trunc`."""
+    moment = moment.astimezone(dt_timezone.utc)
+    if granularite == GranulariteSerie.HEURE:
+        return moment.replace(minute=0, second=0, microsecond=0)
+    jour = moment.date()
+    if granularite == GranulariteSerie.SEMAINE:
+        jour -= timedelta(days=jour.weekday())
+    elif granularite == GranulariteSerie.MOIS:
+        jour = jour.replace(day=1)
+    return datetime.combine(jour, time.min, tzinfo=dt_timezone.utc)
+
+
+def fin_intervalle(granularite, debut):
+    """Borne exclue de l'intervalle de `granularite` commençant à `debut`."""
+    if granularite == GranulariteSerie.HEURE:
+        return debut + timedelta(hours=1)
+    if granularite == GranulariteSerie.JOUR:
+        return debut + timedelta(days=1)
+    if granularite == GranulariteSerie.SEMAINE:
+        return debut + timedelta(days=7)
+    return datetime.combine(ajouter_mois(debut.date(), 1), time.min, tzinfo=dt_timezone.utc)
+
+
+def _requete_agregats(condition):
+    """
+    INSERT ... SELECT agrégeant, pour chaque granularité, les indicateurs
+    vérifiant `condition` (alias `i` pour l'indicateur, `f` pour le forage).
+
+    En cas de conflit, l'agrégat existant est fusionné avec le nouveau :
+    effectifs et sommes s'additionnent, min/max se combinent, la dernière
+    valeur est celle de la mesure la plus récente. La même requête sert donc
+    à l'ajout incrémental d'une mesure et à la reconstruction d'intervalles
+    préalablement supprimés.
+    """
+    quote = connection.ops.quote_name
+    operation = Indicateur._meta.get_field('operation').related_model
+    phase = operation._meta.get_field('phase').related_model
+    forage = phase._meta.get_field('forage').related_model
+
+    def agregats(colonne):
+        return (
+            f"count(i.{colonne}), min(i.{colonne}), max(i.{colonne}), sum(i.{colonne}), "
+            f"(array_agg(i.{colonne} ORDER BY i.date_mesure DESC, i.id DESC))[1]"
+        )
+
+    def fusion(suffixe):
+        return (
+            f"nombre_{suffixe} = t.nombre_{suffixe} + EXCLUDED.nombre_{suffixe}, "
+            f"min_{suffixe} = LEAST(t.min_{suffixe}, EXCLUDED.min_{suffixe}), "
+            f"max_{suffixe} = GREATEST(t.max_{suffixe}, EXCLUDED.max_{suffixe}), "
+            f"somme_{suffixe} = COALESCE(t.somme_{suffixe} + EXCLUDED.somme_{suffixe}, "
+            f"t.somme_{suffixe}, EXCLUDED.somme_{suffixe}), "
+            f"derniere_{suffixe} = CASE WHEN EXCLUDED.derniere_date >= t.derniere_date "
+            f"THEN EXCLUDED.derniere_{suffixe} ELSE t.derniere_{suffixe} END"
+        )
+
+    return f"""
+        INSERT INTO {quote(AgregatIndicateur._meta.db_table)} AS t (
+            puit_id, type_indicateur_id, granularite, debut, nombre, derniere_date,
+            nombre_reelle, min_reelle, max_reelle, somme_reelle, derniere_reelle,
+            nombre_prevue, min_prevue, max_prevue, somme_prevue, derniere_prevue
+        )
+        SELECT f.puit_id, i.type_indicateur_id, g.granularite,
+               date_trunc(g.granularite, i.date_mesure, 'UTC'), count(*), max(i.date_mesure),
+               {agregats('valeur_reelle')},
+               {agregats('valeur_prevue')}
+        FROM {quote(Indicateur._meta.db_table)} i
+        JOIN {quote(operation._meta.db_table)} o ON o.id = i.operation_id
+        JOIN {quote(phase._meta.db_table)} p ON p.id = o.phase_id
+        JOIN {quote(forage._meta.db_table)} f ON f.id = p.forage_id
+        CROSS JOIN unnest(%s::text[]) AS g(granularite)
+        WHERE {condition}
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (puit_id, type_indicateur_id, granularite, debut) DO UPDATE SET
+            nombre = t.nombre + EXCLUDED.nombre,
+            {fusion('reelle')},
+            {fusion('prevue')},
+            derniere_date = GREATEST(t.derniere_date, EXCLUDED.derniere_date)
+    """
+
+
+def ajouter_mesure(indicateur):
+    """Intègre une nouvelle mesure aux agrégats de toutes les granularités (une requête)."""
+    with connection.cursor() as cursor:
+        # La condition sur date_mesure limite la lecture à la partition du mois.
+        cursor.execute(
+            _requete_agregats("i.id = %s AND i.date_mesure = %s"),
+            [GRANULARITES, indicateur.pk, indicateur.date_mesure]
+        )
+
+
+def recalculer_intervalles(puit_id, type_indicateur_id, moment):
+    """
+    Recalcule depuis les mesures les agrégats des intervalles contenant `moment`.
+
+    Utilisé quand une mesure est modifiée ou supprimée : un minimum ou un
+    maximum ne peut pas être retiré d'un agrégat, les intervalles concernés
+    sont donc reconstruits.
+    """
+    if puit_id is None:
+        return
+    debuts = {granularite: debut_intervalle(granularite, moment) for granularite in GRANULARITES}
+    depuis = min(debuts.values())
+    jusqua = max(fin_intervalle(granularite, debut) for granularite, debut in debuts.items())
+
+    with transaction.atomic():
+        AgregatIndicateur.objects.filter(
+            Q(*[Q(granularite=granularite, debut=debut) for granularite, debut in debuts.items()], _connector=Q.OR),
+            puit_id=puit_id, type_indicateur_id=type_indicateur_id
+        ).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                _requete_agregats(
+                    "f.puit_id = %s AND i.type_indicateur_id = %s "
+                    "AND i.date_mesure >= %s AND i.date_mesure < %s "
+                    "AND date_trunc(g.granularite, i.date_mesure, 'UTC') "
+                    "= date_trunc(g.granularite, %s::timestamptz, 'UTC')"
+                ),
+                [GRANULARITES, puit_id, type_indicateur_id, depuis, jusqua, moment]
+            )
+
+
+def reconstruire_series(puit_id=None, depuis=None):
+    """
+    Reconstruit les agrégats à partir des mesures (après un import en masse, par exemple).
+
+    Avec `depuis`, seuls les intervalles commençant à partir du plus ancien
+    début d'intervalle contenant cette date sont reconstruits : aucun
+    intervalle antérieur ne contient de mesure postérieure à `depuis`.
+    Retourne le nombre d'agrégats écrits.
+    """
+    agregats = AgregatIndicateur.objects.all()
+    conditions, parametres = ['TRUE'], []
+    if puit_id is not None:
+        agregats = agregats.filter(puit_id=puit_id)
+        conditions.append("f.puit_id = %s")
+        parametres.append(puit_id)
+    if depuis is not None:
+        borne = min(debut_intervalle(granularite, depuis) for granularite in GRANULARITES)
+        agregats = agregats.filter(debut__gte=borne)
+        conditions.append("i.date_mesure >= %s AND date_trunc(g.granularite, i.date_mesure, 'UTC') >= %s")
+        parametres.extend([borne, borne])
+
+    with transaction.atomic():
+        agregats.delete()
+        with connection.cursor() as cursor:
+            cursor.execute(_requete_agregats(' AND '.join(conditions)), [GRANULARITES, *parametres])
+            return cursor.rowcount
+
+
+def lttb(x, y, seuil):
+    """
+    Indices des points retenus par l'algorithme Largest-Triangle-Three-Buckets.
+
+    Le premier et le dernier point sont conservés ; les autres sont répartis
+    en `seuil - 2` groupes dont on garde le point formant le plus grand
+    triangle avec le point retenu précédent et la moyenne du groupe suivant.
+    La forme visuelle de la courbe (pics compris) est ainsi préservée.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if seuil >= n or seuil < 3:
+        return np.arange(n)
+
+    bornes = (np.floor(np.arange(seuil - 1) * ((n - 2) / (seuil - 2))) + 1).astype(np.intp)
+    retenus = np.empty(seuil, dtype=np.intp)
+    retenus[0], retenus[-1] = 0, n - 1
+    precedent = 0
+    for i in range(seuil - 2):
+        debut, fin = bornes[i], bornes[i + 1]
+        fin_suivant = bornes[i + 2] if i + 2 < len(bornes) else n
+        moyenne_x = x[fin:fin_suivant].mean()
+        moyenne_y = y[fin:fin_suivant].mean()
+        aires = np.abs(
+            (x[precedent] - moyenne_x) * (y[debut:fin] - y[precedent])
+            - (x[precedent] - x[debut:fin]) * (moyenne_y - y[precedent])
+        )
+        precedent = debut + int(np.argmax(aires))
+        retenus[i + 1] = precedent
+    return retenus
+
+
+def _reduire(points, moments, valeurs, max_points):
+    """Applique LTTB aux points ; ceux sans valeur sont écartés quand une réduction est nécessaire."""
+    if not max_points or len(points) <= max_points:
+        return points
+    avec_valeur = [i for i, valeur in enumerate(valeurs) if valeur is not None]
+    x = [moments[i].timestamp() for i in avec_valeur]
+    y = [valeurs[i] for i in avec_valeur]
+    return [points[avec_valeur[i]] for i in lttb(x, y, max_points)]
+
+
+def _flottant(valeur):
+    return float(valeur) if valeur is not None else None
+
+
+def _statistiques(agregat, suffixe):
+    nombre = agregat[f'nombre_{suffixe}']
+    somme = agregat[f'somme_{suffixe}']
+    return {
+        'min': _flottant(agregat[f'min_{suffixe}']),
+        'max': _flottant(agregat[f'max_{suffixe}']),
+        'avg': float(somme) / nombre if nombre else None,
+        'last': _flottant(agregat[f'derniere_{suffixe}']),
+    }
+
+
+def serie_agregee(puit_id, type_indicateur_id, granularite, debut=None, fin=None, max_points=None):
+    """
+    Série d'un type d'indicateur d'un puits, par intervalles de `granularite`, lue dans les agrégats.
+
+    Avec `max_points`, la série est réduite par LTTB sur la moyenne réelle
+    (à défaut, prévue) de chaque intervalle.
+    """
+    agregats = AgregatIndicateur.objects.filter(
+        puit_id=puit_id, type_indicateur_id=type_indicateur_id, granularite=granularite
+    ).order_by('debut')
+    if debut is not None:
+        agregats = agregats.filter(debut__gte=debut_intervalle(granularite, debut))
+    if fin is not None:
+        agregats = agregats.filter(debut__lt=fin)
+
+    points, moments, valeurs = [], [], []
+    for agregat in agregats.values():
+        point = {
+            'start': agregat['debut'],
+            'count': agregat['nombre'],
+            'valeur_reelle': _statistiques(agregat, 'reelle'),
+            'valeur_prevue': _statistiques(agregat, 'prevue'),
+        }
+        points.append(point)
+        moments.append(agregat['debut'])
+        moyenne = point['valeur_reelle']['avg']
+        valeurs.append(moyenne if moyenne is not None else point['valeur_prevue']['avg'])
+    return _reduire(points, moments, valeurs, max_points)
+
+
+def serie_brute(puit_id, type_indicateur_id, debut=None, fin=None, max_points=None):
+    """
+    Mesures brutes d'un type d'indicateur d'un puits, par date croissante.
+
+    Avec `max_points`, la série est réduite par LTTB sur la valeur réelle
+    (à défaut, prévue). Seules trois colonnes sont lues.
+    """
+    mesures = Indicateur.objects.filter(
+        operation__phase__forage__puit_id=puit_id, type_indicateur_id=type_indicateur_id
+    ).order_by('date_mesure', 'id')
+    if debut is not None:
+        mesures = mesures.filter(date_mesure__gte=debut)
+    if fin is not None:
+        mesures = mesures.filter(date_mesure__lt=fin)
+
+    points, moments, valeurs = [], [], []
+    for date_mesure, reelle, prevue in mesures.values_list('date_mesure', 'valeur_reelle', 'valeur_prevue'):
+        points.append({
+            'date_mesure': date_mesure,
+            'valeur_reelle': _flottant(reelle),
+            'valeur_prevue': _flottant(prevue),
+        })
+        moments.append(date_mesure)
+        valeurs.append(_flottant(reelle if reelle is not None else prevue))
+    return _reduire(points, moments, valeurs, max_points)
@@ -0,0 +1,249 @@
+from django.db import connections, transaction
+from django.db.models import Min
+from django.db.models.signals import pre_migrate, pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from .models import Well, WellOperation, DailyReport, WellDocument, ResumePuit, STATUTS_OPERATION_FERMES
+from .region_models import Region, TypeOperation, TypeIndicateur, Forage, Phase, Operation, Indicateur, Probleme
+from .cache import reference_cache
+from .tree import invalider_arbres
+from .series import ajouter_mesure, recalculer_intervalles, reconstruire_series
+from .rollups import invalider_synthese_regions
+
+
+@receiver(pre_migrate)
+def activer_extensions(sender, using, **kwargs):
+    """Active pg_trgm avant la création des tables : les index trigrammes en dépendent."""
+    if sender.name == 'apps.wells':
+        with connections[using].cursor() as cursor:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+
+@receiver(post_save, sender=Region)
+@receiver(post_save, sender=TypeOperation)
+@receiver(post_save, sender=TypeIndicateur)
+@receiver(post_delete, sender=Region)
+@receiver(post_delete, sender=TypeOperation)
+@receiver(post_delete, sender=TypeIndicateur)
+def invalider_donnees_reference(sender, instance, **kwargs):
+    """Invalide l'entrée du cache de référence quand l'objet change ou disparaît, après la validation."""
+    # Avant la validation, un lecteur concurrent pourrait remettre en cache l'ancienne ligne.
+    pk = instance.pk
+    transaction.on_commit(lambda: reference_cache.invalidate(sender, pk))
+
+
+def puit_de_noeud(instance):
+    """Identifiant du puits auquel appartient un nœud de l'arbre (puits, forage, phase, opération, indicateur, problème)."""
+    if isinstance(instance, Well):
+        return instance.pk
+    if isinstance(instance, Forage):
+        return instance.puit_id
+    if isinstance(instance, Phase):
+        return Forage.objects.filter(pk=instance.forage_id).values_list('puit_id', flat=True).first()
+    if isinstance(instance, Operation):
+        return Phase.objects.filter(pk=instance.phase_id).values_list('forage__puit_id', flat=True).first()
+    if isinstance(instance, (Indicateur, Probleme)):
+        return Operation.objects.filter(pk=instance.operation_id).values_list(
+            'phase__forage__puit_id', flat=True
+        ).first()
+    return None
+
+
+# Chemin du puits depuis chaque nœud rattaché à un parent
+CHEMINS_PUIT = {
+    Forage: 'puit_id',
+    Phase: 'forage__puit_id',
+    Operation: 'phase__forage__puit_id',
+    Indicateur: 'operation__phase__forage__puit_id',
+}
+
+
+# Chemin depuis l'indicateur vers chaque nœud dont la suppression emporte ses mesures
+CHEMINS_MESURES = {
+    Forage: 'operation__phase__forage',
+    Phase: 'operation__phase',
+    Operation: 'operation',
+}
+
+
+def supprime_en_cascade(instance, origin):
+    """
+    Vrai si `instance` est supprimée en cascade avec un nœud parent de l'arbre.
+
+    Le nœud d'origine traite alors tout le sous-arbre en une fois : arbre du
+    puits invalidé, agrégats des séries reconstruits (ou supprimés avec le puits).
+    """
+    return origin is not None and origin is not instance and isinstance(origin, (Well, *CHEMINS_MESURES))
+
+
+@receiver(pre_save, sender=Forage)
+@receiver(pre_save, sender=Phase)
+@receiver(pre_save, sender=Operation)
+def memoriser_puit_precedent(sender, instance, **kwargs):
+    """Mémorise le puits d'origine d'un nœud modifié : s'il change de puits, les deux arbres sont invalidés."""
+    if not instance._state.adding:
+        instance._puit_precedent = sender.objects.filter(pk=instance.pk).values_list(
+            CHEMINS_PUIT[sender], flat=True
+        ).first()
+
+
+@receiver(pre_delete, sender=Forage)
+@receiver(pre_delete, sender=Phase)
+@receiver(pre_delete, sender=Operation)
+@receiver(pre_delete, sender=Indicateur)
+def memoriser_puit_supprime(sender, instance, origin=None, **kwargs):
+    """Mémorise le puits d'un nœud supprimé tant que ses parents existent encore."""
+    if not supprime_en_cascade(instance, origin):
+        instance._puit_precedent = puit_de_noeud(instance)
+
+
+@receiver(pre_delete, sender=Forage)
+@receiver(pre_delete, sender=Phase)
+@receiver(pre_delete, sender=Operation)
+def memoriser_mesures_supprimees(sender, instance, origin=None, **kwargs):
+    """Mémorise la date de la plus ancienne mesure d'un nœud supprimé (ses indicateurs partent en cascade)."""
+    if not supprime_en_cascade(instance, origin):
+        instance._premiere_mesure = Indicateur.objects.filter(**{CHEMINS_MESURES[sender]: instance}).aggregate(
+            premiere=Min('date_mesure')
+        )['premiere']
+
+
+@receiver(post_save, sender=Well)
+@receiver(post_save, sender=Forage)
+@receiver(post_save, sender=Phase)
+@receiver(post_save, sender=Operation)
+@receiver(post_save, sender=Indicateur)
+@receiver(post_delete, sender=Well)
+@receiver(post_delete, sender=Forage)
+@receiver(post_delete, sender=Phase)
+@receiver(post_delete, sender=Operation)
+@receiver(post_delete, sender=Indicateur)
+def invalider_arbre_puit(sender, instance, origin=None, **kwargs):
+    """Invalide, après la validation, l'arbre en cache du puits dont un nœud a changé ou disparu."""
+    if supprime_en_cascade(instance, origin):
+        return
+    puits_ids = {getattr(instance, '_puit_precedent', None)}
+    mesure_precedente = getattr(instance, '_mesure_precedente', None)
+    if mesure_precedente:
+        puits_ids.add(mesure_precedente[0])
+    # Après une suppression, les parents du nœud peuvent déjà avoir disparu : seul le puits mémorisé compte.
+    if 'created' in kwargs or isinstance(instance, Well):
+        puits_ids.add(puit_de_noeud(instance))
+    transaction.on_commit(lambda: invalider_arbres(puits_ids))
+
+
+@receiver(post_save, sender=WellOperation)
+@receiver(post_save, sender=DailyReport)
+@receiver(post_save, sender=WellDocument)
+@receiver(post_save, sender=Forage)
+@receiver(post_delete, sender=WellOperation)
+@receiver(post_delete, sender=DailyReport)
+@receiver(post_delete, sender=WellDocument)
+@receiver(post_delete, sender=Forage)
+def marquer_puit_modifie(sender, instance, **kwargs):
+    """Avance `last_updated` du puits : son détail imbrique cette ressource (validateurs ETag)."""
+    Well.marquer_modifies([getattr(instance, 'puit_id', None), getattr(instance, 'well_id', None)])
+
+
+@receiver(post_save, sender=Region)
+def marquer_puits_region_modifies(sender, instance, **kwargs):
+    """Avance `last_updated` des puits de la région : leur détail imbrique `region_details`."""
+    Well.marquer_modifies(Well.objects.filter(region=instance).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=WellOperation)
+def decompter_operation_supprimee(sender, instance, **kwargs):
+    """Retire une opération ouverte supprimée du compteur de son puits."""
+    if instance.__dict__.get('status') not in STATUTS_OPERATION_FERMES:
+        Well.ajuster_operations_ouvertes(instance.puit_id, -1)
+
+
+@receiver(pre_save, sender=Indicateur)
+def memoriser_mesure_precedente(sender, instance, **kwargs):
+    """Mémorise le puits, le type et la date d'origine d'une mesure modifiée."""
+    if not instance._state.adding:
+        instance._mesure_precedente = Indicateur.objects.filter(pk=instance.pk).values_list(
+            'operation__phase__forage__puit_id', 'type_indicateur_id', 'date_mesure'
+        ).first()
+
+
+@receiver(post_save, sender=Indicateur)
+def agreger_mesure(sender, instance, created, **kwargs):
+    """Tient à jour les agrégats des séries : fusion d'une nouvelle mesure, recalcul sinon."""
+    if created:
+        ajouter_mesure(instance)
+        return
+    actuelle = (puit_de_noeud(instance), instance.type_indicateur_id, instance.date_mesure)
+    precedente = getattr(instance, '_mesure_precedente', None)
+    if precedente and precedente != actuelle:
+        recalculer_intervalles(*precedente)
+    recalculer_intervalles(*actuelle)
+
+
+@receiver(post_delete, sender=Indicateur)
+def retirer_mesure(sender, instance, origin=None, **kwargs):
+    """Recalcule les agrégats des intervalles qui contenaient la mesure supprimée."""
+    # Avec son puits, les agrégats disparaissent en cascade ; avec un autre nœud, voir `reconstruire_series_noeud`.
+    if not supprime_en_cascade(instance, origin):
+        recalculer_intervalles(instance._puit_precedent, instance.type_indicateur_id, instance.date_mesure)
+
+
+@receiver(post_delete, sender=Forage)
+@receiver(post_delete, sender=Phase)
+@receiver(post_delete, sender=Operation)
+def reconstruire_series_noeud(sender, instance, **kwargs):
+    """Reconstruit en une fois les agrégats du puits touchés par les mesures supprimées avec le nœud."""
+    premiere = getattr(instance, '_premiere_mesure', None)
+    if premiere is not None and instance._puit_precedent is not None:
+        reconstruire_series(instance._puit_precedent, depuis=premiere)
+
+
+@receiver(post_save, sender=Forage)
+@receiver(post_save, sender=Phase)
+@receiver(post_save, sender=Operation)
+def reconstruire_series_deplacement(sender, instance, created, **kwargs):
+    """Reconstruit les agrégats des deux puits quand un nœud change de puits avec ses mesures."""
+    precedent = getattr(instance, '_puit_precedent', None)
+    if created or precedent is None:
+        return
+    actuel = puit_de_noeud(instance)
+    if actuel == precedent:
+        return
+    premiere = Indicateur.objects.filter(**{CHEMINS_MESURES[sender]: instance}).aggregate(
+        premiere=Min('date_mesure')
+    )['premiere']
+    if premiere is not None:
+        for puit_id in (precedent, actuel):
+            if puit_id is not None:
+                reconstruire_series(puit_id, depuis=premiere)
+
+
+@receiver(post_save, sender=Region)
+@receiver(post_save, sender=Well)
+@receiver(post_save, sender=Forage)
+@receiver(post_save, sender=Phase)
+@receiver(post_save, sender=Operation)
+@receiver(post_delete, sender=Region)
+@receiver(post_delete, sender=Well)
+@receiver(post_delete, sender=Forage)
+@receiver(post_delete, sender=Phase)
+@receiver(post_delete, sender=Operation)
+def invalider_synthese(sender, instance, **kwargs):
+    """Invalide la synthèse des régions, après la validation, quand un coût, une profondeur ou un statut peut avoir changé."""
+    transaction.on_commit(invalider_synthese_regions)
+
+
+@receiver(post_delete, sender=WellOperation)
+@receiver(post_delete, sender=DailyReport)
+@receiver(post_delete, sender=WellDocument)
+@receiver(post_delete, sender=Probleme)
+def retirer_du_resume(sender, instance, **kwargs):
+    """Retire la ligne supprimée du résumé de son puits, dans la transaction du `delete()`."""
+    # Pendant la suppression en cascade d'un puits, son résumé peut déjà avoir disparu : pas de recréation.
+    ResumePuit.appliquer(sender, instance.etat_resume(), None, creer=False)
+
+
+@receiver(post_save, sender=Probleme)
+@receiver(post_delete, sender=Probleme)
+def marquer_puit_probleme(sender, instance, **kwargs):
+    """Avance `last_updated` du puits : le résumé affiché dans ses listes compte les problèmes ouverts."""
+    Well.marquer_modifies([puit_de_noeud(instance)])
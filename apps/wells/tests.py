@@ -1,2 +1,1485 @@
+import json
+from io import StringIO
+from unittest.mock import patch
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
 from django.test import TestCase
-# Create your tests here.
+from django.test.utils import CaptureQueriesContext
+from django.db import DatabaseError, connection
+from django.core.cache import cache
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework.request import Request
+from rest_framework import status
+from apps.alerts.models import JournalAction
+from .models import Well, Region, Forage, OperationPuit, RapportQuotidien, Document, AgregatIndicateur, ResumePuit
+from .region_models import TypeOperation, TypeIndicateur, Phase, Operation, Indicateur, Probleme
+from .serializers import TypeOperationSerializer, WellSerializer
+from .cache import reference_cache
+from .geo import encoder_geohash, distances_haversine
+from .tree import cle_arbre
+from .lifecycle import demarrer_operation, terminer_operation, TransitionInvalide
+from .partitions import (
+    ajouter_mois, creer_partitions, debut_mois, detacher_partitions, nom_partition, nom_partition_defaut,
+    partitions_existantes,
+)
+from .series import lttb
+from .rollups import synthese_regions
+from .gaps import puits_actifs, rapports_manquants
+from .autocomplete import suggerer_puits
+
+User = get_user_model()
+
+
+class KeysetCursorPaginationTest(APITestCase):
+    """Tests pour la pagination par curseur des listes de puits."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='pagination@example.com',
+            username='pagination',
+            password='paginationpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.wells = [
+            Well.objects.create(nom=f'Puits {i}', name=f'Well {i}')
+            for i in range(7)
+        ]
+
+    def _collect_pages(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_list_is_paginated(self):
+        """Test que la liste renvoie une enveloppe de pagination."""
+        response = self.client.get(reverse('wells:well-list'), {'page_size': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertIsNotNone(response.data['next'])
+        self.assertIsNone(response.data['previous'])
+
+    def test_cursor_walks_every_well_once(self):
+        """Test que le parcours par curseur renvoie chaque puits une seule fois."""
+        url = reverse('wells:well-list') + '?page_size=2'
+        ids = self._collect_pages(url)
+        self.assertEqual(sorted(ids), sorted(well.id for well in self.wells))
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_tiebreaker_on_identical_ordering_values(self):
+        """Test que les valeurs de tri identiques sont départagées par l'identifiant."""
+        Well.objects.update(status='active')
+        url = reverse('wells:well-list') + '?page_size=2&ordering=status'
+        ids = self._collect_pages(url)
+        self.assertEqual(ids, sorted(well.id for well in self.wells))
+
+    def test_previous_link_returns_previous_page(self):
+        """Test que le lien précédent renvoie la page précédente."""
+        first = self.client.get(reverse('wells:well-list'), {'page_size': 3})
+        second = self.client.get(first.data['next'])
+        previous = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [item['id'] for item in previous.data['results']],
+            [item['id'] for item in first.data['results']]
+        )
+
+
+# Nombre maximal de requêtes SQL autorisé par endpoint, quel que soit le volume de données.
+QUERY_BUDGETS = {
+    # Validateur ETag (MAX/COUNT) + page de puits.
+    'wells:well-list': 2,
+    # Validateur ETag + puits + 3 collections préchargées,
+    # +1 lecture de la région quand le cache de référence est froid.
+    'wells:well-detail': 6,
+}
+
+
+class QueryBudgetTest(APITestCase):
+    """Tests du budget de requêtes SQL des endpoints de puits."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='budget@example.com',
+            username='budget',
+            password='budgetpass123',
+            first_name='Budget',
+            last_name='Test'
+        )
+        self.client.force_authenticate(user=self.user)
+        region = Region.objects.create(
+            nom='Hassi Messaoud', code='HMD', localisation='Ouargla', responsable='Direction HMD'
+        )
+        self.well = Well.objects.create(nom='Puits Budget', name='Budget Well', region=region,
+                                        last_updated_by=self.user)
+        Forage.objects.create(puit=self.well, cout=1000)
+        for i in range(5):
+            Well.objects.create(nom=f'Puits {i}', name=f'Well {i}', last_updated_by=self.user)
+            OperationPuit.objects.create(
+                puit=self.well,
+                type_operation='forage',
+                nom=f'Opération {i}',
+                date_debut_prevue=timezone.now(),
+                date_fin_prevue=timezone.now() + timedelta(days=1),
+                cree_par=self.user,
+                created_by=self.user
+            )
+            RapportQuotidien.objects.create(
+                puit=self.well,
+                well=self.well,
+                date_rapport=date.today() - timedelta(days=i),
+                activites='Forage',
+                progression=10,
+                heures_travaillees=12,
+                soumis_par=self.user,
+                submitted_by=self.user
+            )
+            Document.objects.create(
+                puit=self.well,
+                nom=f'Document {i}',
+                type_document='Rapport',
+                fichier='documents_puit/rapport.pdf',
+                uploade_par=self.user,
+                uploaded_by=self.user
+            )
+
+    def assertQueryBudget(self, url_name, **kwargs):
+        budget = QUERY_BUDGETS[url_name]
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse(url_name, kwargs=kwargs))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(
+            len(context.captured_queries), budget,
+            f"{url_name} a exécuté {len(context.captured_queries)} requêtes (budget: {budget})"
+        )
+        return response
+
+    def test_well_list_budget(self):
+        """Test que la liste des puits respecte son budget de requêtes."""
+        self.assertQueryBudget('wells:well-list')
+
+    def test_well_detail_budget(self):
+        """Test que le détail d'un puits charge tout le graphe dans son budget."""
+        response = self.assertQueryBudget('wells:well-detail', pk=self.well.pk)
+        self.assertEqual(len(response.data['operations']), 5)
+        self.assertEqual(len(response.data['daily_reports']), 5)
+        self.assertEqual(len(response.data['documents']), 5)
+        self.assertEqual(response.data['region_details']['code'], 'HMD')
+        self.assertEqual(response.data['operations'][0]['created_by_name'], 'Budget Test')
+
+
+class ReferenceDataCacheTest(TestCase):
+    """Tests pour le cache des données de référence."""
+
+    def setUp(self):
+        cache.clear()
+        reference_cache.clear_local()
+        self.type_operation = TypeOperation.objects.create(code='CIMENT', nom='Cimentation')
+
+    def test_second_lookup_hits_no_database(self):
+        """Test que la seconde lecture est servie sans requête SQL."""
+        with self.assertNumQueries(1):
+            data = reference_cache.get(TypeOperation, 'CIMENT', TypeOperationSerializer)
+        with self.assertNumQueries(0):
+            self.assertEqual(reference_cache.get(TypeOperation, 'CIMENT', TypeOperationSerializer), data)
+
+    def test_redis_level_serves_cold_process(self):
+        """Test qu'une LRU locale vide est alimentée par le cache partagé."""
+        reference_cache.get(TypeOperation, 'CIMENT', TypeOperationSerializer)
+        reference_cache.clear_local()
+        with self.assertNumQueries(0):
+            data = reference_cache.get(TypeOperation, 'CIMENT', TypeOperationSerializer)
+        self.assertEqual(data['nom'], 'Cimentation')
+
+    def test_save_invalidates_entry(self):
+        """Test que la sauvegarde d'un type d'opération invalide le cache."""
+        reference_cache.get(TypeOperation, 'CIMENT', TypeOperationSerializer)
+        self.type_operation.nom = 'Cimentation primaire'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.type_operation.save()
+        data = reference_cache.get(TypeOperation, 'CIMENT', TypeOperationSerializer)
+        self.assertEqual(data['nom'], 'Cimentation primaire')
+
+    def test_delete_invalidates_entry(self):
+        """Test que la suppression d'un type d'opération invalide le cache."""
+        reference_cache.get(TypeOperation, 'CIMENT', TypeOperationSerializer)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.type_operation.delete()
+        self.assertIsNone(reference_cache.get(TypeOperation, 'CIMENT', TypeOperationSerializer))
+
+
+class FullTextSearchTest(APITestCase):
+    """Tests pour la recherche plein texte sur les puits."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='recherche@example.com',
+            username='recherche',
+            password='recherchepass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.dans_description = Well.objects.create(
+            nom='Puits Nord', name='North Well', description='Reprise des forages horizontaux'
+        )
+        self.dans_nom = Well.objects.create(nom='Forage Sud', name='South Well', location='Illizi')
+        Well.objects.create(nom='Puits Est', name='East Well', description='Complétion terminée')
+
+    def test_french_stemming(self):
+        """Test que la recherche utilise la racinisation française."""
+        response = self.client.get(reverse('wells:well-list'), {'search': 'forage'})
+        ids = {item['id'] for item in response.data['results']}
+        self.assertEqual(ids, {self.dans_description.id, self.dans_nom.id})
+
+    def test_english_legacy_fields(self):
+        """Test que les champs hérités en anglais restent interrogeables."""
+        response = self.client.get(reverse('wells:well-list'), {'search': 'wells south'})
+        ids = [item['id'] for item in response.data['results']]
+        self.assertEqual(ids, [self.dans_nom.id])
+
+    def test_results_ranked_by_relevance(self):
+        """Test que les correspondances sur le nom sont classées avant la description."""
+        response = self.client.get(reverse('wells:well-list'), {'search': 'forage'})
+        self.assertEqual(response.data['results'][0]['id'], self.dans_nom.id)
+
+    def test_cursor_pages_with_tied_ranks(self):
+        """Test que la pagination d'une recherche aux rangs égaux ne répète ni ne saute aucun puits."""
+        ex_aequo = {
+            Well.objects.create(nom=f'Forage Ouest {i}', name=f'West Well {i}', location='Illizi').id
+            for i in range(5)
+        }
+        vus = []
+        url, params = reverse('wells:well-list'), {'search': 'forage', 'page_size': 2}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            vus.extend(item['id'] for item in response.data['results'])
+            url, params = response.data['next'], None
+        self.assertEqual(len(vus), len(set(vus)))
+        self.assertEqual(set(vus), ex_aequo | {self.dans_description.id, self.dans_nom.id})
+
+
+class DailyReportBulkImportTest(APITestCase):
+    """Tests pour l'import en masse des rapports quotidiens."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='import@example.com',
+            username='import',
+            password='importpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.well = Well.objects.create(nom='Puits Import', name='Import Well')
+        self.url = reverse('wells:report-bulk-import')
+
+    def test_csv_import_creates_reports(self):
+        """Test que l'import CSV crée un rapport par ligne."""
+        body = (
+            "well,report_date,activities,progress,hours_worked\n"
+            f"{self.well.id},2024-03-01,Forage 12 1/4,10,12\n"
+            f"{self.well.id},2024-03-02,Tubage,20,11.5\n"
+        )
+        response = self.client.post(self.url, body, content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['processed'], 2)
+        self.assertEqual(response.data['errors'], [])
+        self.assertEqual(RapportQuotidien.objects.filter(puit=self.well).count(), 2)
+
+    def test_existing_report_is_updated(self):
+        """Test que l'import remplace le rapport existant pour le même puits et la même date."""
+        body = f'{{"well": {self.well.id}, "report_date": "2024-03-01", "activities": "Forage", "progress": 10, "hours_worked": 12}}\n'
+        self.client.post(self.url, body, content_type='application/x-ndjson')
+        body = f'{{"well": {self.well.id}, "report_date": "2024-03-01", "activities": "Cimentation", "progress": 35, "hours_worked": 10}}\n'
+        response = self.client.post(self.url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.data['processed'], 1)
+        rapport = RapportQuotidien.objects.get(puit=self.well, date_rapport=date(2024, 3, 1))
+        self.assertEqual(rapport.activities, 'Cimentation')
+        self.assertEqual(rapport.progression, 35)
+
+    def test_invalid_rows_do_not_abort_batch(self):
+        """Test que les lignes invalides sont signalées sans bloquer les autres."""
+        body = (
+            "well,report_date,activities,progress,hours_worked\n"
+            f"{self.well.id},2024-03-01,Forage,10,12\n"
+            f"{self.well.id},pas-une-date,Forage,10,12\n"
+            "999999,2024-03-03,Forage,10,12\n"
+        )
+        response = self.client.post(self.url, body, content_type='text/csv')
+        self.assertEqual(response.data['processed'], 1)
+        self.assertEqual([error['line'] for error in response.data['errors']], [3, 4])
+        self.assertIn('report_date', response.data['errors'][0]['errors'])
+
+    def test_operation_of_another_well_rejected(self):
+        """Test qu'une opération rattachée à un autre puits est refusée."""
+        autre = Well.objects.create(nom='Autre Puits')
+        operation = OperationPuit.objects.create(
+            puit=autre, well=autre, type_operation='forage', nom='Opération autre puits',
+            date_debut_prevue=timezone.now(), date_fin_prevue=timezone.now() + timedelta(days=1),
+            cree_par=self.user
+        )
+        body = (
+            "well,report_date,operation,activities,progress,hours_worked\n"
+            f"{self.well.id},2024-03-01,{operation.id},Forage,10,12\n"
+            f"{autre.id},2024-03-01,{operation.id},Forage,10,12\n"
+        )
+        response = self.client.post(self.url, body, content_type='text/csv')
+        self.assertEqual(response.data['processed'], 1)
+        self.assertEqual([error['line'] for error in response.data['errors']], [2])
+        self.assertIn('operation', response.data['errors'][0]['errors'])
+        self.assertFalse(RapportQuotidien.objects.filter(puit=self.well).exists())
+
+    def test_database_error_reports_only_failing_rows(self):
+        """Test qu'un paquet refusé par la base est rejoué ligne par ligne."""
+        bulk_create = RapportQuotidien.objects.bulk_create
+
+        def refuser_rejet(reports, **kwargs):
+            if any(report.activities == 'Rejet' for report in reports):
+                raise DatabaseError('ligne refusée')
+            return bulk_create(reports, **kwargs)
+
+        body = (
+            "well,report_date,activities,progress,hours_worked\n"
+            f"{self.well.id},2024-03-01,Forage,10,12\n"
+            f"{self.well.id},2024-03-02,Rejet,10,12\n"
+            f"{self.well.id},2024-03-03,Tubage,20,11\n"
+        )
+        with patch.object(RapportQuotidien.objects, 'bulk_create', side_effect=refuser_rejet):
+            response = self.client.post(self.url, body, content_type='text/csv')
+        self.assertEqual(response.data['processed'], 2)
+        self.assertEqual(response.data['errors'], [{'line': 3, 'errors': {'non_field_errors': ['ligne refusée']}}])
+        self.assertEqual(
+            list(RapportQuotidien.objects.filter(puit=self.well).values_list('activities', flat=True)
+                 .order_by('date_rapport')),
+            ['Forage', 'Tubage']
+        )
+        self.assertEqual(ResumePuit.objects.get(puit=self.well).nombre_rapports, 2)
+
+    def test_unsupported_content_type(self):
+        """Test qu'un format non supporté est refusé."""
+        response = self.client.post(self.url, {'well': self.well.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+
+class StreamingExportTest(APITestCase):
+    """Tests pour l'export en flux des rapports quotidiens."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='export@example.com',
+            username='export',
+            password='exportpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.well = Well.objects.create(nom='Puits Export', name='Export Well')
+        for day in range(1, 6):
+            RapportQuotidien.objects.create(
+                puit=self.well,
+                well=self.well,
+                date_rapport=date(2024, 3, day),
+                report_date=date(2024, 3, day),
+                activites='Forage',
+                activities='Drilling',
+                progression=day * 10,
+                heures_travaillees=12,
+                soumis_par=self.user
+            )
+
+    def _content(self, response):
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv_export_applies_filters(self):
+        """Test que l'export CSV applique les filtres de date de la liste."""
+        response = self.client.get(reverse('wells:report-export'), {
+            'well_id': self.well.id, 'start_date': '2024-03-02', 'end_date': '2024-03-04'
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = self._content(response).strip().splitlines()
+        self.assertTrue(lines[0].startswith('id,puit,well,operation,date_rapport,report_date'))
+        self.assertEqual(len(lines), 4)
+
+    def test_ndjson_export(self):
+        """Test que l'export NDJSON produit un objet JSON par ligne."""
+        response = self.client.get(reverse('wells:report-export'), {'output': 'ndjson'})
+        lines = self._content(response).strip().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])['report_date'], '2024-03-05')
+
+    def test_unknown_format(self):
+        """Test qu'un format d'export inconnu est refusé."""
+        response = self.client.get(reverse('wells:report-export'), {'output': 'xlsx'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class GeoQueryTest(APITestCase):
+    """Tests pour les recherches géographiques sur les puits."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='geo@example.com',
+            username='geo',
+            password='geopass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        # Hassi Messaoud et ses environs, plus un puits lointain à In Amenas.
+        self.centre = Well.objects.create(nom='HMD-1', latitude=31.6800, longitude=6.0700)
+        self.proche = Well.objects.create(nom='HMD-2', latitude=31.7000, longitude=6.1000)
+        self.moyen = Well.objects.create(nom='HMD-3', coord_y=31.9000, coord_x=6.3000)
+        self.lointain = Well.objects.create(nom='INA-1', latitude=28.0500, longitude=9.6300)
+        self.sans_position = Well.objects.create(nom='Sans position')
+
+    def _names(self, results):
+        return [item['nom'] for item in results]
+
+    def test_geohash_maintained_on_save(self):
+        """Test que le geohash est calculé à la sauvegarde et suit les coordonnées."""
+        self.assertEqual(self.centre.geohash, encoder_geohash(31.68, 6.07))
+        self.assertEqual(self.moyen.geohash, encoder_geohash(31.9, 6.3))
+        self.assertEqual(self.sans_position.geohash, '')
+
+        self.centre.latitude = 28.05
+        self.centre.longitude = 9.63
+        self.centre.save(update_fields=['latitude', 'longitude'])
+        self.centre.refresh_from_db()
+        self.assertEqual(self.centre.geohash, self.lointain.geohash)
+
+    def test_geohash_maintained_on_queryset_writes(self):
+        """Test que le geohash suit les coordonnées modifiées par update() et bulk_update()."""
+        Well.objects.filter(pk=self.centre.pk).update(latitude=28.05, longitude=9.63)
+        self.centre.refresh_from_db()
+        self.assertEqual(self.centre.geohash, self.lointain.geohash)
+
+        self.sans_position.latitude = 31.9
+        self.sans_position.longitude = 6.3
+        Well.objects.bulk_update([self.sans_position], ['latitude', 'longitude'])
+        self.sans_position.refresh_from_db()
+        self.assertEqual(self.sans_position.geohash, self.moyen.geohash)
+
+    def test_rebuild_geohashes_command(self):
+        """Test que la commande de rattrapage calcule le geohash des puits existants."""
+        Well.objects.update(geohash='')
+        out = StringIO()
+        call_command('rebuild_well_geohashes', stdout=out)
+        self.assertIn('4 puits', out.getvalue())
+        self.centre.refresh_from_db()
+        self.sans_position.refresh_from_db()
+        self.assertEqual(self.centre.geohash, encoder_geohash(31.68, 6.07))
+        self.assertEqual(self.sans_position.geohash, '')
+
+        response = self.client.get(reverse('wells:well-within-radius'), {
+            'lat': 31.68, 'lon': 6.07, 'radius_km': 10
+        })
+        self.assertEqual(self._names(response.data), ['HMD-1', 'HMD-2'])
+
+    def test_geohash_reference_value(self):
+        """Test l'encodage geohash sur une valeur de référence."""
+        self.assertEqual(encoder_geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+
+    def test_haversine_distance(self):
+        """Test la distance haversine vectorisée (Paris - Londres, environ 343,5 km)."""
+        distances = distances_haversine(48.8566, 2.3522, [51.5074, 48.8566], [-0.1278, 2.3522])
+        self.assertAlmostEqual(distances[0], 343.5, delta=0.5)
+        self.assertAlmostEqual(distances[1], 0.0)
+
+    def test_bbox(self):
+        """Test que le rectangle ne renvoie que les puits qu'il contient."""
+        response = self.client.get(reverse('wells:well-bbox'), {
+            'min_lat': 31.5, 'min_lon': 5.9, 'max_lat': 32.0, 'max_lon': 6.5
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCountEqual(self._names(response.data['results']), ['HMD-1', 'HMD-2', 'HMD-3'])
+
+    def test_bbox_rejects_inverted_latitudes(self):
+        """Test qu'un rectangle aux latitudes inversées est refusé."""
+        response = self.client.get(reverse('wells:well-bbox'), {
+            'min_lat': 32.0, 'min_lon': 5.9, 'max_lat': 31.5, 'max_lon': 6.5
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_within_radius_sorted_by_distance(self):
+        """Test que la recherche par rayon filtre et trie par distance."""
+        response = self.client.get(reverse('wells:well-within-radius'), {
+            'lat': 31.68, 'lon': 6.07, 'radius_km': 10
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._names(response.data), ['HMD-1', 'HMD-2'])
+        self.assertEqual(response.data[0]['distance_km'], 0.0)
+
+    def test_nearest(self):
+        """Test que les k plus proches sont exacts même au-delà du rayon initial."""
+        response = self.client.get(reverse('wells:well-nearest'), {'lat': 28.0, 'lon': 9.6, 'k': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._names(response.data), ['INA-1', 'HMD-2'])
+
+    def test_archived_wells_excluded(self):
+        """Test que les puits archivés sont exclus comme dans la liste."""
+        Well.objects.filter(pk=self.proche.pk).update(is_archived=True)
+        response = self.client.get(reverse('wells:well-nearest'), {'lat': 31.68, 'lon': 6.07, 'k': 2})
+        self.assertEqual(self._names(response.data), ['HMD-1', 'HMD-3'])
+
+
+class HierarchyTreeTest(APITestCase):
+    """Tests pour l'arbre Région → Puits → Forage → Phase → Opération → Indicateur."""
+
+    def setUp(self):
+        cache.clear()
+        reference_cache.clear_local()
+        self.user = User.objects.create_user(
+            email='arbre@example.com',
+            username='arbre',
+            password='arbrepass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.region = Region.objects.create(
+            nom='Hassi Messaoud', code='HMD', localisation='Ouargla', responsable='Direction HMD'
+        )
+        type_operation = TypeOperation.objects.create(code='FOR', nom='Forage')
+        type_indicateur = TypeIndicateur.objects.create(code='ROP', nom='Vitesse', unite='m/h')
+        self.wells = []
+        for i in range(3):
+            well = Well.objects.create(nom=f'HMD-{i}', region=self.region)
+            forage = Forage.objects.create(puit=well, cout=1000)
+            for numero in range(1, 3):
+                phase = Phase.objects.create(forage=forage, numero_phase=numero, diametre='16"')
+                operation = Operation.objects.create(
+                    phase=phase, type_operation=type_operation, created_by=self.user
+                )
+                Indicateur.objects.create(
+                    operation=operation, type_indicateur=type_indicateur,
+                    valeur_prevue=10, valeur_reelle=9, date_mesure=timezone.now()
+                )
+            self.wells.append(well)
+        self.indicateur = Indicateur.objects.filter(operation__phase__forage__puit=self.wells[0]).first()
+
+    def test_well_tree(self):
+        """Test que l'arbre d'un puits contient tous les niveaux."""
+        response = self.client.get(reverse('wells:well-tree', kwargs={'pk': self.wells[0].pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        phases = response.data['forage']['phases']
+        self.assertEqual([phase['numero_phase'] for phase in phases], [1, 2])
+        self.assertEqual(len(phases[0]['operations'][0]['indicateurs']), 1)
+
+    def test_region_tree_constant_queries(self):
+        """Test que l'arbre d'une région est construit en un nombre constant de requêtes."""
+        url = reverse('wells:region-tree', kwargs={'pk': self.region.pk})
+        with CaptureQueriesContext(connection) as froid:
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['puits']), 3)
+        # Région + identifiants des puits + une requête par niveau de l'arbre.
+        self.assertLessEqual(len(froid.captured_queries), 7)
+
+        with CaptureQueriesContext(connection) as chaud:
+            self.client.get(url)
+        self.assertEqual(len(chaud.captured_queries), 2)
+
+    def test_node_change_invalidates_well_tree(self):
+        """Test que la modification d'un nœud invalide l'arbre de son puits uniquement."""
+        self.client.get(reverse('wells:region-tree', kwargs={'pk': self.region.pk}))
+        self.indicateur.valeur_reelle = 12
+        with self.captureOnCommitCallbacks(execute=True):
+            self.indicateur.save()
+        self.assertIsNone(cache.get(cle_arbre(self.wells[0].pk)))
+        self.assertIsNotNone(cache.get(cle_arbre(self.wells[1].pk)))
+
+        response = self.client.get(reverse('wells:well-tree', kwargs={'pk': self.wells[0].pk}))
+        valeurs = [
+            indicateur['valeur_reelle']
+            for phase in response.data['forage']['phases']
+            for operation in phase['operations']
+            for indicateur in operation['indicateurs']
+        ]
+        self.assertIn(12, valeurs)
+
+    def test_moved_node_invalidates_both_trees(self):
+        """Test que le déplacement d'une opération vers un autre puits invalide les deux arbres."""
+        self.client.get(reverse('wells:region-tree', kwargs={'pk': self.region.pk}))
+        operation = self.indicateur.operation
+        operation.phase = Phase.objects.filter(forage__puit=self.wells[1]).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            operation.save()
+        self.assertIsNone(cache.get(cle_arbre(self.wells[0].pk)))
+        self.assertIsNone(cache.get(cle_arbre(self.wells[1].pk)))
+        self.assertIsNotNone(cache.get(cle_arbre(self.wells[2].pk)))
+
+    def test_deleted_node_invalidates_tree(self):
+        """Test que la suppression d'une phase invalide l'arbre de son puits."""
+        self.client.get(reverse('wells:region-tree', kwargs={'pk': self.region.pk}))
+        with self.captureOnCommitCallbacks(execute=True):
+            Phase.objects.filter(forage__puit=self.wells[1]).first().delete()
+        self.assertIsNone(cache.get(cle_arbre(self.wells[1].pk)))
+        self.assertIsNotNone(cache.get(cle_arbre(self.wells[0].pk)))
+
+
+class ConditionalGetTest(APITestCase):
+    """Tests pour les requêtes conditionnelles (ETag / Last-Modified) sur les puits."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='etag@example.com',
+            username='etag',
+            password='etagpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.well = Well.objects.create(nom='Puits ETag', name='ETag Well')
+        Well.objects.create(nom='Puits ETag 2', name='ETag Well 2')
+
+    def test_list_not_modified(self):
+        """Test qu'une liste inchangée renvoie 304 avec une seule requête SQL."""
+        url = reverse('wells:well-list')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_etag_changes_with_data_and_filters(self):
+        """Test que l'ETag de la liste change avec les données et avec les paramètres."""
+        url = reverse('wells:well-list')
+        etag = self.client.get(url)['ETag']
+        self.assertNotEqual(self.client.get(url, {'page_size': 1})['ETag'], etag)
+
+        self.well.name = 'ETag Well renamed'
+        self.well.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_etag_changes_on_delete(self):
+        """Test que la suppression d'un puits change l'ETag de la liste."""
+        url = reverse('wells:well-list')
+        etag = self.client.get(url)['ETag']
+        Well.objects.exclude(pk=self.well.pk).delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_detail_not_modified(self):
+        """Test qu'un détail inchangé renvoie 304 avec une seule requête SQL."""
+        url = reverse('wells:well-detail', kwargs={'pk': self.well.pk})
+        response = self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_if_modified_since(self):
+        """Test que If-Modified-Since est respecté sur le détail."""
+        url = reverse('wells:well-detail', kwargs={'pk': self.well.pk})
+        response = self.client.get(url)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_nested_change_invalidates_detail(self):
+        """Test qu'un nouveau rapport quotidien change l'ETag du détail du puits."""
+        url = reverse('wells:well-detail', kwargs={'pk': self.well.pk})
+        etag = self.client.get(url)['ETag']
+        RapportQuotidien.objects.create(
+            puit=self.well,
+            well=self.well,
+            date_rapport=date.today(),
+            activites='Forage',
+            progression=10,
+            heures_travaillees=12,
+            soumis_par=self.user
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['daily_reports']), 1)
+
+    def test_region_change_invalidates_detail(self):
+        """Test que la modification de la région change l'ETag du détail de ses puits."""
+        region = Region.objects.create(nom='Berkine', code='BRK', localisation='Ouargla', responsable='A')
+        self.well.region = region
+        self.well.save()
+        url = reverse('wells:well-detail', kwargs={'pk': self.well.pk})
+        etag = self.client.get(url)['ETag']
+
+        region.nom = 'Berkine Est'
+        with self.captureOnCommitCallbacks(execute=True):
+            region.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['region_details']['nom'], 'Berkine Est')
+
+    def test_missing_well_returns_404(self):
+        """Test qu'un puits inexistant renvoie toujours 404."""
+        response = self.client.get(reverse('wells:well-detail', kwargs={'pk': 999999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_malformed_pk_returns_404(self):
+        """Test qu'un identifiant non numérique renvoie 404 et non une erreur serveur."""
+        response = self.client.get(reverse('wells:well-detail', kwargs={'pk': 'abc'}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SparseFieldsetTest(APITestCase):
+    """Tests pour les jeux de champs partiels (?fields= / ?omit=)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='fields@example.com',
+            username='fields',
+            password='fieldspass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.well = Well.objects.create(
+            nom='Puits Champs', name='Fields Well', status='active', description='Longue description'
+        )
+
+    def test_fields_restricts_payload(self):
+        """Test que ?fields= ne renvoie que les champs demandés."""
+        response = self.client.get(reverse('wells:well-list'), {'fields': 'id,name,status_display'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'status_display'})
+        self.assertEqual(response.data['results'][0]['status_display'], 'Active')
+
+    def test_omit_removes_fields(self):
+        """Test que ?omit= retire les champs indiqués."""
+        response = self.client.get(
+            reverse('wells:well-detail', kwargs={'pk': self.well.pk}), {'omit': 'description,operations'}
+        )
+        self.assertNotIn('description', response.data)
+        self.assertNotIn('operations', response.data)
+        self.assertIn('daily_reports', response.data)
+
+    def test_unrequested_columns_not_fetched(self):
+        """Test que les colonnes non demandées ne sont pas lues depuis PostgreSQL."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('wells:well-list'), {'fields': 'id,name'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        page_sql = context.captured_queries[-1]['sql']
+        self.assertIn('"name"', page_sql)
+        self.assertNotIn('"description"', page_sql)
+        self.assertNotIn('"recherche"', page_sql)
+
+    def test_nested_serializers_keep_their_fields(self):
+        """Test que les serializers imbriqués ne sont pas restreints."""
+        OperationPuit.objects.create(
+            puit=self.well,
+            type_operation='forage',
+            nom='Opération',
+            date_debut_prevue=timezone.now(),
+            date_fin_prevue=timezone.now() + timedelta(days=1),
+            cree_par=self.user
+        )
+        response = self.client.get(
+            reverse('wells:well-detail', kwargs={'pk': self.well.pk}), {'fields': 'id,operations'}
+        )
+        self.assertEqual(set(response.data), {'id', 'operations'})
+        self.assertIn('nom', response.data['operations'][0])
+
+
+class OperationLifecycleTest(TestCase):
+    """Tests pour le cycle de vie des opérations et le compteur d'opérations ouvertes."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='cycle@example.com',
+            username='cycle',
+            password='cyclepass123'
+        )
+        self.well = Well.objects.create(nom='Puits Cycle', name='Lifecycle Well', status='planned')
+        self.operations = [self._create_operation(i) for i in range(2)]
+
+    def _create_operation(self, i, **kwargs):
+        return OperationPuit.objects.create(
+            puit=self.well,
+            well=self.well,
+            type_operation='forage',
+            nom=f'Opération {i}',
+            date_debut_prevue=timezone.now(),
+            date_fin_prevue=timezone.now() + timedelta(days=1),
+            cree_par=self.user,
+            **kwargs
+        )
+
+    def _open_count(self):
+        self.well.refresh_from_db()
+        return self.well.operations_ouvertes
+
+    def test_counter_follows_creation_and_deletion(self):
+        """Test que le compteur suit les créations et suppressions d'opérations."""
+        self.assertEqual(self._open_count(), 2)
+        self._create_operation(2, status='termine')
+        self.assertEqual(self._open_count(), 2)
+        self.operations[0].delete()
+        self.assertEqual(self._open_count(), 1)
+
+    def test_counter_follows_status_updates(self):
+        """Test que le compteur suit les changements de statut hors cycle de vie."""
+        operation = OperationPuit.objects.get(pk=self.operations[0].pk)
+        operation.status = 'annule'
+        operation.save()
+        self.assertEqual(self._open_count(), 1)
+        operation.status = 'planifie'
+        operation.save()
+        self.assertEqual(self._open_count(), 2)
+
+    def test_start_activates_well(self):
+        """Test que le démarrage d'une opération active le puits."""
+        demarrer_operation(self.operations[0].pk, self.user)
+        self.well.refresh_from_db()
+        self.assertEqual(self.well.status, 'active')
+        with self.assertRaises(TransitionInvalide):
+            demarrer_operation(self.operations[0].pk, self.user)
+
+    def test_well_completed_with_last_operation(self):
+        """Test que le puits est terminé avec sa dernière opération ouverte, sans COUNT."""
+        for operation in self.operations:
+            demarrer_operation(operation.pk, self.user)
+
+        terminer_operation(self.operations[0].pk, self.user)
+        self.well.refresh_from_db()
+        self.assertEqual(self.well.status, 'active')
+
+        with CaptureQueriesContext(connection) as context:
+            terminer_operation(self.operations[1].pk, self.user)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in context.captured_queries))
+        self.well.refresh_from_db()
+        self.assertEqual(self.well.status, 'completed')
+        self.assertEqual(self.well.operations_ouvertes, 0)
+
+    def test_complete_requires_started_operation(self):
+        """Test qu'une opération non démarrée ne peut pas être terminée."""
+        with self.assertRaises(TransitionInvalide):
+            terminer_operation(self.operations[0].pk, self.user)
+        self.assertEqual(self._open_count(), 2)
+
+    def test_full_well_save_keeps_counter(self):
+        """Test qu'une sauvegarde complète d'un puits périmé n'écrase pas le compteur."""
+        stale = Well.objects.get(pk=self.well.pk)
+        self._create_operation(3)
+        stale.name = 'Renamed'
+        stale.save()
+        self.assertEqual(self._open_count(), 3)
+        self.assertEqual(self.well.name, 'Renamed')
+
+    def test_rebuild_counters(self):
+        """Test que la commande de recalcul corrige un compteur désynchronisé."""
+        Well.objects.filter(pk=self.well.pk).update(operations_ouvertes=7)
+        call_command('rebuild_open_operations', stdout=StringIO())
+        self.assertEqual(self._open_count(), 2)
+
+
+class IndicateurPartitionTest(TestCase):
+    """Tests pour le partitionnement mensuel de la table des indicateurs."""
+
+    def setUp(self):
+        user = User.objects.create_user(
+            email='partition@example.com',
+            username='partition',
+            password='partitionpass123'
+        )
+        well = Well.objects.create(nom='Puits Partition')
+        forage = Forage.objects.create(puit=well)
+        phase = Phase.objects.create(forage=forage, numero_phase=1, diametre='16"')
+        self.operation = Operation.objects.create(
+            phase=phase, type_operation=TypeOperation.objects.create(code='FOR', nom='Forage'), created_by=user
+        )
+        self.type_indicateur = TypeIndicateur.objects.create(code='ROP', nom='Vitesse', unite='m/h')
+        self.mois = debut_mois(date.today())
+        self.ancien = Indicateur.objects.create(
+            operation=self.operation, type_indicateur=self.type_indicateur, valeur_reelle=1,
+            date_mesure=timezone.now() - timedelta(days=400)
+        )
+        call_command('indicateur_partitions', '--initialiser', stdout=StringIO())
+
+    def _partition_of(self, indicateur):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT tableoid::regclass::text FROM "{Indicateur._meta.db_table}" WHERE id = %s',
+                [indicateur.pk]
+            )
+            return cursor.fetchone()[0].strip('"')
+
+    def test_rows_routed_to_monthly_partition(self):
+        """Test que les lignes existantes et nouvelles sont rangées dans la partition de leur mois."""
+        nouveau = Indicateur.objects.create(
+            operation=self.operation, type_indicateur=self.type_indicateur, valeur_reelle=2,
+            date_mesure=timezone.now()
+        )
+        self.assertEqual(self._partition_of(nouveau), nom_partition(self.mois))
+        self.assertEqual(self._partition_of(self.ancien), nom_partition(debut_mois(self.ancien.date_mesure)))
+        self.assertIn(ajouter_mois(self.mois, 3), partitions_existantes())
+
+    def test_month_range_scans_single_partition(self):
+        """Test qu'une requête sur un mois ne lit que la partition de ce mois."""
+        debut = datetime.combine(self.mois, time.min, tzinfo=dt_timezone.utc)
+        fin = datetime.combine(ajouter_mois(self.mois, 1), time.min, tzinfo=dt_timezone.utc)
+        plan = Indicateur.objects.filter(date_mesure__gte=debut, date_mesure__lt=fin).explain()
+        self.assertIn(nom_partition(self.mois), plan)
+        self.assertNotIn(nom_partition(ajouter_mois(self.mois, 1)), plan)
+        self.assertNotIn(nom_partition(debut_mois(self.ancien.date_mesure)), plan)
+
+    def test_retention_detaches_old_partitions(self):
+        """Test que la rétention détache les anciennes partitions sans DELETE."""
+        with CaptureQueriesContext(connection) as context:
+            call_command('indicateur_partitions', '--retention', '6', '--supprimer', stdout=StringIO())
+        self.assertFalse(any(query['sql'].startswith('DELETE') for query in context.captured_queries))
+        self.assertNotIn(debut_mois(self.ancien.date_mesure), partitions_existantes())
+        self.assertFalse(Indicateur.objects.filter(pk=self.ancien.pk).exists())
+        self.assertIn(self.mois, partitions_existantes())
+
+    def test_detached_partition_not_reported_as_created(self):
+        """Test qu'un mois dont la partition est détachée mais conservée n'est pas compté comme créé."""
+        ancien_mois = debut_mois(self.ancien.date_mesure)
+        self.assertIn(nom_partition(ancien_mois), detacher_partitions(ajouter_mois(ancien_mois, 1)))
+        self.assertEqual(creer_partitions(ancien_mois, ancien_mois), [])
+        self.assertNotIn(ancien_mois, partitions_existantes())
+
+    def test_out_of_range_dates_use_default_partition(self):
+        """Test qu'une date hors des mois créés est acceptée, puis déplacée à la création de son mois."""
+        mesures = [
+            Indicateur.objects.create(
+                operation=self.operation, type_indicateur=self.type_indicateur, valeur_reelle=3,
+                date_mesure=timezone.now() + timedelta(days=jours)
+            )
+            for jours in (-800, 730)
+        ]
+        for mesure in mesures:
+            self.assertEqual(self._partition_of(mesure), nom_partition_defaut())
+
+        futur = debut_mois(mesures[1].date_mesure)
+        self.assertEqual(creer_partitions(futur, futur), [futur])
+        self.assertEqual(self._partition_of(mesures[1]), nom_partition(futur))
+        self.assertEqual(self._partition_of(mesures[0]), nom_partition_defaut())
+        self.assertEqual(Indicateur.objects.get(pk=mesures[1].pk).valeur_reelle, 3)
+
+
+class IndicateurSeriesTest(APITestCase):
+    """Tests pour les séries agrégées et réduites des indicateurs."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='series@example.com',
+            username='series',
+            password='seriespass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.well = Well.objects.create(nom='Puits Série')
+        forage = Forage.objects.create(puit=self.well)
+        phase = Phase.objects.create(forage=forage, numero_phase=1, diametre='12"')
+        self.operation = Operation.objects.create(
+            phase=phase, type_operation=TypeOperation.objects.create(code='FOR', nom='Forage'), created_by=self.user
+        )
+        self.type_indicateur = TypeIndicateur.objects.create(code='ROP', nom='Vitesse', unite='m/h')
+        self.jour = datetime(2026, 3, 4, tzinfo=dt_timezone.utc)
+        self.mesures = [
+            self._mesurer(self.jour + timedelta(hours=heure), valeur)
+            for heure, valeur in ((10, 1), (11, 5), (12, 3))
+        ]
+
+    def _mesurer(self, moment, valeur):
+        return Indicateur.objects.create(
+            operation=self.operation, type_indicateur=self.type_indicateur,
+            valeur_reelle=valeur, valeur_prevue=4, date_mesure=moment
+        )
+
+    def _agregat(self, granularite):
+        return AgregatIndicateur.objects.get(
+            puit=self.well, type_indicateur=self.type_indicateur, granularite=granularite
+        )
+
+    def test_rollups_maintained_on_create(self):
+        """Test que chaque nouvelle mesure est fusionnée dans les agrégats de chaque granularité."""
+        jour = self._agregat('day')
+        self.assertEqual(jour.debut, self.jour)
+        self.assertEqual((jour.nombre, jour.min_reelle, jour.max_reelle, jour.somme_reelle), (3, 1, 5, 9))
+        self.assertEqual(jour.derniere_reelle, 3)
+        self.assertEqual(self._agregat('week').debut, datetime(2026, 3, 2, tzinfo=dt_timezone.utc))
+        self.assertEqual(self._agregat('month').nombre, 3)
+        self.assertEqual(
+            AgregatIndicateur.objects.filter(granularite='hour', puit=self.well).count(), 3
+        )
+
+    def test_update_and_delete_recompute_buckets(self):
+        """Test qu'une mesure modifiée ou supprimée entraîne le recalcul de ses intervalles."""
+        pic = self.mesures[1]
+        pic.valeur_reelle = 2
+        pic.save()
+        self.assertEqual(self._agregat('day').max_reelle, 3)
+
+        pic.date_mesure = self.jour + timedelta(days=1)
+        pic.save()
+        self.assertEqual(self._agregat('month').nombre, 3)
+        self.assertEqual(
+            AgregatIndicateur.objects.filter(granularite='day', puit=self.well).count(), 2
+        )
+
+        self.mesures[2].delete()
+        jour = AgregatIndicateur.objects.get(granularite='day', puit=self.well, debut=self.jour)
+        self.assertEqual((jour.nombre, jour.derniere_reelle), (1, 1))
+
+    def test_cascade_delete_rebuilds_once(self):
+        """Test que la suppression d'une opération reconstruit les agrégats une fois, pas mesure par mesure."""
+        autre = Operation.objects.create(
+            phase=self.operation.phase, type_operation=self.operation.type_operation, created_by=self.user
+        )
+        Indicateur.objects.create(
+            operation=autre, type_indicateur=self.type_indicateur, valeur_reelle=7, date_mesure=self.jour
+        )
+        with CaptureQueriesContext(connection) as avec_mesures:
+            self.operation.delete()
+        jour = self._agregat('day')
+        self.assertEqual((jour.nombre, jour.max_reelle), (1, 7))
+        self.assertFalse(AgregatIndicateur.objects.filter(granularite='hour', debut__gt=self.jour).exists())
+
+        for heure in range(20):
+            Indicateur.objects.create(
+                operation=autre, type_indicateur=self.type_indicateur, valeur_reelle=heure,
+                date_mesure=self.jour + timedelta(hours=heure)
+            )
+        with CaptureQueriesContext(connection) as plus_de_mesures:
+            autre.delete()
+        self.assertLessEqual(len(plus_de_mesures.captured_queries), len(avec_mesures.captured_queries))
+        self.assertFalse(AgregatIndicateur.objects.filter(puit=self.well).exists())
+
+    def test_moving_node_rebuilds_both_wells(self):
+        """Test qu'une opération déplacée vers un autre puits emporte ses mesures dans les agrégats."""
+        autre_puit = Well.objects.create(nom='Puits Destination')
+        autre_phase = Phase.objects.create(
+            forage=Forage.objects.create(puit=autre_puit), numero_phase=1, diametre='8"'
+        )
+        self.operation.phase = autre_phase
+        self.operation.save()
+
+        self.assertFalse(AgregatIndicateur.objects.filter(puit=self.well).exists())
+        jour = AgregatIndicateur.objects.get(
+            puit=autre_puit, type_indicateur=self.type_indicateur, granularite='day'
+        )
+        self.assertEqual((jour.nombre, jour.min_reelle, jour.max_reelle, jour.somme_reelle), (3, 1, 5, 9))
+
+    def test_well_delete_skips_recompute(self):
+        """Test que la suppression d'un puits ne recalcule aucun intervalle."""
+        with CaptureQueriesContext(connection) as context:
+            self.well.delete()
+        self.assertFalse(any('INSERT' in query['sql'] for query in context.captured_queries))
+        self.assertFalse(AgregatIndicateur.objects.exists())
+
+    def test_rebuild_matches_incremental_rollups(self):
+        """Test que la reconstruction produit les mêmes agrégats que la maintenance incrémentale."""
+        colonnes = ['granularite', 'debut', 'nombre', 'min_reelle', 'max_reelle', 'somme_reelle', 'derniere_reelle']
+        avant = list(AgregatIndicateur.objects.order_by('granularite', 'debut').values_list(*colonnes))
+        call_command('rebuild_indicateur_series', stdout=StringIO())
+        apres = list(AgregatIndicateur.objects.order_by('granularite', 'debut').values_list(*colonnes))
+        self.assertEqual(avant, apres)
+
+    def test_lttb_keeps_endpoints_and_peaks(self):
+        """Test que LTTB conserve les extrémités et les pics de la série."""
+        y = [0.0] * 100
+        y[50] = 10.0
+        retenus = lttb(range(100), y, 10)
+        self.assertEqual(len(retenus), 10)
+        self.assertEqual((retenus[0], retenus[-1]), (0, 99))
+        self.assertIn(50, retenus)
+
+    def test_series_endpoint(self):
+        """Test que l'endpoint retourne les intervalles agrégés ou les mesures réduites."""
+        url = reverse('wells:indicateur-series')
+        params = {'well_id': self.well.pk, 'type_indicateur_id': self.type_indicateur.pk}
+
+        response = self.client.get(url, {**params, 'granularity': 'day'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        point, = response.data['points']
+        self.assertEqual(point['count'], 3)
+        self.assertEqual(point['valeur_reelle'], {'min': 1.0, 'max': 5.0, 'avg': 3.0, 'last': 3.0})
+
+        for heure in range(13, 23):
+            self._mesurer(self.jour + timedelta(hours=heure), heure % 3)
+        response = self.client.get(url, {**params, 'granularity': 'raw', 'max_points': 5})
+        dates = [point['date_mesure'] for point in response.data['points']]
+        self.assertEqual(len(dates), 5)
+        self.assertEqual(dates[0], self.mesures[0].date_mesure)
+        self.assertEqual(dates, sorted(dates))
+
+        response = self.client.get(url, {**params, 'granularity': 'year'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RegionRollupTest(APITestCase):
+    """Tests pour la synthèse des coûts et de l'avancement par région."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='rollup@example.com',
+            username='rollup',
+            password='rolluppass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.region = Region.objects.create(nom='Hassi Messaoud', code='HMD', localisation='Ouargla', responsable='A')
+        Region.objects.create(nom='Illizi', code='ILZ', localisation='Illizi', responsable='B')
+
+        en_cours = Well.objects.create(nom='HMD-1', region=self.region, statut='EN_COURS')
+        self.forage = Forage.objects.create(puit=en_cours, cout=100)
+        type_operation = TypeOperation.objects.create(code='FOR', nom='Forage')
+        for numero, prevue, reelle in ((1, 1000, 900), (2, 2000, 1500)):
+            phase = Phase.objects.create(
+                forage=self.forage, numero_phase=numero, diametre='16"',
+                profondeur_prevue=prevue, profondeur_reelle=reelle
+            )
+            Operation.objects.create(phase=phase, type_operation=type_operation, cout=10 * numero,
+                                     created_by=self.user)
+
+        planifie = Well.objects.create(nom='HMD-2', region=self.region, statut='PLANIFIE')
+        Forage.objects.create(puit=planifie, cout=300)
+        self.url = reverse('wells:region-rollup')
+
+    def _region(self, response, code):
+        return next(region for region in response.data if region['code'] == code)
+
+    def test_rollup_values(self):
+        """Test que les coûts ne sont pas multipliés par les phases et opérations jointes."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        region = self._region(response, 'HMD')
+        self.assertEqual(region['wells'], 2)
+        self.assertEqual(region['wells_by_status']['EN_COURS'], 1)
+        self.assertEqual(region['wells_by_status']['PLANIFIE'], 1)
+        self.assertEqual(region['drilling_cost_total'], 400.0)
+        self.assertEqual(region['drilling_cost_avg'], 200.0)
+        self.assertEqual(region['operation_cost_total'], 30.0)
+        self.assertEqual((region['depth_planned'], region['depth_actual']), (2000.0, 1500.0))
+        self.assertEqual(region['depth_progress'], 0.75)
+        self.assertEqual(self._region(response, 'ILZ')['wells'], 0)
+
+    def test_single_query_then_cached(self):
+        """Test que la synthèse est calculée en une requête puis servie depuis le cache."""
+        with self.assertNumQueries(1):
+            synthese_regions()
+        with self.assertNumQueries(0):
+            synthese_regions()
+
+    def test_cost_change_invalidates_rollup(self):
+        """Test qu'une modification de coût invalide la synthèse en cache."""
+        self.client.get(self.url)
+        self.forage.cout = 500
+        with self.captureOnCommitCallbacks(execute=True):
+            self.forage.save()
+        response = self.client.get(self.url)
+        self.assertEqual(self._region(response, 'HMD')['drilling_cost_total'], 800.0)
+
+
+class WellSummaryTest(APITestCase):
+    """Tests pour le résumé dénormalisé des puits."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='summary@example.com',
+            username='summary',
+            password='summarypass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.well = Well.objects.create(nom='Puits Résumé', name='Summary Well')
+        self.other = Well.objects.create(nom='Puits Voisin', name='Neighbour Well')
+        forage = Forage.objects.create(puit=self.well)
+        phase = Phase.objects.create(forage=forage, numero_phase=1, diametre='16"')
+        self.operation = Operation.objects.create(
+            phase=phase, type_operation=TypeOperation.objects.create(code='FOR', nom='Forage'), created_by=self.user
+        )
+        self.operations = [self._operation(i) for i in range(2)]
+        self.rapports = [self._rapport(date(2026, 3, jour)) for jour in (1, 2)]
+        Document.objects.create(
+            puit=self.well, nom='Programme', type_document='Rapport',
+            fichier='documents_puit/programme.pdf', uploade_par=self.user, uploaded_by=self.user
+        )
+        self.probleme = self._probleme(Probleme.Statut.OUVERT)
+        self._probleme(Probleme.Statut.FERME)
+
+    def _operation(self, i):
+        return OperationPuit.objects.create(
+            puit=self.well, type_operation='forage', nom=f'Opération {i}',
+            date_debut_prevue=timezone.now(), date_fin_prevue=timezone.now() + timedelta(days=1),
+            cree_par=self.user, created_by=self.user
+        )
+
+    def _rapport(self, jour):
+        return RapportQuotidien.objects.create(
+            puit=self.well, well=self.well, date_rapport=jour, activites='Forage',
+            progression=10, heures_travaillees=12, soumis_par=self.user, submitted_by=self.user
+        )
+
+    def _probleme(self, statut):
+        return Probleme.objects.create(
+            operation=self.operation, titre='Perte de boue', description='Pertes partielles',
+            type_probleme=Probleme.Type.TECHNIQUE, gravite=Probleme.Gravite.MODEREE,
+            statut=statut, detecte_par=self.user
+        )
+
+    def _resume(self, well=None):
+        return ResumePuit.objects.values(*ResumePuit.CHAMPS).get(puit=well or self.well)
+
+    def test_summary_maintained_on_create(self):
+        """Test que chaque création met à jour le résumé du puits."""
+        self.assertEqual(self._resume(), {
+            'nombre_operations': 2,
+            'nombre_rapports': 2,
+            'problemes_ouverts': 1,
+            'nombre_documents': 1,
+            'dernier_rapport': date(2026, 3, 2),
+        })
+
+    def test_summary_maintained_on_update_and_delete(self):
+        """Test que modifications et suppressions ajustent le résumé, y compris d'un puits à l'autre."""
+        self.probleme.statut = Probleme.Statut.RESOLU
+        self.probleme.save()
+        self.rapports[1].delete()
+        operation = self.operations[0]
+        operation.puit = self.other
+        operation.save()
+
+        resume = self._resume()
+        self.assertEqual(resume['problemes_ouverts'], 0)
+        self.assertEqual((resume['nombre_rapports'], resume['dernier_rapport']), (1, date(2026, 3, 1)))
+        self.assertEqual(resume['nombre_operations'], 1)
+        self.assertEqual(self._resume(self.other)['nombre_operations'], 1)
+
+    def test_rebuild_repairs_drift(self):
+        """Test que la commande de reconstruction corrige les résumés désynchronisés."""
+        attendu = self._resume()
+        ResumePuit.objects.update(nombre_operations=99, dernier_rapport=None)
+        call_command('rebuild_well_summaries', stdout=StringIO())
+        self.assertEqual(self._resume(), attendu)
+
+    def test_summary_maintained_by_bulk_import(self):
+        """Test que l'import en masse des rapports met à jour le résumé du puits."""
+        body = (
+            "well,report_date,activities,progress,hours_worked\n"
+            f"{self.well.id},2026-03-02,Tubage,20,11\n"
+            f"{self.well.id},2026-03-05,Cimentation,30,10\n"
+        )
+        response = self.client.post(reverse('wells:report-bulk-import'), body, content_type='text/csv')
+        self.assertEqual(response.data['processed'], 2)
+        resume = self._resume()
+        self.assertEqual((resume['nombre_rapports'], resume['dernier_rapport']), (3, date(2026, 3, 5)))
+
+    def test_well_list_joins_summary(self):
+        """Test que la liste des puits expose le résumé via une jointure."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('wells:well-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        wells = {well['id']: well for well in response.data['results']}
+        self.assertEqual(wells[self.well.pk]['summary']['nombre_documents'], 1)
+        self.assertFalse(any('COUNT' in query['sql'] and 'rapport' in query['sql'].lower()
+                             for query in context.captured_queries))
+
+
+class MissingReportsTest(APITestCase):
+    """Tests pour la détection des rapports quotidiens manquants."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='gaps@example.com',
+            username='gaps',
+            password='gapspass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.well = Well.objects.create(nom='Puits Actif', statut='EN_COURS')
+        for jour in (1, 2, 5):
+            self._rapport(self.well, date(2026, 3, jour))
+        self.recent = Well.objects.create(nom='Puits Récent', status='active', date_debut=date(2026, 3, 6))
+        Well.objects.create(nom='Puits Archivé', statut='EN_COURS', is_archived=True)
+        Well.objects.create(nom='Puits Planifié', statut='PLANIFIE')
+
+    def _rapport(self, well, jour):
+        return RapportQuotidien.objects.create(
+            puit=well, well=well, date_rapport=jour, activites='Forage',
+            progression=10, heures_travaillees=12, soumis_par=self.user, submitted_by=self.user
+        )
+
+    def test_gaps_grouped_into_ranges(self):
+        """Test que les jours manquants sont regroupés en plages, en une requête, pour les seuls puits actifs."""
+        with self.assertNumQueries(1):
+            resultats = rapports_manquants(puits_actifs(), date(2026, 3, 1), date(2026, 3, 7))
+        par_puits = {resultat['well_id']: resultat for resultat in resultats}
+        self.assertEqual(set(par_puits), {self.well.pk, self.recent.pk})
+        self.assertEqual(par_puits[self.well.pk]['ranges'], [
+            {'start': date(2026, 3, 3), 'end': date(2026, 3, 4), 'days': 2},
+            {'start': date(2026, 3, 6), 'end': date(2026, 3, 7), 'days': 2},
+        ])
+        self.assertEqual(par_puits[self.well.pk]['missing_days'], 4)
+        # Le calendrier d'un puits commence à sa date de début.
+        self.assertEqual(par_puits[self.recent.pk]['ranges'], [
+            {'start': date(2026, 3, 6), 'end': date(2026, 3, 7), 'days': 2},
+        ])
+
+    def test_missing_reports_endpoint(self):
+        """Test que l'endpoint valide la plage et omet les puits sans jour manquant."""
+        for jour in (6, 7):
+            self._rapport(self.recent, date(2026, 3, jour))
+        url = reverse('wells:well-missing-reports')
+        response = self.client.get(url, {'start': '2026-03-01', 'end': '2026-03-07'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([resultat['well_id'] for resultat in response.data], [self.well.pk])
+
+        response = self.client.get(url, {'start': '2025-01-01', 'end': '2026-03-07'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class WellBulkActionTest(APITestCase):
+    """Tests pour l'archivage et les changements de statut en masse."""
+
+    def setUp(self):
+        self.manager = User.objects.create_user(
+            email='bulk@example.com',
+            username='bulk',
+            password='bulkpass123',
+            role=User.Role.MANAGER
+        )
+        self.client.force_authenticate(user=self.manager)
+        self.region = Region.objects.create(nom='Berkine', code='BRK', localisation='Ouargla', responsable='C')
+        self.wells = [Well.objects.create(nom=f'Puits {i}', region=self.region, status='active') for i in range(3)]
+        self.archived = Well.objects.create(nom='Puits Archivé', is_archived=True, status='archived')
+        self.other = Well.objects.create(nom='Puits Hors Région', status='active')
+        self.url = reverse('wells:well-bulk')
+
+    def test_bulk_archive_single_update_and_audit(self):
+        """Test que l'archivage en masse se fait en un UPDATE avec une seule entrée de journal."""
+        ids = [well.pk for well in self.wells] + [self.archived.pk]
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.url, {'action': 'archive', 'ids': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 3)
+
+        updates = [query for query in context.captured_queries
+                   if query['sql'].startswith(f'UPDATE "{Well._meta.db_table}"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            Well.objects.filter(pk__in=ids, is_archived=True, status='archived', last_updated_by=self.manager).count(),
+            3
+        )
+        journal = JournalAction.objects.get(pk=response.data['audit_id'])
+        self.assertEqual(json.loads(journal.details)['nombre'], 3)
+        self.assertEqual(JournalAction.objects.count(), 1)
+
+    def test_bulk_status_by_filter(self):
+        """Test que le changement de statut s'applique aux puits sélectionnés par filtre."""
+        response = self.client.post(self.url, {
+            'action': 'status', 'status': 'paused', 'filter': {'region': self.region.pk}
+        }, format='json')
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(Well.objects.filter(status='paused').count(), 3)
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.status, 'active')
+
+    def test_bulk_requires_selection_and_permission(self):
+        """Test qu'une action sans sélection est refusée, ainsi qu'un utilisateur non gestionnaire."""
+        response = self.client.post(self.url, {'action': 'unarchive'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        viewer = User.objects.create_user(email='viewer@example.com', username='viewer', password='viewerpass123')
+        self.client.force_authenticate(user=viewer)
+        response = self.client.post(self.url, {'action': 'unarchive', 'ids': [self.archived.pk]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(JournalAction.objects.exists())
+
+
+class WellAutocompleteTest(APITestCase):
+    """Tests pour l'autocomplétion des noms de puits par trigrammes."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='autocomplete@example.com',
+            username='autocomplete',
+            password='autocompletepass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        region = Region.objects.create(nom='Hassi Messaoud', code='HMD', localisation='Ouargla', responsable='A')
+        self.hassi = Well.objects.create(nom='Hassi Messaoud Nord', name='HMN-1')
+        self.omn = Well.objects.create(nom='OMN-12', name='OMN-12', region=region)
+        self.rhourde = Well.objects.create(nom='Rhourde Nouss', name='RN-3')
+        Well.objects.create(nom='Hassi R\'Mel', name='HRM-2', is_archived=True)
+
+    def test_similarity_ranking(self):
+        """Test que les puits sont classés par similarité, fautes de frappe comprises, hors archives."""
+        ids = [suggestion['id'] for suggestion in suggerer_puits('hassi')]
+        self.assertEqual(ids, [self.hassi.pk])
+        self.assertIn(self.rhourde.pk, [suggestion['id'] for suggestion in suggerer_puits('rhourd')])
+        self.assertEqual(len(suggerer_puits('hassi', inclure_archives=True)), 2)
+
+    def test_region_code_matches(self):
+        """Test que le code de région suffit à retrouver ses puits."""
+        suggestion, = suggerer_puits('HMD')
+        self.assertEqual((suggestion['id'], suggestion['region_code']), (self.omn.pk, 'HMD'))
+
+    def test_prefix_cached(self):
+        """Test qu'un préfixe déjà saisi est servi depuis le cache."""
+        suggerer_puits('Hassi ')
+        with self.assertNumQueries(0):
+            self.assertEqual(len(suggerer_puits('hassi')), 1)
+
+    def test_autocomplete_endpoint(self):
+        """Test que l'endpoint limite le nombre de suggestions et refuse les termes trop courts."""
+        url = reverse('wells:well-autocomplete')
+        response = self.client.get(url, {'q': 'Hassi', 'limit': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([suggestion['id'] for suggestion in response.data], [self.hassi.pk])
+
+        response = self.client.get(url, {'q': 'h'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class WellCompactListTest(APITestCase):
+    """Tests de parité entre la liste compacte (.values()) et le serializer des puits."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='compact@example.com',
+            username='compact',
+            password='compactpass123',
+            first_name='Compact',
+            last_name='Liste'
+        )
+        self.client.force_authenticate(user=self.user)
+        region = Region.objects.create(nom='Berkine', code='BRK', localisation='Illizi', responsable='B')
+        self.complet = Well.objects.create(
+            nom='Puits Complet', name='Full Well', region=region, status='active', depth='2450.50',
+            latitude='31.670000', longitude='6.070000', start_date=date(2024, 3, 1), last_updated_by=self.user,
+            created_by='compact', created_by_user=self.user
+        )
+        RapportQuotidien.objects.create(
+            puit=self.complet, well=self.complet, date_rapport=date(2024, 3, 2), activites='Forage',
+            progression=10, heures_travaillees=12, soumis_par=self.user, submitted_by=self.user
+        )
+        Well.objects.create(nom='Puits Vide', name='Bare Well', status='unknown')
+
+    def assertSameAsSerializer(self, params=None):
+        response = self.client.get(reverse('wells:well-list'), params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [item['id'] for item in response.data['results']]
+        wells = sorted(Well.objects.select_related('created_by_user', 'last_updated_by', 'resume').filter(pk__in=ids),
+                       key=lambda well: ids.index(well.pk))
+        expected = WellSerializer(wells, many=True, context={'request': Request(response.wsgi_request)}).data
+        self.assertEqual(json.loads(json.dumps(response.data['results'])), json.loads(json.dumps(expected)))
+        return response
+
+    def test_list_matches_serializer(self):
+        """Test que la liste compacte rend exactement la sortie du serializer."""
+        response = self.assertSameAsSerializer()
+        self.assertEqual(len(response.data['results']), 2)
+        complet = next(item for item in response.data['results'] if item['id'] == self.complet.pk)
+        self.assertEqual(complet['created_by_name'], 'Compact Liste')
+        self.assertEqual(complet['last_updated_by_name'], 'Compact Liste')
+        self.assertEqual(complet['status_display'], 'Active')
+        self.assertEqual(complet['depth'], '2450.50')
+        self.assertEqual(complet['summary']['nombre_rapports'], 1)
+        self.assertEqual(complet['summary']['dernier_rapport'], '2024-03-02')
+
+    def test_sparse_fields_and_ordering(self):
+        """Test que ?fields= et le tri s'appliquent à la liste compacte."""
+        response = self.assertSameAsSerializer({'fields': 'id,name,summary', 'ordering': 'name'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'summary'})
+        self.assertEqual([item['name'] for item in response.data['results']], ['Bare Well', 'Full Well'])
+
+    def test_cursor_follows_compact_rows(self):
+        """Test que le curseur se construit depuis les lignes compactes."""
+        first = self.client.get(reverse('wells:well-list'), {'page_size': 1, 'ordering': 'start_date'})
+        second = self.client.get(first.data['next'])
+        self.assertEqual(
+            [first.data['results'][0]['id'], second.data['results'][0]['id']],
+            [self.complet.pk, Well.objects.get(name='Bare Well').pk]
+        )
@@ -0,0 +1,109 @@
+from collections import defaultdict
+
+from django.core.cache import cache
+
+from .models import Well
+from .region_models import Forage, Phase, Operation, Indicateur
+
+CLE_ARBRE = 'wells:tree:puit:{}'
+DUREE_ARBRE = 3600
+
+CHAMPS_PUIT = [
+    'id', 'nom', 'name', 'type', 'region_id', 'statut', 'status',
+    'profondeur', 'depth', 'date_debut', 'date_fin', 'is_archived',
+]
+CHAMPS_FORAGE = ['id', 'puit_id', 'cout', 'date_debut', 'date_fin']
+CHAMPS_PHASE = [
+    'id', 'forage_id', 'numero_phase', 'diametre', 'description',
+    'profondeur_prevue', 'profondeur_reelle',
+    'date_debut_prevue', 'date_debut_reelle', 'date_fin_prevue', 'date_fin_reelle',
+]
+CHAMPS_OPERATION = [
+    'id', 'phase_id', 'type_operation_id', 'description',
+    'date_debut', 'date_fin', 'cout', 'statut',
+]
+CHAMPS_INDICATEUR = [
+    'id', 'operation_id', 'type_indicateur_id',
+    'valeur_prevue', 'valeur_reelle', 'date_mesure',
+]
+
+
+def cle_arbre(puit_id):
+    return CLE_ARBRE.format(puit_id)
+
+
+def _grouper(lignes, champ_parent):
+    groupes = defaultdict(list)
+    for ligne in lignes:
+        groupes[ligne[champ_parent]].append(ligne)
+    return groupes
+
+
+def construire_arbres(puits_ids):
+    """
+    Construit les arbres Puit → Forage → Phase → Opération → Indicateur des puits donnés.
+
+    Une requête par niveau, quel que soit le nombre de puits ou de nœuds :
+    cinq requêtes au total. Retourne un dictionnaire {puit_id: arbre}.
+    """
+    puits_ids = list(puits_ids)
+    if not puits_ids:
+        return {}
+
+    puits = list(Well.objects.filter(pk__in=puits_ids).values(*CHAMPS_PUIT))
+    forages = list(Forage.objects.filter(puit_id__in=puits_ids).values(*CHAMPS_FORAGE))
+    phases = _grouper(
+        Phase.objects.filter(forage__puit_id__in=puits_ids).order_by('numero_phase').values(*CHAMPS_PHASE),
+        'forage_id'
+    )
+    operations = _grouper(
+        Operation.objects.filter(phase__forage__puit_id__in=puits_ids)
+        .order_by('date_debut', 'id').values(*CHAMPS_OPERATION),
+        'phase_id'
+    )
+    indicateurs = _grouper(
+        Indicateur.objects.filter(operation__phase__forage__puit_id__in=puits_ids)
+        .order_by('date_mesure', 'id').values(*CHAMPS_INDICATEUR),
+        'operation_id'
+    )
+
+    for liste in operations.values():
+        for operation in liste:
+            operation['indicateurs'] = indicateurs.get(operation['id'], [])
+    for liste in phases.values():
+        for phase in liste:
+            phase['operations'] = operations.get(phase['id'], [])
+    forage_par_puit = {}
+    for forage in forages:
+        forage['phases'] = phases.get(forage['id'], [])
+        forage_par_puit[forage['puit_id']] = forage
+
+    arbres = {}
+    for puit in puits:
+        puit['forage'] = forage_par_puit.get(puit['id'])
+        arbres[puit['id']] = puit
+    return arbres
+
+
+def arbres_puits(puits_ids):
+    """
+    Arbres des puits donnés, dans l'ordre demandé, lus depuis le cache.
+
+    Les arbres absents du cache sont construits ensemble (cinq requêtes) puis
+    mis en cache ; un puits inexistant est ignoré.
+    """
+    puits_ids = list(puits_ids)
+    en_cache = cache.get_many([cle_arbre(puit_id) for puit_id in puits_ids])
+    arbres = {puit_id: en_cache[cle_arbre(puit_id)] for puit_id in puits_ids if cle_arbre(puit_id) in en_cache}
+
+    manquants = [puit_id for puit_id in puits_ids if puit_id not in arbres]
+    if manquants:
+        construits = construire_arbres(manquants)
+        cache.set_many({cle_arbre(puit_id): arbre for puit_id, arbre in construits.items()}, DUREE_ARBRE)
+        arbres.update(construits)
+
+    return [arbres[puit_id] for puit_id in puits_ids if puit_id in arbres]
+
+
+def invalider_arbres(puits_ids):
+    cache.delete_many([cle_arbre(puit_id) for puit_id in set(puits_ids) if puit_id is not None])
@@ -1,30 +1,62 @@
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from datetime import datetime, time, timezone as dt_timezone
 from django.db import transaction
-from django.db.models import Q
-from django.utils import timezone
+from django.db.models import Q, Prefetch
 from .models import Well, WellOperation, DailyReport, WellDocument
 from .region_models import Region, Forage, Phase, TypeOperation, Operation, Probleme, TypeIndicateur, Indicateur, Reservoir
+from .pagination import KeysetCursorPagination
+from .search import FullTextSearchFilter, SearchRankOrderingFilter
+from .imports import DailyReportImporter, IMPORT_FORMATS
+from .exports import StreamingExportMixin
+from .conditional import ConditionalGetMixin
+from .fieldsets import SparseFieldsetViewMixin
+from .compact import CompactListMixin
+from .geo import decouper_rectangle, filtrer_rectangles, rechercher_rayon, plus_proches
+from .tree import arbres_puits
+from .rollups import synthese_regions
+from .gaps import puits_actifs, rapports_manquants
+from .bulk import appliquer_action_masse
+from .autocomplete import suggerer_puits
+from .lifecycle import demarrer_operation, terminer_operation, TransitionInvalide
+from .partitions import ajouter_mois
+from .series import serie_agregee, serie_brute
 from .serializers import (
     WellSerializer, WellDetailSerializer, WellOperationSerializer,
     DailyReportSerializer, WellDocumentSerializer,
+    GeoBoundingBoxQuerySerializer, GeoRadiusQuerySerializer, GeoNearestQuerySerializer,
+    MissingReportsQuerySerializer, WellBulkActionSerializer, WellAutocompleteQuerySerializer,
     RegionSerializer, ForageSerializer, PhaseSerializer, 
     TypeOperationSerializer, OperationSerializer, ProblemeSerializer,
-    TypeIndicateurSerializer, IndicateurSerializer, ReservoirSerializer
+    TypeIndicateurSerializer, IndicateurSerializer, IndicateurSeriesQuerySerializer, ReservoirSerializer
 )
 from apps.accounts.permissions import IsOperatorOrAbove, IsManagerOrAdmin
+from apps.accounts.views import get_client_ip
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 
-class WellViewSet(viewsets.ModelViewSet):
+class WellViewSet(ConditionalGetMixin, StreamingExportMixin, SparseFieldsetViewMixin, CompactListMixin,
+                  viewsets.ModelViewSet):
     """
     API endpoint for managing wells.
+
+    The list is served by the compact `.values()` path (see CompactListMixin).
     """
     serializer_class = WellSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['name', 'location', 'description']
+    pagination_class = KeysetCursorPagination
+    filter_backends = [FullTextSearchFilter, SearchRankOrderingFilter]
+    search_vectors = ['recherche']
     ordering_fields = ['name', 'creation_date', 'status', 'start_date']
     ordering = ['-creation_date']
+    export_fields = [
+        'id', 'nom', 'name', 'type', 'region', 'statut', 'status', 'location',
+        'coord_x', 'coord_y', 'latitude', 'longitude', 'profondeur', 'depth',
+        'date_debut', 'date_fin', 'start_date', 'end_date',
+        'creation_date', 'last_updated', 'is_archived'
+    ]
+    # Filter keys accepted by the bulk action -> Well lookups
+    bulk_filter_lookups = {'status': 'status', 'statut': 'statut', 'region': 'region_id', 'archived': 'is_archived'}
     
     def get_queryset(self):
         """
@@ -43,6 +75,17 @@ class WellViewSet(viewsets.ModelViewSet):
         show_archived = self.request.query_params.get('archived', 'false').lower() == 'true'
         if not show_archived:
             queryset = queryset.filter(is_archived=False)
+        
+        queryset = queryset.select_related('created_by_user', 'last_updated_by', 'resume')
+        if self.action == 'retrieve':
+            # Load the whole detail graph up front: one query for the well and its
+            # one-to-one/FK relations, plus one per nested collection. Region details
+            # come from the reference data cache.
+            queryset = queryset.select_related('forage').prefetch_related(
+                Prefetch('operations', queryset=WellOperation.objects.select_related('created_by')),
+                Prefetch('daily_reports', queryset=DailyReport.objects.select_related('submitted_by')),
+                Prefetch('documents', queryset=WellDocument.objects.select_related('uploaded_by')),
+            )
             
         return queryset
     
@@ -52,7 +95,8 @@ class WellViewSet(viewsets.ModelViewSet):
         return WellSerializer
     
     def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user, last_updated_by=self.request.user)
+        serializer.save(created_by=self.request.user, created_by_user=self.request.user,
+                        last_updated_by=self.request.user)
     
     def perform_update(self, serializer):
         serializer.save(last_updated_by=self.request.user)
@@ -110,17 +154,152 @@ class WellViewSet(viewsets.ModelViewSet):
             {"detail": f"Well {well.name} has been unarchived."},
             status=status.HTTP_200_OK
         )
+    
+    @extend_schema(
+        description="Archive, unarchive or change the status of many wells (ids and/or filter) "
+                    "with one set-based UPDATE and a single aggregated audit entry",
+        request=WellBulkActionSerializer,
+        responses={
+            200: OpenApiResponse(description="Number of wells updated and audit entry id"),
+            403: OpenApiResponse(description="Permission denied")
+        }
+    )
+    @action(detail=False, methods=['post'], url_path='bulk', permission_classes=[IsManagerOrAdmin])
+    def bulk(self, request):
+        params = WellBulkActionSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        
+        wells = Well.objects.all()
+        if data.get('ids'):
+            wells = wells.filter(pk__in=data['ids'])
+        criteria = data.get('filter', {})
+        wells = wells.filter(**{self.bulk_filter_lookups[key]: value for key, value in criteria.items()})
+        
+        updated, journal = appliquer_action_masse(
+            wells, data['action'], request.user,
+            statut=data.get('status'),
+            criteres={'filter': criteria, 'ids': data.get('ids')},
+            adresse_ip=get_client_ip(request),
+            user_agent=request.META.get('HTTP_USER_AGENT', '')
+        )
+        return Response({'action': data['action'], 'updated': len(updated), 'audit_id': journal.pk})
+    
+    def _wells_by_distance(self, matches):
+        """Serialize (pk, distance_km) pairs in order, adding `distance_km` to each well."""
+        wells = self.get_queryset().in_bulk([pk for pk, _ in matches])
+        results = []
+        for pk, distance in matches:
+            if pk in wells:
+                data = WellSerializer(wells[pk], context=self.get_serializer_context()).data
+                data['distance_km'] = round(distance, 3)
+                results.append(data)
+        return results
+    
+    @extend_schema(
+        description="Return the well's Forage → Phase → Operation → Indicateur tree (cached per well)",
+        responses={
+            200: OpenApiResponse(description="Well subtree"),
+            404: OpenApiResponse(description="Well not found")
+        }
+    )
+    @action(detail=True, methods=['get'], url_path='tree')
+    def tree(self, request, pk=None):
+        well = self.get_object()
+        return Response(arbres_puits([well.pk])[0])
+    
+    @extend_schema(
+        description="List wells inside a bounding box (min_lon > max_lon crosses the antimeridian)",
+        parameters=[GeoBoundingBoxQuerySerializer],
+        responses={200: WellSerializer(many=True)}
+    )
+    @action(detail=False, methods=['get'], url_path='bbox')
+    def bbox(self, request):
+        params = GeoBoundingBoxQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        box = params.validated_data
+        rectangles = decouper_rectangle(box['min_lat'], box['min_lon'], box['max_lat'], box['max_lon'])
+        queryset = self.filter_queryset(filtrer_rectangles(self.get_queryset(), rectangles))
+        
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(WellSerializer(page, many=True).data)
+        return Response(WellSerializer(queryset, many=True).data)
+    
+    @extend_schema(
+        description="List wells within a radius of a point, nearest first",
+        parameters=[GeoRadiusQuerySerializer],
+        responses={200: OpenApiResponse(description="Wells with their distance_km")}
+    )
+    @action(detail=False, methods=['get'], url_path='within-radius')
+    def within_radius(self, request):
+        params = GeoRadiusQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+        matches = rechercher_rayon(
+            self.get_queryset(), query['lat'], query['lon'], query['radius_km'], limite=query['limit']
+        )
+        return Response(self._wells_by_distance(matches))
+    
+    @extend_schema(
+        description="List the k wells nearest to a point",
+        parameters=[GeoNearestQuerySerializer],
+        responses={200: OpenApiResponse(description="Wells with their distance_km")}
+    )
+    @action(detail=False, methods=['get'], url_path='nearest')
+    def nearest(self, request):
+        params = GeoNearestQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+        matches = plus_proches(self.get_queryset(), query['lat'], query['lon'], query['k'])
+        return Response(self._wells_by_distance(matches))
+    
+    @extend_schema(
+        description="List the days without a daily report for each active well, as compact date ranges "
+                    "(computed in one query against a generate_series calendar)",
+        parameters=[MissingReportsQuerySerializer],
+        responses={200: OpenApiResponse(description="Wells with their missing report ranges")}
+    )
+    @action(detail=False, methods=['get'], url_path='missing-reports')
+    def missing_reports(self, request):
+        params = MissingReportsQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+        wells = puits_actifs()
+        if 'region' in query:
+            wells = wells.filter(region_id=query['region'])
+        return Response(rapports_manquants(wells, query['start'], query['end']))
+    
+    @extend_schema(
+        description="Suggest wells whose nom/name or region code is close to q (pg_trgm word similarity), "
+                    "best matches first; popular prefixes are cached for a minute",
+        parameters=[WellAutocompleteQuerySerializer],
+        responses={200: OpenApiResponse(description="Matching wells with their similarity score")}
+    )
+    @action(detail=False, methods=['get'], url_path='autocomplete')
+    def autocomplete(self, request):
+        params = WellAutocompleteQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+        return Response(suggerer_puits(query['q'], query['limit'], query['archived']))
 
 
-class WellOperationViewSet(viewsets.ModelViewSet):
+class WellOperationViewSet(StreamingExportMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing well operations.
     """
     serializer_class = WellOperationSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['name', 'description', 'well__name']
+    pagination_class = KeysetCursorPagination
+    filter_backends = [FullTextSearchFilter, SearchRankOrderingFilter]
+    search_vectors = ['recherche', 'well__recherche']
     ordering_fields = ['planned_start_date', 'operation_type', 'status']
     ordering = ['-planned_start_date']
+    export_fields = [
+        'id', 'puit', 'well', 'nom', 'name', 'type_operation', 'operation_type', 'statut', 'status',
+        'date_debut_prevue', 'date_fin_prevue', 'date_debut_reelle', 'date_fin_reelle',
+        'planned_start_date', 'planned_end_date', 'actual_start_date', 'actual_end_date',
+        'created_by', 'created_at', 'updated_at'
+    ]
     
     def get_queryset(self):
         """Return all operations or filter by well if specified."""
@@ -164,22 +343,10 @@ class WellOperationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        if operation.actual_start_date is not None:
-            return Response(
-                {"detail": "This operation has already been started."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        operation.actual_start_date = timezone.now()
-        operation.status = 'active'
-        operation.save()
-        
-        # Update the well status if needed
-        well = operation.well
-        if well.status in ['planned', 'paused']:
-            well.status = 'active'
-            well.last_updated_by = request.user
-            well.save()
+        try:
+            operation = demarrer_operation(operation.pk, request.user)
+        except TransitionInvalide as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response(
             {"detail": f"Operation {operation.name} has been started."},
@@ -204,29 +371,10 @@ class WellOperationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        if operation.actual_start_date is None:
-            return Response(
-                {"detail": "Cannot complete an operation that hasn't started."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        if operation.actual_end_date is not None:
-            return Response(
-                {"detail": "This operation has already been completed."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        operation.actual_end_date = timezone.now()
-        operation.status = 'completed'
-        operation.save()
-        
-        # Check if all operations for this well are completed
-        well = operation.well
-        active_operations = well.operations.exclude(status='completed').count()
-        if active_operations == 0:
-            well.status = 'completed'
-            well.last_updated_by = request.user
-            well.save()
+        try:
+            operation = terminer_operation(operation.pk, request.user)
+        except TransitionInvalide as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response(
             {"detail": f"Operation {operation.name} has been completed."},
@@ -234,15 +382,21 @@ class WellOperationViewSet(viewsets.ModelViewSet):
         )
 
 
-class DailyReportViewSet(viewsets.ModelViewSet):
+class DailyReportViewSet(StreamingExportMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing daily reports.
     """
     serializer_class = DailyReportSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['activities', 'issues', 'solutions', 'well__name']
+    pagination_class = KeysetCursorPagination
+    filter_backends = [FullTextSearchFilter, SearchRankOrderingFilter]
+    search_vectors = ['recherche', 'well__recherche']
     ordering_fields = ['report_date', 'submitted_at', 'well']
     ordering = ['-report_date']
+    export_fields = [
+        'id', 'puit', 'well', 'operation', 'date_rapport', 'report_date',
+        'activities', 'progress', 'issues', 'solutions', 'hours_worked',
+        'submitted_by', 'submitted_at', 'updated_at'
+    ]
     
     def get_queryset(self):
         """Return all reports or filter by well if specified."""
@@ -271,13 +425,47 @@ class DailyReportViewSet(viewsets.ModelViewSet):
     
     def perform_create(self, serializer):
         serializer.save(submitted_by=self.request.user)
+    
+    @extend_schema(
+        description=(
+            "Bulk import daily reports from a CSV (text/csv) or NDJSON (application/x-ndjson) body. "
+            "Rows are upserted on (well, report_date); invalid rows are reported without aborting the batch."
+        ),
+        request={'text/csv': str, 'application/x-ndjson': str},
+        responses={
+            200: OpenApiResponse(description="Number of processed rows and per-row errors"),
+            400: OpenApiResponse(description="Empty body"),
+            415: OpenApiResponse(description="Unsupported content type")
+        }
+    )
+    @action(detail=False, methods=['post'], url_path='import')
+    def bulk_import(self, request):
+        media_type = request.content_type.split(';')[0].strip().lower()
+        iter_rows = IMPORT_FORMATS.get(media_type)
+        if iter_rows is None:
+            return Response(
+                {"detail": f"Unsupported content type '{media_type}'. Use text/csv or application/x-ndjson."},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+            )
+        
+        # Read the body as a stream instead of going through request.data.
+        stream = request.stream
+        if stream is None:
+            return Response(
+                {"detail": "The request body is empty."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        result = DailyReportImporter(user=request.user).run(iter_rows(stream))
+        return Response(result, status=status.HTTP_200_OK)
 
 
-class WellDocumentViewSet(viewsets.ModelViewSet):
+class WellDocumentViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing well documents.
     """
     serializer_class = WellDocumentSerializer
+    pagination_class = KeysetCursorPagination
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['nom', 'title', 'description', 'type', 'document_type', 'well__nom', 'well__name']
     ordering_fields = ['date_upload', 'uploaded_at', 'nom', 'title', 'type']
@@ -303,7 +491,7 @@ class WellDocumentViewSet(viewsets.ModelViewSet):
         serializer.save(uploade_par=self.request.user, uploaded_by=self.request.user)
 
 
-class RegionViewSet(viewsets.ModelViewSet):
+class RegionViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing regions.
     """
@@ -313,9 +501,44 @@ class RegionViewSet(viewsets.ModelViewSet):
     search_fields = ['nom', 'code', 'localisation', 'responsable']
     ordering_fields = ['nom', 'code', 'created_at']
     ordering = ['nom']
+    
+    @extend_schema(
+        description="Return the region with the full tree of each of its wells",
+        parameters=[
+            OpenApiParameter(name='archived', type=bool, description="Include archived wells (default: false)")
+        ],
+        responses={
+            200: OpenApiResponse(description="Region tree"),
+            404: OpenApiResponse(description="Region not found")
+        }
+    )
+    @action(detail=True, methods=['get'], url_path='tree')
+    def tree(self, request, pk=None):
+        region = self.get_object()
+        wells = Well.objects.filter(region=region)
+        if request.query_params.get('archived', 'false').lower() != 'true':
+            wells = wells.filter(is_archived=False)
+        well_ids = wells.order_by('nom', 'id').values_list('id', flat=True)
+        
+        data = RegionSerializer(region).data
+        data['puits'] = arbres_puits(well_ids)
+        return Response(data)
+    
+    @extend_schema(
+        description="Return, for every region, well counts by status, drilling and operation costs "
+                    "and planned vs actual depth (single grouped query, cached)",
+        parameters=[
+            OpenApiParameter(name='archived', type=bool, description="Include archived wells (default: false)")
+        ],
+        responses={200: OpenApiResponse(description="Per-region cost and progress rollup")}
+    )
+    @action(detail=False, methods=['get'], url_path='rollup')
+    def rollup(self, request):
+        include_archived = request.query_params.get('archived', 'false').lower() == 'true'
+        return Response(synthese_regions(include_archived))
 
 
-class ForageViewSet(viewsets.ModelViewSet):
+class ForageViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing drilling operations (forages).
     """
@@ -337,7 +560,7 @@ class ForageViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-class PhaseViewSet(viewsets.ModelViewSet):
+class PhaseViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing drilling phases.
     """
@@ -349,7 +572,10 @@ class PhaseViewSet(viewsets.ModelViewSet):
     ordering = ['forage', 'numero_phase']
     
     def get_queryset(self):
-        queryset = Phase.objects.all()
+        # PhaseSerializer nests the forage (with its well name) and the operations.
+        queryset = Phase.objects.select_related('forage__puit').prefetch_related(
+            Prefetch('operations', queryset=Operation.objects.select_related('created_by'))
+        )
         
         # Filter by forage if provided
         forage_id = self.request.query_params.get('forage_id', None)
@@ -359,7 +585,7 @@ class PhaseViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-class TypeOperationViewSet(viewsets.ModelViewSet):
+class TypeOperationViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing operation types.
     """
@@ -371,7 +597,7 @@ class TypeOperationViewSet(viewsets.ModelViewSet):
     ordering = ['code']
 
 
-class OperationViewSet(viewsets.ModelViewSet):
+class OperationViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing phase operations.
     """
@@ -401,7 +627,7 @@ class OperationViewSet(viewsets.ModelViewSet):
         serializer.save(created_by=self.request.user)
 
 
-class ProblemeViewSet(viewsets.ModelViewSet):
+class ProblemeViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing problems and incidents.
     """
@@ -434,7 +660,7 @@ class ProblemeViewSet(viewsets.ModelViewSet):
         serializer.save(detecte_par=self.request.user)
 
 
-class TypeIndicateurViewSet(viewsets.ModelViewSet):
+class TypeIndicateurViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing indicator types.
     """
@@ -446,7 +672,7 @@ class TypeIndicateurViewSet(viewsets.ModelViewSet):
     ordering = ['code']
 
 
-class IndicateurViewSet(viewsets.ModelViewSet):
+class IndicateurViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing performance indicators.
     """
@@ -464,11 +690,46 @@ class IndicateurViewSet(viewsets.ModelViewSet):
         phase_id = self.request.query_params.get('phase_id', None)
         if phase_id:
             queryset = queryset.filter(phase_id=phase_id)
+        
+        # Filter by month (YYYY-MM): the half-open range maps onto a single partition
+        month = self.request.query_params.get('mois', None)
+        if month:
+            try:
+                start = datetime.strptime(month, '%Y-%m').replace(tzinfo=dt_timezone.utc)
+            except ValueError:
+                raise ValidationError({'mois': 'Expected a month formatted as YYYY-MM.'})
+            end = datetime.combine(ajouter_mois(start.date(), 1), time.min, tzinfo=dt_timezone.utc)
+            queryset = queryset.filter(date_mesure__gte=start, date_mesure__lt=end)
             
         return queryset
+    
+    @extend_schema(
+        description="Return a well's series for one indicator type: min/max/avg/last per time bucket "
+                    "(from the rollup table) or raw measurements, optionally reduced with LTTB to max_points",
+        parameters=[IndicateurSeriesQuerySerializer],
+        responses={200: OpenApiResponse(description="Series points, oldest first")}
+    )
+    @action(detail=False, methods=['get'], url_path='series')
+    def series(self, request):
+        params = IndicateurSeriesQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+        bounds = {'debut': query.get('start'), 'fin': query.get('end'), 'max_points': query.get('max_points')}
+        
+        if query['granularity'] == 'raw':
+            points = serie_brute(query['well_id'], query['type_indicateur_id'], **bounds)
+        else:
+            points = serie_agregee(query['well_id'], query['type_indicateur_id'], query['granularity'], **bounds)
+        
+        return Response({
+            'well_id': query['well_id'],
+            'type_indicateur_id': query['type_indicateur_id'],
+            'granularity': query['granularity'],
+            'points': points,
+        })
 
 
-class ReservoirViewSet(viewsets.ModelViewSet):
+class ReservoirViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing reservoir information.
     """